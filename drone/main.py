@@ -34,7 +34,8 @@ import os
 import random
 import csv
 from thermal_data import thermal_data
-from radio.packet_class._v4.packet import Packet, Packet_Info, Packet_Info_Dict, deserialize_pac
+from radio.packet_class._v5.packet import Packet, Packet_Info, Packet_Info_Dict, deserialize_pac
+from radio.packet_class._v5.packet import SAK_PACKET_SIZE, next_pac_id, serialize_cap, split_uplink
 import logging
 import logging.handlers
 import datetime
@@ -52,6 +53,7 @@ UNSIGNED_INT_MAX = 2147483647
 # alt_sim_file = open('alt_gps.txt', 'r')
 # packet_lib = ctypes.CDLL('./packet_class/packet.so')
 ACK_PACKET_SIZE = 17 # Call sign + String (of three letters) [3] + integer size (pac_id) [4] + checksum [4]
+CAP_INTERVAL_SEC = 5.0 # How often the V5 CAP packet (protocol version + oldest unACKed ID) is sent
 GCS_ADDRESS = ("127.0.0.1", 5005)  # Localhost UDP port
 gps_sim_file = open('sim_gps.txt', 'r')
 UDP_PORT = 5004
@@ -208,7 +210,7 @@ def create_packet(q3, q4, global_session_id):
 #   Description: Send serialized packets over RF to the GCS            #                            
 #   Return: None                                                       #
 ########################################################################
-def send_packet(q4, my_packet_info_dict, prog_mode, q_log):
+def send_packet(q4, my_packet_info_dict, prog_mode, q_log, global_session_id):
     global rf_serial
     pid = os.getpid()
     
@@ -218,8 +220,29 @@ def send_packet(q4, my_packet_info_dict, prog_mode, q_log):
     udp_socket = None
     if prog_mode == 2:
         udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    next_pac_id_to_send = None # Known once the first packet is sent
+    last_cap_time = 0.0
     
     while True:
+        # ------------------------------- #
+        # V5 VERSION NEGOTIATION (CAP)    #
+        # ------------------------------- #
+        # Tells a V5 GCS to switch to SAKs (a V4 GCS drops it as corrupted),
+        # and which pac_id the SAKs should start from
+        if next_pac_id_to_send is not None and time.monotonic() - last_cap_time >= CAP_INTERVAL_SEC:
+            base_pac_id = my_packet_info_dict.oldest_pac_id(next_pac_id_to_send)
+            cap = serialize_cap(CALL_SIGN, global_session_id, base_pac_id)
+            try:
+                if prog_mode != 2:
+                    rf_serial.write(cap)
+                else:
+                    udp_socket.sendto(cap, GCS_ADDRESS)
+                log_trans_drone(base_pac_id, "CAP", "s", 1, q4.qsize(), my_packet_info_dict.size(), q_log)
+            except serial.SerialException as e:
+                print(f"Failed to send CAP packet: {e}")
+            last_cap_time = time.monotonic()
+
         # ////////////////////////////////\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
         #       COMPUTE PRIORITY WEIGHT FOR RESENDING TIMED OUT PACKETS
         #                   (from my_packet_info_dict)
@@ -304,6 +327,7 @@ def send_packet(q4, my_packet_info_dict, prog_mode, q_log):
                 #for logging
                 id_pac_to_send = ser_pac_to_send_info.get_pac_id()
                 trans_pac_to_send = ser_pac_to_send_info.get_transmissions()
+                next_pac_id_to_send = next_pac_id(id_pac_to_send)
 
                 if prog_mode != 0:
                     print(f"SP: PACKET {ser_pac_to_send_info.pac_id} SENT AT {ser_pac_to_send_info.get_timestamp()}")
@@ -430,18 +454,20 @@ def receive_and_decode(my_packet_info_dict, prog_mode, q4, q_log):
             return
         
     # Program loop for receiving, deserializing, receiving ACKs, and taking it off
-    # my_packet_info_dict
+    # my_packet_info_dict. A V4 GCS sends an ACK per packet, a V5 GCS SAKs
+    # covering many packets, so the bytes are buffered and split by type.
+    received_bytes = b""
     while True:
         try:
             # Receive the data off the bus
             if prog_mode == 2:
                 print("RD: Reading off the UDP socket . . .")
-                data, addr = udp_socket.recvfrom(ACK_PACKET_SIZE)
+                data, addr = udp_socket.recvfrom(SAK_PACKET_SIZE)
                 
                 #print(f"RD: Received packet from {addr}")
             # Read the serialized data from the RF module
             else:
-                data = rf_serial.read(ACK_PACKET_SIZE)
+                data = rf_serial.read(max(1, rf_serial.in_waiting))
                 if prog_mode == 1:
                     #print(f"RD: received packet from {rf_serial_usb_port}")
                     pass
@@ -449,38 +475,37 @@ def receive_and_decode(my_packet_info_dict, prog_mode, q4, q_log):
             # if prog_mode != 0:
             #     print(f"RD: PACKET LENGTH: {len(data)}")
             #     print(f'RD: PACKET RECEIVED: {data.hex()}')  # Print as hex for readability
-            
-            if len(data) < ACK_PACKET_SIZE:
-                if prog_mode != 0:
-                    print(f"RD: {len(data)} bytes recieved: Incomplete packet, skipping...")
-                continue
 
+            # Corrupted or misaligned bytes are skipped by split_uplink
+            uplink_packets, received_bytes = split_uplink(received_bytes + data)
 
-            # Unpack the payload and checksum
-            ack_payload = data[:-4]  # setting to all but the sum . . . 
-            received_checksum = struct.unpack('<I', data[-4:])[0] # and here we check that sum
-            computed_checksum = zlib.crc32(ack_payload)
-            if computed_checksum != received_checksum:
-                print(f"RD: Checksum mismatch! Packet corrupted. \\ COMPUTED:{computed_checksum}, RECEIVED: {received_checksum}")
-                continue
+            for uplink_packet in uplink_packets:
+                if uplink_packet[0] == "ACK":
+                    pac_id = uplink_packet[1]
+                    if prog_mode != 0:
+                        print(f"RD: RECEIVED ACK FOR PACKET ID {pac_id}")
 
-            # DESERIALIZE THE PAYLOAD, PUT BACK INTO A PACKET
-            encoded_call_sign, type, pac_id = struct.unpack('<6s3sI', ack_payload)
-            call_sign = encoded_call_sign.rstrip(b'\x00').decode('utf-8')
-            if prog_mode != 0:
-                print(f"RD: RECEIVED ACK FOR PACKET ID {pac_id} FROM CALL SIGN{call_sign}")
+                    successfully_pop_pac = my_packet_info_dict.pop(pac_id) # True/false value if popped pac_id off of the my_packet_info_dict struct
+                    if prog_mode != 0:
+                        if successfully_pop_pac == True:
+                            print(f"RD: SUCCESSFULLY POPPED PACKET ID {pac_id} OFF OF MY_PACKET_INFO_DICT")
+                        else:
+                            print(f"RD: FAILED TO POP PACKET ID {pac_id} OFF OF MY_PACKET_INFO_DICT")
+                    acked_pac_ids = [pac_id]
 
-            successfully_pop_pac = my_packet_info_dict.pop(pac_id) # True/false value if popped pac_id off of the my_packet_info_dict struct
-            if prog_mode != 0:
-                if successfully_pop_pac == True:
-                    print(f"RD: SUCCESSFULLY POPPED PACKET ID {pac_id} OFF OF MY_PACKET_INFO_DICT")
                 else:
-                    print(f"RD: FAILED TO POP PACKET ID {pac_id} OFF OF MY_PACKET_INFO_DICT")
+                    _, cumulative, bitmap = uplink_packet
+                    acked_pac_ids = my_packet_info_dict.pop_acked(cumulative, bitmap) # One call for every packet the SAK covers
+                    if prog_mode != 0:
+                        print(f"RD: RECEIVED SAK UP TO PACKET ID {cumulative}, POPPED {len(acked_pac_ids)} OFF OF MY_PACKET_INFO_DICT")
 
-            # --- #
-            # LOG #
-            # --- #
-            log_trans_drone(pac_id, "ACK", "r", 1, q4.qsize(), my_packet_info_dict.size(), q_log)
+                # --- #
+                # LOG #
+                # --- #
+                unsent_pac_queue_size = q4.qsize()
+                unacked_pac_queue_size = my_packet_info_dict.size()
+                for pac_id in acked_pac_ids:
+                    log_trans_drone(pac_id, "ACK", "r", 1, unsent_pac_queue_size, unacked_pac_queue_size, q_log)
                     
 
         except struct.error as e:
@@ -648,7 +673,7 @@ if __name__ == '__main__':
         p1 = mp.Process(target=data_structure_builder, args=(q1,q2,q5,))
         p2 = mp.Process(target=data_processing, args=(q2,q3,))
         p3 = mp.Process(target=create_packet, args=(q3,q4,global_session_id))
-        p4 = mp.Process(target=send_packet, args=(q4,my_packet_info_dict,prog_mode,q_log,))
+        p4 = mp.Process(target=send_packet, args=(q4,my_packet_info_dict,prog_mode,q_log,global_session_id,))
         p5 = mp.Process(target=gps_sim, args=(q5,)) # sim flight queue
         p_recieve_packets = mp.Process(target=receive_and_decode, args=(my_packet_info_dict,prog_mode,q4,q_log,))
 
@@ -8,9 +8,13 @@ const rawFlightId   = params.get("flight_id");
 const flightId      = rawFlightId && rawFlightId !== "null" ? rawFlightId : null;
 
 const DATA_INTERVAL = 2000;  
+const PAGE_SIZE     = 2000;
 
 let map, overlay, pathLine;
-let lastTimestamp   = 0;
+let cursor          = null;   // next_cursor of the last thermal page
+let polling         = false;
+let refetch         = false;
+const drawnIds      = new Set();  // live pushes and backfills may overlap
 let dataTimer;
 let knownFlightId   = 0;
 
@@ -32,7 +36,7 @@ document.addEventListener("DOMContentLoaded", async () => {
     minHighTemp: 0
   });
   await loadFlightPath();
-  startDataPolling();
+  startLiveUpdates();
 });
 
 // Set title based on user given fire name
@@ -50,11 +54,20 @@ function flightsURL() {
   return `/api/flights/${encodeURIComponent(fireName)}`;
 }
 
+// Keyset paginated thermal feed: only rows after the cursor are returned
 function thermalURL() {
-  const base = `/api/thermal/${encodeURIComponent(fireName)}`;
-  return flightId
-    ? `${base}?flight_id=${encodeURIComponent(flightId)}`
-    : base;
+  const query = new URLSearchParams({ limit: PAGE_SIZE });
+  if (flightId) query.set("flight_id", flightId);
+  if (cursor) query.set("after", cursor);
+  return `/api/thermal/${encodeURIComponent(fireName)}?${query}`;
+}
+
+// Fetches the next page of thermal rows and advances the cursor
+async function fetchThermalPage() {
+  const res  = await fetch(thermalURL(), { cache: "no-store" });
+  const page = await res.json();
+  if (page.next_cursor) cursor = page.next_cursor;
+  return page;
 }
 
 // Find most recent flight ID
@@ -166,16 +179,16 @@ async function fetchFireCenter() {
 
 // queries thermal API endpoint for new data and stores GPS data as a flight path and thermal data in overlay
 async function loadFlightPath() {
-  const res     = await fetch(thermalURL(), { cache: "no-store" });
-  const payload = await res.json();
-  const points  = Array.isArray(payload) ? payload : (payload.wildfire_data || []);
-
   const coords = [];
-  for (const pt of points) {
-    coords.push([pt.latitude, pt.longitude]);
-    lastTimestamp = Math.max(lastTimestamp, pt.time_stamp);
-    appendPoint(pt.latitude, pt.longitude, [pt.high_temp, pt.low_temp]);
-  }
+  let page;
+  do {
+    page = await fetchThermalPage();
+    for (const pt of page.wildfire_data) {
+      drawnIds.add(pt.id);
+      coords.push([pt.latitude, pt.longitude]);
+      appendPoint(pt.latitude, pt.longitude, [pt.high_temp, pt.low_temp]);
+    }
+  } while (page.has_more);
 
   if (coords.length) {
     pathLine = L.polyline(coords, { color: "red" }).addTo(map);
@@ -184,6 +197,40 @@ async function loadFlightPath() {
   overlay.render({ fitBounds: false });
 }
 
+// Subscribes to packets pushed by the server; falls back to polling if the
+// WebSocket is unavailable or closes
+function startLiveUpdates() {
+  const proto  = window.location.protocol === "https:" ? "wss" : "ws";
+  let socket;
+  try {
+    socket = new WebSocket(`${proto}://${window.location.host}/ws/live`);
+  } catch {
+    startDataPolling();
+    return;
+  }
+
+  socket.onopen = () => {
+    socket.send(JSON.stringify({ command: "subscribe", name: fireName, flight_id: Number(flightId) }));
+  };
+
+  socket.onmessage = (msg) => {
+    const data = JSON.parse(msg.data);
+    if (data.type === "subscribed") {
+      // rows committed between the initial load and the subscription
+      fetchNewPoints();
+    } else if (data.type === "update") {
+      (data.packets || []).forEach(drawPoint);
+      // the server dropped packets for us: backfill from its cursor
+      for (const gap of data.gaps || []) {
+        if (gap.after) cursor = gap.after;
+        fetchNewPoints();
+      }
+    }
+  };
+
+  socket.onclose = () => startDataPolling();
+}
+
 function startDataPolling() {
   if (dataTimer) clearInterval(dataTimer);
   fetchNewPoints();
@@ -191,20 +238,31 @@ function startDataPolling() {
 }
 
 async function fetchNewPoints() {
-  const res     = await fetch(thermalURL(), { cache: "no-store" });
-  const payload = await res.json();
-  const points  = Array.isArray(payload) ? payload : (payload.wildfire_data || []);
-
-  for (const pt of points) {
-    if (pt.time_stamp > lastTimestamp) {
-      lastTimestamp = pt.time_stamp;
-      drawPoint(pt);
-    }
+  // a slow poll must finish before the next one reuses the cursor; a request
+  // made meanwhile (e.g. a live gap) runs once it is done
+  if (polling) {
+    refetch = true;
+    return;
+  }
+  polling = true;
+  try {
+    do {
+      refetch = false;
+      let page;
+      do {
+        page = await fetchThermalPage();
+        page.wildfire_data.forEach(drawPoint);
+      } while (page.has_more);
+    } while (refetch);
+  } finally {
+    polling = false;
   }
 }
 
 // Draw flight path and call thermalOverlay render
 function drawPoint(pt) {
+  if (drawnIds.has(pt.id)) return;
+  drawnIds.add(pt.id);
   if (!pathLine) {
     pathLine = L.polyline([[pt.latitude, pt.longitude]], { color: "red" }).addTo(map);
   } else {
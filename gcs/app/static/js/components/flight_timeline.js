@@ -95,30 +95,22 @@ class FlightTimelineController {
   
     // Fetches flight timestamps, thermal data, sets start/end/current times, and prepares intensity readings.
     async loadData(fireName, flightId) {
-      // fetch flight path for start/end
-      const resp1 = await fetch(
-        `/api/flights/${encodeURIComponent(fireName)}?flight_id=${flightId}`
+      // one row per minute of the flight, with exact first/last packet times
+      const resp = await fetch(
+        `/api/rollup/${encodeURIComponent(fireName)}?resolution=60&flight_id=${flightId}`
       );
-      const { wildfire_data = [] } = await resp1.json();
-      const times = wildfire_data
-        .map(pt => new Date(pt.time_stamp / 1_000_000))
-        .filter(d => !isNaN(d));
-  
-      if (times.length) {
-        this.startTime   = new Date(Math.min(...times));
-        this.endTime     = new Date(Math.max(...times));
+      const raw = await resp.json();
+
+      if (raw.length) {
+        this.startTime   = new Date(raw[0].first_time_stamp / 1_000_000);
+        this.endTime     = new Date(raw[raw.length - 1].last_time_stamp / 1_000_000);
         this.currentTime = new Date(this.startTime);
       } else {
         const now = new Date();
         this.startTime = this.endTime = this.currentTime = new Date(now);
         console.warn('No flight-path timestamps returned for', flightId);
       }
-  
-      // fetch thermal data and normalize intensities
-      const resp2 = await fetch(
-        `/api/thermal/${encodeURIComponent(fireName)}?flight_id=${flightId}`
-      );
-      const raw = await resp2.json();
+
       const valid = raw.filter(d => typeof d.time_stamp === 'number' && d.time_stamp > 0);
       const temps = valid.flatMap(d => [d.high_temp, d.low_temp]);
       const tmin = Math.min(...temps), tmax = Math.max(...temps);
@@ -0,0 +1,43 @@
+// decoder for the binary point format of the bulk endpoints (see point_encoding.py):
+// "PYRO" | uint32 header length | JSON header | 8-byte aligned little-endian columns
+export const BINARY_TYPE = "application/vnd.pyro.points";
+
+const TYPED_ARRAYS = {
+  uint32:  Uint32Array,
+  int32:   Int32Array,
+  float32: Float32Array,
+  float64: Float64Array
+};
+
+// returns { count, columns: { name: typed array or string array }, meta }
+export function decodePoints(buffer) {
+  const view = new DataView(buffer);
+  const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+  if (magic !== "PYRO") throw new Error("not a binary points body");
+
+  const headerLength = view.getUint32(4, true);
+  const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 8, headerLength)));
+  const start = 8 + headerLength;
+
+  const columns = {};
+  header.columns.forEach(col => {
+    const values = new TYPED_ARRAYS[col.type](buffer, start + col.offset, header.count);
+    columns[col.name] = col.dictionary ? Array.from(values, i => col.dictionary[i]) : values;
+  });
+  return { count: header.count, columns, meta: header.meta };
+}
+
+// fetches url in the binary format and returns one object per point, like the JSON format
+export async function fetchPointRows(url) {
+  const response = await fetch(url, { headers: { Accept: BINARY_TYPE } });
+  if (!response.ok) throw new Error(`HTTP ${response.status} for ${url}`);
+  const { count, columns } = decodePoints(await response.arrayBuffer());
+  const names = Object.keys(columns);
+  const rows = new Array(count);
+  for (let i = 0; i < count; i++) {
+    const row = {};
+    names.forEach(name => { row[name] = columns[name][i]; });
+    rows[i] = row;
+  }
+  return rows;
+}
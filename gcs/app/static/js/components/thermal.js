@@ -1,3 +1,5 @@
+import { fetchPointRows } from "./points.js";
+
 // returns a wrapped version of function that can only execute once per wait interval
 // used to slow down thermalOverlay updates
 function throttle(fn, wait) {
@@ -67,10 +69,14 @@ export default class ThermalOverlay {
   async _fetchAll(name, flight_id = null) {
     let url = `/api/thermal/${encodeURIComponent(name)}`;
     if (flight_id) url += `?flight_id=${encodeURIComponent(flight_id)}`;
-    const response = await fetch(url);
-    const data = await response.json();
-    this.rawCache = (Array.isArray(data) ? data : [])
-      .filter(pt => pt.high_temp >= this.minHighTemp);
+    // binary typed arrays: a fraction of the bytes and no JSON parsing
+    try {
+      const data = await fetchPointRows(url);
+      this.rawCache = data.filter(pt => pt.high_temp >= this.minHighTemp);
+    } catch (error) {
+      // left uncached so the next load retries instead of showing no hotspots
+      console.error("Error fetching thermal data:", error);
+    }
   }
 
   // ensures raw data is fetched once, then processes it in a Web Worker
@@ -151,7 +157,7 @@ export default class ThermalOverlay {
         worker.terminate();
       };
       worker.onerror = e => reject(e);
-      worker.postMessage({ raw: this.rawCache, mode: this.mode, windowMs: this.recentWindowMs * 1e6, ts });
+      worker.postMessage({ raw: this.rawCache || [], mode: this.mode, windowMs: this.recentWindowMs * 1e6, ts });
     });
   }
 
@@ -100,9 +100,16 @@ class TimelineController {
   
   // Fetches flight timestamps, thermal data, sets start/end/current times, and prepares intensity readings.
   async loadData(name) {
+    this.fireName = name;
     try {
-      const thermalResponse = await fetch(`/api/thermal/${name}`);
-      const thermalRaw = await thermalResponse.json();
+      // Per-bucket rollups instead of raw packets: 15 minute buckets, or
+      // 1 minute buckets when the fire is short enough for them to matter
+      let thermalResponse = await fetch(`/api/rollup/${encodeURIComponent(name)}?resolution=900`);
+      let thermalRaw = await thermalResponse.json();
+      if (thermalRaw.length && thermalRaw.length < 200) {
+        thermalResponse = await fetch(`/api/rollup/${encodeURIComponent(name)}?resolution=60`);
+        thermalRaw = await thermalResponse.json();
+      }
   
       if (!thermalRaw.length) {
         console.warn("No thermal data returned for:", name);
@@ -488,7 +495,9 @@ class TimelineController {
     exportBtn.title = 'Export CSV';
     exportBtn.addEventListener('click', () => {
       const { start, end } = this.getVisibleTimeframe();
-      window.open(`/download_csv?start=${+start}&end=${+end}`, '_blank');
+      const query = new URLSearchParams({ start: +start, end: +end });
+      if (this.fireName) query.set('name', this.fireName);
+      window.open(`/download_csv?${query}`, '_blank');
     });
     exportBtn.style.marginLeft = '5px';
     pauseBtn.style.marginRight = '5px';
@@ -19,6 +19,7 @@ class FiresPage {
   constructor() {
     this.map = null;
     this.markers = [];
+    this.comparisons = {};
     this.selectedFire = null;
     this.init();
   }
@@ -43,6 +44,8 @@ class FiresPage {
       if (!response.ok) throw new Error('Failed to fetch wildfire markers');
 
       const fires = await response.json();
+      // one request for the comparisons of every fire on the map
+      this.comparisons = await this.loadAllComparisons();
       this.markers.forEach(marker => this.map.removeLayer(marker));
       this.markers = [];
 
@@ -70,6 +73,18 @@ class FiresPage {
     }
   }
 
+  // fetches size/intensity comparison data for all fires, keyed by fire name
+  async loadAllComparisons() {
+    try {
+      const response = await fetch('/fire_comparison');
+      if (!response.ok) throw new Error('Failed to fetch comparison data');
+      return await response.json();
+    } catch (error) {
+      console.error("Error loading comparison data:", error);
+      return {};
+    }
+  }
+
   // fetches size/intensity comparison data for a fire from API endpoint
   async loadComparisonData(name) {
     try {
@@ -93,7 +108,7 @@ class FiresPage {
       <p>Loading previous day comparison...</p>
     `;
   
-    const compData = await this.loadComparisonData(fire.name);
+    const compData = this.comparisons[fire.name] ?? await this.loadComparisonData(fire.name);
     if (compData) {
       fire.prev_size = compData.prev_size;
       fire.prev_intensity = compData.prev_intensity;
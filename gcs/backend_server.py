@@ -1,23 +1,111 @@
 import os
 import json
+import asyncio
 import sqlite3
 import logging
 import pandas as pd
-from datetime import datetime
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 import tornado.ioloop
+import tornado.locks
 import tornado.web
 import tornado.websocket
 from pymavlink import mavutil
+import sys
 import time
+import signal
 import multiprocessing as mp
+import db_pool
 from tornado.options import define, options, parse_command_line
 from urllib.parse import parse_qs
-from database import init_db, process_packet, update_mission_data, fetch_heatmap_data, fetch_all_heatmap_data, sync_to_firebase, update_fire_status
+from database import init_db, update_mission_data, heatmap_query, sync_to_firebase, add_listener, process_packet_batch, validate_packet, flush_flights, requeue_flights
+from ingest_writer import IngestWriter
+from firebase_sync import FirebaseSync, FirebaseSyncWorker
+from rollups import RESOLUTIONS, fetch_rollups
+import query_executor
+import live_broker
+import export
+import heatmap_grid
+import point_encoding
+from point_encoding import json_array
+import data_version
+from response_cache import ResponseCache
 
 # Command Line Arguments
 define("port", default=8000, help="Run on the given port", type=int)
 define("debug", default=False, help="Run in debug mode", type=bool)
 define("db_path", default="wildfire_data.db", help="Path to SQLite database", type=str)
+define("db_workers", default=4, help="Threads (and read connections) serving API queries", type=int)
+define("heavy_requests", default=1, help="Full-table API requests allowed to run at once", type=int)
+define("firebase_sync_interval", default=0.0, help="Seconds between background Firebase syncs (0 disables)", type=float)
+
+MAX_INGEST_ROWS = 50_000
+MAX_INGEST_ERRORS = 100
+_UNPARSABLE = object()
+
+def parse_packet_body(body, content_type=""):
+    """Rows of an /add_packets body: a JSON array, or NDJSON (one JSON value
+    per line, blank lines skipped). NDJSON lines that are not JSON come back
+    as _UNPARSABLE so they can be rejected on their own.
+
+    Raises ValueError when the body is neither.
+    """
+    text = body.decode("utf-8")
+    if "ndjson" not in content_type and text.lstrip().startswith("["):
+        rows = json.loads(text)
+        if not isinstance(rows, list):
+            raise ValueError("expected a JSON array")
+        return rows
+
+    rows = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        try:
+            rows.append(json.loads(line))
+        except ValueError:
+            rows.append(_UNPARSABLE)
+    return rows
+
+MAX_PAGE_SIZE = 5000
+_CURSOR_END = 2**63 - 1
+
+def parse_cursor(value):
+    """Keyset cursor "time_stamp:id" -> (time_stamp, id).
+
+    A bare time_stamp (ns) means every row after that time.
+    """
+    time_stamp, sep, row_id = value.partition(":")
+    return int(time_stamp), int(row_id) if sep else _CURSOR_END
+
+def format_cursor(time_stamp, row_id):
+    # time_stamp is a REAL column; whole-number doubles convert exactly
+    return f"{int(time_stamp)}:{row_id}"
+
+# wildfire_status columns, in table order, as kept per fire in fire_current
+FIRE_CURRENT_COLUMNS = (
+    "id, name, location, size, intensity, alt_avg, status, max_temp, min_temp, avg_latitude, "
+    "avg_longitude, flights, num_data_points, first_time_stamp, time_stamp, last_flight_id"
+)
+
+def current_fires_query(filter_type=None):
+    """Latest status snapshot of every fire, newest first. filter_type
+    "active" or "archived" keeps only the fires currently in that status.
+    Returns (query, params).
+    """
+    query = f"SELECT {FIRE_CURRENT_COLUMNS} FROM fire_current"
+    params = ()
+    if filter_type in ("active", "archived"):
+        query += " WHERE status = ?"
+        params = (filter_type,)
+    return query + " ORDER BY time_stamp DESC", params
+
+# Responses of the dashboard endpoints, rebuilt only when their tables change.
+# The epoch keeps ETags from a previous server run (or database) from matching.
+_response_cache = ResponseCache()
+# Binned heatmap tiles, keyed by fire, flight, zoom and tile
+_tile_cache = ResponseCache(max_entries=4096)
+_CACHE_EPOCH = f"{int(time.time()):x}"
 
 class BaseHandler(tornado.web.RequestHandler):
     def set_default_headers(self):
@@ -25,13 +113,131 @@ class BaseHandler(tornado.web.RequestHandler):
         self.set_header("Access-Control-Allow-Headers", "Content-Type, Authorization")
         self.set_header("Access-Control-Allow-Methods", "GET, POST, PUT, DELETE, OPTIONS")
         
-    def prepare(self):
-        self.db = sqlite3.connect(options.db_path)
-        self.db.row_factory = sqlite3.Row
-        
-    def on_finish(self):
-        if hasattr(self, 'db'):
-            self.db.close()
+    async def run_query(self, fn, *args, heavy=False):
+        """Run fn(conn, *args) on the DB executor, off the IOLoop.
+
+        heavy=True for full-table reads, which are also capped by the
+        executor's heavy request limit.
+        """
+        executor = query_executor.get_executor()
+        if heavy:
+            return await executor.run_heavy(fn, *args)
+        return await executor.run(fn, *args)
+
+    async def fetch_rows(self, query, params=(), heavy=False):
+        """Run a read query on the DB executor and return its rows as dicts."""
+        def fetch(conn):
+            return [dict(row) for row in conn.execute(query, params).fetchall()]
+        return await self.run_query(fetch, heavy=heavy)
+
+    async def write_cached_json(self, tables, build):
+        """Write the JSON of await build() through the response cache.
+
+        Entries are keyed by path and arguments and tagged with the data
+        versions of tables, so a write to any of them invalidates the entry.
+        The versions are also the ETag: a revalidating browser gets a 304
+        before anything is queried.
+        """
+        versions, updated_at = await self.run_query(data_version.read, tables)
+        self.set_header("ETag", f'"{_CACHE_EPOCH}-{"-".join(map(str, versions))}"')
+        self.set_header("Cache-Control", "no-cache")
+        if updated_at:
+            self.set_header("Last-Modified", datetime.fromtimestamp(int(updated_at), timezone.utc))
+        if self.check_etag_header() or self._not_modified_since(updated_at):
+            self.set_status(304)
+            return
+
+        key = (self.request.path, tuple(sorted(
+            (name, tuple(values)) for name, values in self.request.query_arguments.items()
+        )))
+        body = _response_cache.get(key, versions)
+        if body is None:
+            body = json.dumps(await build()).encode("utf-8")
+            _response_cache.put(key, versions, body)
+        self.set_header("Content-Type", "application/json")
+        self.write(body)
+
+    def _not_modified_since(self, updated_at):
+        # If-None-Match wins over If-Modified-Since when both are sent
+        since = self.request.headers.get("If-Modified-Since")
+        if not since or "If-None-Match" in self.request.headers or not updated_at:
+            return False
+        try:
+            return int(updated_at) <= parsedate_to_datetime(since).timestamp()
+        except (TypeError, ValueError):
+            return False
+
+    def page_arguments(self):
+        """The after cursor and limit of the paginated wildfires endpoints.
+
+        Raises ValueError for malformed values.
+        """
+        after = self.get_argument("after", None)
+        limit = self.get_argument("limit", None)
+        after = parse_cursor(after) if after else None
+        if limit is not None:
+            limit = min(int(limit), MAX_PAGE_SIZE)
+            if limit < 1:
+                raise ValueError("limit must be positive")
+        return after, limit
+
+    async def fetch_points(self, query, params=(), heavy=False):
+        """Run a read query on the DB executor and return it as Points."""
+        return await self.run_query(point_encoding.fetch_points, query, params, heavy=heavy)
+
+    def point_format(self):
+        """Response format of the point endpoints (ValueError if unknown)."""
+        return point_encoding.negotiate(self.request.headers.get("Accept"), self.get_argument("format", None))
+
+    async def write_points(self, points, fmt, meta=None, field="wildfire_data"):
+        """Encode points in fmt and write them, compressed if the client
+        accepts it. Encoding runs on the DB executor, off the IOLoop.
+        """
+        coding = point_encoding.accepted_encoding(self.request.headers.get("Accept-Encoding"))
+        body, content_encoding = await self.run_query(
+            lambda conn: point_encoding.compress(point_encoding.encode(points, fmt, meta, field), coding)
+        )
+        self.set_header("Content-Type", point_encoding.CONTENT_TYPES[fmt])
+        self.set_header("Vary", "Accept, Accept-Encoding")
+        if content_encoding:
+            self.set_header("Content-Encoding", content_encoding)
+        self.write(body)
+
+    def write_bad_format(self, error):
+        self.set_status(400)
+        self.write(json.dumps({ "error": str(error) }))
+
+    async def fetch_page(self, query, params, after=None, limit=None):
+        """Run a wildfires query in (time_stamp, id) order, starting after the
+        cursor. The query selects id and time_stamp and ends in its WHERE
+        clause. Returns (points, next_cursor, has_more).
+        """
+        params = list(params)
+        if after is not None:
+            query += " AND (time_stamp, id) > (?, ?)"
+            params.extend(after)
+        query += " ORDER BY time_stamp, id"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit + 1)
+
+        points = await self.fetch_points(query, params)
+        has_more = limit is not None and len(points) > limit
+        if has_more:
+            points.rows = points.rows[:limit]
+
+        if points:
+            next_cursor = format_cursor(points.value(-1, "time_stamp"), points.value(-1, "id"))
+        elif after is not None:
+            next_cursor = format_cursor(*after)
+        else:
+            next_cursor = None
+        self.set_header("X-Next-Cursor", next_cursor or "")
+        return points, next_cursor, has_more
+
+    def write_bad_page(self):
+        self.set_status(400)
+        self.write(json.dumps({ "error": "Invalid after or limit parameter" }))
 
 class MainHandler(BaseHandler):
     def get(self):
@@ -56,206 +262,297 @@ class AboutHandler(BaseHandler):
 
 # API Endpoint Handlers
 class HeatmapDataHandler(BaseHandler):
-    def get(self):
+    async def get(self):
         name = self.get_argument("name", None)
         date = self.get_argument("date", None)
         time_param = self.get_argument("time", None)
         
-        if name:
-            heatmap_data = fetch_heatmap_data(name, date, time_param)
-        else:
-            heatmap_data = fetch_all_heatmap_data()
-            
-        self.set_header("Content-Type", "application/json")
-        self.write(json.dumps(heatmap_data))
+        try:
+            fmt = self.point_format()
+        except ValueError as e:
+            return self.write_bad_format(e)
 
-class WildfireMarkersHandler(BaseHandler):
-    def get(self):
-        filter_type = self.get_argument("filter", "active")
-        cursor = self.db.cursor()
-
-        # build the optional status filter (applied in the subquery)
-        filter_clause = ""
-        if filter_type == "active":
-            filter_clause = " AND status = 'active'"
-        elif filter_type == "archived":
-            filter_clause = " AND status = 'archived'"
-
-        # subquery finds, for each fire name, the max time_stamp AND the max id (tie-breaker)
-        subquery = f"""
-            SELECT
-                name,
-                MAX(time_stamp) AS max_time_stamp,
-                MAX(id)         AS max_id
-            FROM wildfire_status
-            WHERE 1=1
-              {filter_clause}
-            GROUP BY name
-        """
+        query, params = heatmap_query(name, date, time_param)
+        heatmap_data = await self.fetch_points(query, params, heavy=not name)
+        await self.write_points(heatmap_data, fmt)
+
+class HeatmapGridHandler(BaseHandler):
+    async def get(self, name):
+        """API endpoint to get a fire's temperatures binned for the map view.
+
+        - /api/heatmap/{name}?bbox={west,south,east,north}&zoom={z}&flight_id={id}
 
-        # join back on both time_stamp AND id to pick exactly one row per fire
-        query = f"""
-            SELECT
-                ws.id,
-                ws.name,
-                ws.location,
-                ws.size,
-                ws.intensity,
-                ws.alt_avg,
-                ws.status,
-                ws.max_temp,
-                ws.min_temp,
-                ws.avg_latitude,
-                ws.avg_longitude,
-                ws.flights,
-                ws.num_data_points,
-                ws.first_time_stamp,
-                ws.time_stamp,
-                ws.last_flight_id
-            FROM wildfire_status AS ws
-            JOIN ({subquery}) AS latest
-              ON ws.name       = latest.name
-             AND ws.time_stamp = latest.max_time_stamp
-             AND ws.id         = latest.max_id
-            ORDER BY ws.time_stamp DESC
+        Returns {"zoom", "grid", "columns", "cells"}, one cell per
+        256 / grid pixels that holds data (see heatmap_grid).
         """
+        try:
+            zoom = int(self.get_argument("zoom"))
+            if not 0 <= zoom <= heatmap_grid.MAX_ZOOM:
+                raise ValueError(f"zoom must be between 0 and {heatmap_grid.MAX_ZOOM}")
+            bbox = heatmap_grid.parse_bbox(self.get_argument("bbox"))
+            tiles = heatmap_grid.tiles_for_bbox(bbox, zoom)
+            flight_id = self.get_argument("flight_id", None)
+            flight_id = int(flight_id) if flight_id else None
+        except (ValueError, tornado.web.MissingArgumentError) as e:
+            self.set_status(400)
+            return self.write({"error": str(e)})
+
+        # Versioned per fire: ingest into other fires keeps these tiles
+        tables = (data_version.fire(name), data_version.WILDFIRE_POSITIONS)
+
+        async def build():
+            versions, _ = await self.run_query(data_version.read, tables)
+            cells, missing = [], []
+            for tile in tiles:
+                cached = _tile_cache.get((name, flight_id, zoom, tile), versions)
+                if cached is None:
+                    missing.append(tile)
+                else:
+                    cells.extend(cached)
+            if missing:
+                binned = await self.run_query(heatmap_grid.compute_tiles, name, zoom, missing, flight_id)
+                for tile, tile_cells in binned.items():
+                    _tile_cache.put((name, flight_id, zoom, tile), versions, tile_cells)
+                    cells.extend(tile_cells)
+            return {"zoom": zoom, "grid": heatmap_grid.GRID,
+                    "columns": heatmap_grid.CELL_COLUMNS, "cells": cells}
 
-        cursor.execute(query)
-        fires = [dict(row) for row in cursor.fetchall()]
+        try:
+            await self.write_cached_json(tables, build)
+        except Exception as e:
+            logging.error(f"HeatmapGridHandler Error: {e}")
+            self.set_status(500)
+            self.write({"error": "Failed to bin heatmap data"})
 
-        self.set_header("Content-Type", "application/json")
-        self.write(json.dumps(fires))
+class WildfireMarkersHandler(BaseHandler):
+    async def get(self):
+        filter_type = self.get_argument("filter", "active")
+        query, params = current_fires_query(filter_type)
+        await self.write_cached_json((data_version.WILDFIRE_STATUS,), lambda: self.fetch_rows(query, params))
 
 class DatabaseQueryHandler(BaseHandler):
-    def get(self):
+    async def get(self):
         try:
             fire_name = self.get_argument("fire_name", None)
             table = self.get_argument("table", "wildfire_status")
-            conn = sqlite3.connect(options.db_path)
+            heavy = table == "wildfires"
 
             if table not in ["wildfire_status", "wildfires"]:
                 raise ValueError("Invalid table name")
                 
             if table == "wildfire_status":
+                # Only the most recent record for the specified fire, or for each fire
                 if fire_name:
-                    # Return only the most recent record for the specified fire
-                    query = """
-                        SELECT *
-                        FROM wildfire_status
-                        WHERE name = ?
-                        ORDER BY time_stamp DESC
-                        LIMIT 1
-                    """
-                    df = pd.read_sql_query(query, conn, params=(fire_name,))
+                    query = f"SELECT {FIRE_CURRENT_COLUMNS} FROM fire_current WHERE name = ?"
+                    params = (fire_name,)
                 else:
-                    # Return only the most recent record for each fire name.
-                    query = """
-                        SELECT t.*
-                        FROM wildfire_status t
-                        JOIN (
-                        SELECT 
-                            name, 
-                            MAX(time_stamp) AS max_time_stamp,
-                            MAX(id) AS max_id
-                        FROM wildfire_status
-                        GROUP BY name
-                        ) latest
-                        ON t.name = latest.name 
-                        AND t.time_stamp = latest.max_time_stamp
-                        AND t.id = latest.max_id
-                    """
-                    df = pd.read_sql_query(query, conn)
+                    query, params = current_fires_query()
             elif table == "wildfires":
                 if fire_name:
                     query = "SELECT * FROM wildfires WHERE name = ?"
-                    df = pd.read_sql_query(query, conn, params=(fire_name,))
+                    params = (fire_name,)
                 else:
                     query = "SELECT * FROM wildfires"
-                    df = pd.read_sql_query(query, conn)
+                    params = ()
+
+            def read(conn):
+                # pandas wants plain tuples, so use the worker's default connection
+                df = pd.read_sql_query(query, db_pool.get_connection(), params=params)
+                # Serialize on the worker too, it is as slow as the query
+                return json_array(df.to_dict(orient="records"))
 
-            conn.close()
-            data = df.to_dict(orient="records")
+            body = await self.run_query(read, heavy=heavy)
 
             self.set_header("Content-Type", "application/json")
-            self.write(json.dumps(data))
+            self.write(body)
 
         except Exception as e:
             self.set_status(500)
             self.write(json.dumps({"error": str(e)}))
 
 class DownloadCSVHandler(BaseHandler):
-    def get(self):
+    async def get(self):
+        """Stream wildfires rows without buffering the export.
+
+        - /download_csv?format={csv|arrow|parquet}
+        - /download_csv?name={fire}&flight_id={id}&time_from={ns}&time_to={ns}
+        - /download_csv?start={ms}&end={ms} (timeline export button)
+        """
         try:
-            conn = sqlite3.connect(options.db_path)
-            df = pd.read_sql_query("SELECT * FROM wildfires", conn)
-            conn.close()
-            
-            csv_path = "wildfire_data.csv"
-            df.to_csv(csv_path, index=False)
-            
-            self.set_header("Content-Disposition", f"attachment; filename={csv_path}")
-            self.set_header("Content-Type", "text/csv")
-            
-            with open(csv_path, "rb") as file:
-                self.write(file.read())
-                
+            fmt = self.get_argument("format", "csv")
+            name = self.get_argument("name", None)
+            flight_id = self.get_argument("flight_id", None)
+            flight_id = int(flight_id) if flight_id else None
+            time_from = self.get_argument("time_from", None)
+            time_to = self.get_argument("time_to", None)
+            start = self.get_argument("start", None)
+            end = self.get_argument("end", None)
+            time_from = int(time_from) if time_from else (int(float(start) * 1_000_000) if start else None)
+            time_to = int(time_to) if time_to else (int(float(end) * 1_000_000) if end else None)
+        except ValueError:
+            self.set_status(400)
+            self.write({"error": "Invalid flight_id or time range"})
+            return
+
+        if fmt not in export.FORMATS:
+            self.set_status(400)
+            self.write({"error": f"Unknown format, expected one of {', '.join(export.FORMATS)}"})
+            return
+
+        content_type, extension = export.FORMATS[fmt]
+        self.set_header("Content-Disposition", f"attachment; filename=wildfire_data.{extension}")
+        self.set_header("Content-Type", content_type)
+
+        loop = asyncio.get_running_loop()
+        started = False
+
+        async def send(chunk):
+            nonlocal started
+            started = True
+            self.write(chunk)
+            await self.flush()
+
+        def write(chunk):
+            # Called on the DB worker: wait until the chunk is on the socket,
+            # so at most one chunk is in memory and slow clients slow the read
+            asyncio.run_coroutine_threadsafe(send(chunk), loop).result()
+
+        def run(conn):
+            export.export_wildfires(conn, write, fmt, name, flight_id, time_from, time_to)
+
+        try:
+            await self.run_query(run, heavy=True)
+        except ImportError:
+            self.clear()
+            self.set_status(501)
+            self.write({"error": f"{fmt} export needs pyarrow, which is not installed"})
         except Exception as e:
-            self.set_status(500)
-            self.write({"error": str(e)})
+            logging.error(f"Export failed: {str(e)}")
+            if not started:
+                self.clear()
+                self.set_status(500)
+                self.write({"error": str(e)})
 
-class FirebaseSyncHandler(BaseHandler):
+class DatabaseStatsHandler(BaseHandler):
     def get(self):
-        sync_to_firebase()
+        """Connection setup, per-query timing and response cache hit counts
+        of this server process."""
+        self.set_header("Content-Type", "application/json")
+        self.write(json.dumps({**db_pool.stats(), "response_cache": _response_cache.stats(),
+                               "tile_cache": _tile_cache.stats()}))
+
+class FirebaseSyncHandler(BaseHandler):
+    async def get(self):
+        # Network bound, keep it off the IOLoop
+        synced = await tornado.ioloop.IOLoop.current().run_in_executor(None, sync_to_firebase)
         self.set_header("Content-Type", "application/json")
-        self.write({"message": "Firebase sync initiated."})
+        self.write({"message": "Firebase sync complete.", "synced": synced})
 
 class AddPacketHandler(BaseHandler):
-    def post(self):
+    async def post(self):
+        """Single packet ingest, through the same pipeline as /add_packets.
+
+        Takes the /add_packets row format; a packet without a time_stamp is
+        stamped with the time it was received.
+        """
         try:
             packet_data = json.loads(self.request.body)
+            if isinstance(packet_data, dict):
+                packet_data.setdefault("time_stamp", time.time_ns())
+            packet = validate_packet(packet_data)
             name = packet_data.get("name", "New Data Fire")
-            pac_id = packet_data.get("pac_id", -1)
-            latitude = packet_data.get("latitude", 0.0)
-            longitude = packet_data.get("longitude", 0.0)
-            alt = packet_data.get("alt", 0.0)
-            high_temp = packet_data.get("high_temp", 0.0)
-            low_temp = packet_data.get("low_temp", 0.0)
-            date_received = packet_data.get("date_received", datetime.now().strftime("%Y-%m-%d"))
-            time_received = packet_data.get("time_received", datetime.now().strftime("%H:%M:%S"))
-            flight_id = packet_data.get("flight_id", -1)
-            time_stamp = packet_data.get("time_stamp", datetime.now().timestamp())
-            heading = packet_data.get("heading", 0.0)
-            speed = packet_data.get("speed", 0.0)
-            
-            cursor = self.db.cursor()
-            cursor.execute("""
-                INSERT INTO wildfires (
-                    name, pac_id, latitude, longitude, alt, 
-                    high_temp, low_temp, date_received, time_received,
-                    status, sync_status, time_stamp, heading, speed, flight_id
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                name, pac_id, latitude, longitude, alt,
-                high_temp, low_temp, date_received, time_received,
-                'active', 'pending', time_stamp, heading, speed, flight_id
-            ))
-            self.db.commit()
-            
-            # process_packet(packet, name, "pending")
-            
-            self.set_header("Content-Type", "application/json")
+            if not isinstance(name, str) or not name.strip():
+                raise ValueError("name must be a non-empty string")
+        except ValueError as e:
+            self.set_status(400)
+            return self.write({"error": f"Invalid packet: {e}"})
+
+        try:
+            async with _ingest_lock:
+                inserted, _ = await self.run_query(_ingest, [(packet, name, "active")])
+        except Exception as e:
+            self.set_status(500)
+            return self.write({"error": f"Failed to process packet: {str(e)}"})
+
+        self.set_header("Content-Type", "application/json")
+        if inserted:
             self.write({"message": "Packet added and sync initiated."})
-            
+        else:
+            self.write({"message": "Duplicate packet skipped."})
+
+# Flight and packet count bookkeeping in database is process-wide state,
+# so HTTP batches are ingested one at a time. Requests wait their turn on
+# the IOLoop, not in a DB worker thread the read handlers need.
+_ingest_lock = tornado.locks.Lock()
+
+def _ingest(conn, batch):
+    """process_packet_batch for the HTTP ingest handlers. Returns (inserted, duplicates)."""
+    counts = process_packet_batch(batch, conn)
+    # This may be the last batch of its flights, write their end times now
+    flushed = flush_flights(conn, force=True)
+    try:
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        requeue_flights(flushed)
+        raise
+    return counts
+
+class AddPacketsHandler(BaseHandler):
+    async def post(self):
+        """Batch ingest through the radio packet pipeline.
+
+        The body is a JSON array or NDJSON of radio packets (pac_id, gps_data
+        or latitude/longitude, alt, high_temp, low_temp, session_id,
+        time_stamp) with an optional name and status each. Valid rows are
+        written in one transaction with the same dedup, flight and status
+        logic as radio packets. Returns the received / accepted / duplicate /
+        rejected counts and the first errors by row index.
+        """
+        try:
+            rows = parse_packet_body(self.request.body, self.request.headers.get("Content-Type", ""))
+        except ValueError as e:
+            self.set_status(400)
+            return self.write({"error": f"Body must be a JSON array or NDJSON: {e}"})
+        if len(rows) > MAX_INGEST_ROWS:
+            self.set_status(413)
+            return self.write({"error": f"At most {MAX_INGEST_ROWS} packets per request"})
+
+        batch, errors = [], []
+        for index, row in enumerate(rows):
+            try:
+                if row is _UNPARSABLE:
+                    raise ValueError("not valid JSON")
+                packet = validate_packet(row)
+                name = row.get("name", "New Data Fire")
+                status = row.get("status", "active")
+                if not isinstance(name, str) or not name.strip() or not isinstance(status, str):
+                    raise ValueError("name and status must be non-empty strings")
+                batch.append((packet, name, status))
+            except ValueError as e:
+                if len(errors) < MAX_INGEST_ERRORS:
+                    errors.append({"row": index, "error": str(e)})
+
+        try:
+            async with _ingest_lock:
+                inserted, duplicates = await self.run_query(_ingest, batch) if batch else (0, 0)
         except Exception as e:
+            logging.error(f"AddPacketsHandler Error: {e}")
             self.set_status(500)
-            self.write({"error": f"Failed to process packet: {str(e)}"})
+            return self.write({"error": "Failed to ingest packets"})
+
+        self.write({
+            "received": len(rows),
+            "accepted": inserted,
+            "duplicates": duplicates,
+            "rejected": len(rows) - len(batch),
+            "errors": errors,
+        })
 
 class FireDataHandler(BaseHandler):
-    def get(self):
+    async def get(self):
         """API endpoint to get fire data for map visualization"""
         try:
-            cursor = self.db.cursor()
-            
             date_from = self.get_argument('date_from', None)
             date_to = self.get_argument('date_to', None)
             flight_ids = self.get_arguments('flight_id')
@@ -293,8 +590,7 @@ class FireDataHandler(BaseHandler):
                 
             query += " GROUP BY w.id"
             
-            cursor.execute(query, params)
-            fires = [dict(row) for row in cursor.fetchall()]
+            fires = await self.fetch_rows(query, params, heavy=not (date_from or date_to or flight_ids))
             
             self.set_header("Content-Type", "application/json")
             self.write(json.dumps(fires))
@@ -305,16 +601,29 @@ class FireDataHandler(BaseHandler):
             self.write({"error": "Failed to fetch fire data"})
 
 class ThermalDataHandler(BaseHandler):
-    def get(self, name):
+    async def get(self, name):
         """API endpoint to get thermal data.
 
         - /api/thermal
         - /api/thermal/{name}
         - /api/thermal/{name}?flight_id={id}
+        - /api/thermal/{name}?flight_id={id}&after={cursor}&limit={n}
+
+        Rows come in (time_stamp, id) order. With after or limit the response
+        is {wildfire_data, next_cursor, has_more}; polling with after set to
+        next_cursor returns only rows added since.
         """
         try:
-            cursor = self.db.cursor()
+            after, limit = self.page_arguments()
+        except ValueError:
+            self.write_bad_page()
+            return
+        try:
+            fmt = self.point_format()
+        except ValueError as e:
+            return self.write_bad_format(e)
 
+        try:
             # Get optional timestamp and flight_id parameters
             time_param = self.get_argument("time_stamp", None)
             flight_id = self.get_argument("flight_id", None)
@@ -345,13 +654,11 @@ class ThermalDataHandler(BaseHandler):
                 query += " AND time_stamp <= ?"
                 params.append(time_ns)
 
-            query += " ORDER BY time_stamp ASC"
-            cursor.execute(query, params)
-            rows = cursor.fetchall()
-
-            thermal_data = [dict(row) for row in rows]
-            self.set_header("Content-Type", "application/json")
-            self.write(json.dumps(thermal_data))
+            thermal_data, next_cursor, has_more = await self.fetch_page(query, params, after, limit)
+            if after is None and limit is None:
+                await self.write_points(thermal_data, fmt)
+            else:
+                await self.write_points(thermal_data, fmt, {"next_cursor": next_cursor, "has_more": has_more})
 
         except Exception as e:
             import traceback
@@ -359,16 +666,60 @@ class ThermalDataHandler(BaseHandler):
             self.set_status(500)
             self.write(json.dumps({ "error": "Failed to fetch thermal data" }))
 
+class RollupHandler(BaseHandler):
+    async def get(self, name):
+        """API endpoint to get the per-minute time series of a fire.
+
+        - /api/rollup/{name}?resolution={60|900}
+        - /api/rollup/{name}?flight_id={id}&time_from={ns}&time_to={ns}
+        """
+        try:
+            resolution = int(self.get_argument("resolution", RESOLUTIONS[0]))
+            if resolution not in RESOLUTIONS:
+                self.set_status(400)
+                return self.write({"error": f"resolution must be one of {list(RESOLUTIONS)}"})
+
+            flight_id = self.get_argument("flight_id", None)
+            time_from = self.get_argument("time_from", None)
+            time_to = self.get_argument("time_to", None)
+
+            rows = await self.run_query(
+                lambda conn: fetch_rollups(
+                    conn.cursor(),
+                    name,
+                    resolution,
+                    flight_id=int(flight_id) if flight_id else None,
+                    time_from=float(time_from) if time_from else None,
+                    time_to=float(time_to) if time_to else None
+                )
+            )
+            self.set_header("Content-Type", "application/json")
+            self.write(json.dumps(rows))
+
+        except ValueError as e:
+            self.set_status(400)
+            self.write({"error": str(e)})
+        except Exception as e:
+            logging.error(f"RollupHandler Error: {e}")
+            self.set_status(500)
+            self.write({"error": "Failed to fetch rollup data"})
+
 class FlightDataHandler(BaseHandler):
-    def get(self, flight_name=None):
+    async def get(self, flight_name=None):
         """API endpoint to get flight data.
 
         - /api/flights
         - /api/flights/{name}
         - /api/flights/{name}?flight_id={id}
+
+        The flight's wildfire_data is negotiated like /api/thermal.
         """
         try:
-            cursor = self.db.cursor()
+            fmt = self.point_format()
+        except ValueError as e:
+            return self.write_bad_format(e)
+
+        try:
             flight_id = self.get_argument("flight_id", None)
 
             time_from = self.get_argument("time_from", None)
@@ -393,26 +744,24 @@ class FlightDataHandler(BaseHandler):
                     query += " AND time_started <= ?"
                     params.append(float(time_to))
 
-                cursor.execute(query, params)
-                all_flights = [dict(row) for row in cursor.fetchall()]
+                all_flights = await self.fetch_rows(query, params)
                 self.write(json.dumps(all_flights))
                 return
 
             if flight_id:
-                cursor.execute("""
+                rows = await self.fetch_rows("""
                     SELECT flight_id, name, ulog_filename, time_started, time_ended
                     FROM flights
                     WHERE name = ? AND flight_id = ?
                 """, [flight_name, int(flight_id)])
-                row = cursor.fetchone()
 
-                if not row:
+                if not rows:
                     self.set_status(404)
                     return self.write({"error": "Flight not found"})
 
-                flight = dict(row)
+                flight = rows[0]
 
-                cursor.execute("""
+                wildfire_data = await self.fetch_points("""
                     SELECT 
                         id,
                         name,
@@ -426,9 +775,8 @@ class FlightDataHandler(BaseHandler):
                     WHERE name = ? AND flight_id = ?
                     ORDER BY time_stamp
                 """, [flight_name, int(flight_id)])
-                flight["wildfire_data"] = [dict(r) for r in cursor.fetchall()]
 
-                return self.write(json.dumps(flight))
+                return await self.write_points(wildfire_data, fmt, flight)
 
             query = """
                 SELECT 
@@ -448,8 +796,7 @@ class FlightDataHandler(BaseHandler):
                 query += " AND time_started <= ?"
                 params.append(float(time_to))
 
-            cursor.execute(query, params)
-            flights = [dict(row) for row in cursor.fetchall()]
+            flights = await self.fetch_rows(query, params)
             return self.write(json.dumps(flights))
 
         except Exception as e:
@@ -462,26 +809,51 @@ class FlightDetailsHandler(BaseHandler):
         self.render("flight_details.html")
 
 class LiveDataWebSocketHandler(tornado.websocket.WebSocketHandler):
-    """WebSocket handler for real-time data updates"""
-    connections = set()
-    
+    """WebSocket handler for real-time data updates.
+
+    Clients send {"command": "subscribe" | "unsubscribe", "name": fire,
+    "flight_id": id}; flight_id is optional and leaving out name subscribes
+    to every fire. Committed packets and fire status snapshots arrive as
+    {"type": "update", "packets": [...], "status": [...], "gaps": [...]}.
+    A gap means packets were dropped for a slow client: fetch
+    /api/thermal/{name}?flight_id={id}&after={after} to catch up.
+    """
+
     def check_origin(self, origin):
         return True
     
     def open(self):
-        self.connections.add(self)
+        self.broker = live_broker.get_broker()
+        self.client = self.broker.connect(self.send_update)
         logging.info("WebSocket opened")
+
+    async def send_update(self, message):
+        # Resolves once the frame is handed to the socket, so a slow reader
+        # makes its LiveClient coalesce instead of queueing frames here
+        await self.write_message(json.dumps(message))
         
     def on_message(self, message):
         try:
             data = json.loads(message)
             command = data.get('command')
+            name = data.get('name')
+            flight_id = data.get('flight_id')
+            flight_id = int(flight_id) if flight_id not in (None, "") else None
+
+            if command == "subscribe":
+                self.broker.subscribe(self.client, name, flight_id)
+            elif command == "unsubscribe":
+                self.broker.unsubscribe(self.client, name, flight_id)
+            else:
+                self.write_message(json.dumps({ "type": "error", "error": f"Unknown command {command!r}" }))
+                return
+            self.write_message(json.dumps({ "type": command + "d", "name": name, "flight_id": flight_id }))
                 
         except Exception as e:
             logging.error(f"WebSocket message error: {str(e)}")
             
     def on_close(self):
-        self.connections.remove(self)
+        self.broker.disconnect(self.client)
         logging.info("WebSocket closed")
 
 class FireDetailsHandler(BaseHandler):
@@ -489,63 +861,52 @@ class FireDetailsHandler(BaseHandler):
         self.render("fire_details.html")
 
 class FireComparisonHandler(BaseHandler):
-    def get(self):
-        fire_name = self.get_argument("name")
-        cursor = self.db.cursor()
-
-        # Get the two most recent entries
-        latest_query = """
-            SELECT time_stamp
-            FROM wildfire_status
-            WHERE name = ?
-            ORDER BY time_stamp DESC
-            LIMIT 2
-        """
-        cursor.execute(latest_query, (fire_name,))
-        rows = cursor.fetchall()
-
-        if len(rows) < 2 or rows[0]["time_stamp"] != rows[1]["time_stamp"]:
-            update_fire_status(fire_name)
-
-        current_query = """
-            SELECT size, intensity, time_stamp
-            FROM wildfire_status
-            WHERE name = ?
-            ORDER BY time_stamp DESC
-            LIMIT 1
+    async def get(self):
+        """Current size and intensity of fires against their previous snapshot.
+
+        - /fire_comparison?name={name}
+        - /fire_comparison?name={a}&name={b}, /fire_comparison (all fires):
+          {name: comparison}
+
+        A comparison is {prev_size, prev_intensity, prev_timestamp,
+        size_change, intensity_change}, or {} before a second snapshot. The
+        previous values are stored with each snapshot, so this only reads
+        fire_current and never refreshes a fire's status.
         """
-        cursor.execute(current_query, (fire_name,))
-        current_record = cursor.fetchone()
-        if not current_record:
+        names = self.get_arguments("name")
+        query = "SELECT name, size, intensity, prev_size, prev_intensity, prev_time_stamp FROM fire_current"
+        if names:
+            query += f" WHERE name IN ({', '.join('?' * len(names))})"
+
+        async def build():
+            rows = await self.fetch_rows(query, names)
+            return {row["name"]: self._comparison(row) for row in rows}
+
+        if len(names) != 1:
+            await self.write_cached_json((data_version.WILDFIRE_STATUS,), build)
+            return
+
+        comparisons = await build()
+        if not comparisons:
             self.set_status(404)
             self.write(json.dumps({"error": "Fire not found"}))
             return
 
-        current_timestamp = current_record["time_stamp"]
-
-        # Get the previous entry in wildfire_status
-        comparison_query = """
-            SELECT size, intensity, time_stamp
-            FROM wildfire_status
-            WHERE name = ? AND time_stamp < ?
-            ORDER BY time_stamp DESC
-            LIMIT 1
-        """
-        cursor.execute(comparison_query, (fire_name, current_timestamp))
-        comparison_record = cursor.fetchone()
-
-        if comparison_record:
-            result = {
-                "prev_size": comparison_record["size"],
-                "prev_intensity": comparison_record["intensity"],
-                "prev_timestamp": comparison_record["time_stamp"]
-            }
-        else:
-            result = {} 
-
         self.set_header("Content-Type", "application/json")
-        self.write(json.dumps(result))
-        
+        self.write(json.dumps(comparisons[names[0]]))
+
+    @staticmethod
+    def _comparison(row):
+        if row["prev_time_stamp"] is None:
+            return {}
+        return {
+            "prev_size": row["prev_size"],
+            "prev_intensity": row["prev_intensity"],
+            "prev_timestamp": row["prev_time_stamp"],
+            "size_change": row["size"] - row["prev_size"],
+            "intensity_change": row["intensity"] - row["prev_intensity"],
+        }
+
 class TestHandler(BaseHandler):
     def get(self):
         self.render("test.html")
@@ -561,12 +922,24 @@ class CurrentFlightHandler(BaseHandler):
         )
 
 class LiveFlightHandler(BaseHandler):
-    def get(self, flight_name=None):
-        """API endpoint to get flight data for a specific fire and flight ID"""
+    async def get(self, flight_name=None):
+        """API endpoint to get flight data for a specific fire and flight ID.
+
+        wildfire_data takes the same after/limit keyset pagination as
+        /api/thermal, with next_cursor and has_more next to it.
+        """
+        try:
+            after, limit = self.page_arguments()
+        except ValueError:
+            self.write_bad_page()
+            return
+        try:
+            fmt = self.point_format()
+        except ValueError as e:
+            return self.write_bad_format(e)
+
         try:
-            cursor = self.db.cursor()
             flight_id = self.get_argument("flight_id", None)
-            after_ns  = int(self.get_argument("after", 0))
 
             if flight_id and flight_name:
                 # Get one specific flight matching both fire name and ID
@@ -580,11 +953,10 @@ class LiveFlightHandler(BaseHandler):
                     FROM flights
                     WHERE name = ? AND flight_id = ?
                 """
-                cursor.execute(query, [flight_name, int(flight_id)])
-                flight_data = cursor.fetchone()
+                flight_rows = await self.fetch_rows(query, [flight_name, int(flight_id)])
 
-                if flight_data:
-                    flight = dict(flight_data)
+                if flight_rows:
+                    flight = flight_rows[0]
 
                     # Get associated wildfire data
                     path_query = """
@@ -599,12 +971,12 @@ class LiveFlightHandler(BaseHandler):
                             time_stamp
                         FROM wildfires
                         WHERE name = ? AND flight_id = ?
-                        ORDER BY time_stamp
                     """
-                    cursor.execute(path_query, [flight_name, int(flight_id), after_ns])
-                    flight["wildfire_data"] = [dict(row) for row in cursor.fetchall()]
+                    (wildfire_data,
+                     flight["next_cursor"],
+                     flight["has_more"]) = await self.fetch_page(path_query, [flight_name, int(flight_id)], after, limit)
 
-                    self.write(json.dumps(flight))
+                    await self.write_points(wildfire_data, fmt, flight)
                 else:
                     self.set_status(404)
                     self.write({ "error": "Flight not found" })
@@ -634,8 +1006,7 @@ class LiveFlightHandler(BaseHandler):
                     query += " AND time_started <= ?"
                     params.append(float(time_to))
 
-                cursor.execute(query, params)
-                flights = [dict(row) for row in cursor.fetchall()]
+                flights = await self.fetch_rows(query, params)
                 self.write(json.dumps(flights))
 
         except Exception as e:
@@ -644,10 +1015,9 @@ class LiveFlightHandler(BaseHandler):
             self.write({ "error": "Failed to fetch flight data" })
 
 class WildfireStatusHandler(BaseHandler):
-    def get(self):
+    async def get(self):
         name        = self.get_argument("name", None)
         filter_type = self.get_argument("filter", "active")
-        cursor      = self.db.cursor()
 
         if name:
             query = """
@@ -670,85 +1040,44 @@ class WildfireStatusHandler(BaseHandler):
                 WHERE name = ?
                 ORDER BY time_stamp ASC
             """
-            cursor.execute(query, (name,))
-            rows = cursor.fetchall()
-
-            data = []
-            for row in rows:
-                raw_ts       = row["time_stamp"]
-                raw_first_ts = row["first_time_stamp"]
-
-                ts = datetime.fromtimestamp(raw_ts / 1e9).isoformat()
-                first_ts = (
-                    datetime.fromtimestamp(raw_first_ts / 1e9).isoformat()
-                    if raw_first_ts else None
-                )
 
-                data.append({
-                    "id":               row["id"],
-                    "time_stamp":       ts,
-                    "first_time_stamp": first_ts,
-                    "size":             row["size"],
-                    "flights":          row["flights"],
-                    "intensity":        row["intensity"],
-                    "max_temp":         row["max_temp"],
-                    "min_temp":         row["min_temp"],
-                    "alt_avg":          row["alt_avg"],
-                    "avg_latitude":     row["avg_latitude"],
-                    "avg_longitude":    row["avg_longitude"],
-                    "num_data_points":  row["num_data_points"],
-                    "status":           row["status"],
-                    "last_flight_id":   row["last_flight_id"]
-                })
+            async def history():
+                rows = await self.fetch_rows(query, (name,))
+                return [self._history_row(row) for row in rows]
 
-            self.set_header("Content-Type", "application/json")
-            return self.write(json.dumps(data))
+            await self.write_cached_json((data_version.WILDFIRE_STATUS,), history)
+            return
         
-        subquery = """
-            SELECT name, MAX(time_stamp) AS max_time_stamp
-            FROM wildfire_status
-            WHERE 1=1
-        """
-        params = []
-        if filter_type == "active":
-            subquery += " AND status = ?"
-            params.append("active")
-        elif filter_type == "archived":
-            subquery += " AND status = ?"
-            params.append("archived")
-
-        subquery += " GROUP BY name"
-
-        query = f"""
-            SELECT 
-                ws.id,
-                ws.name, 
-                ws.location,
-                ws.size,
-                ws.intensity,
-                ws.alt_avg,
-                ws.status,
-                ws.max_temp,
-                ws.min_temp,
-                ws.avg_latitude,
-                ws.avg_longitude,
-                ws.flights,
-                ws.num_data_points,
-                ws.first_time_stamp, 
-                ws.time_stamp,
-                ws.last_flight_id
-            FROM wildfire_status ws
-            JOIN ({subquery}) latest 
-              ON ws.name = latest.name 
-             AND ws.time_stamp = latest.max_time_stamp
-            ORDER BY ws.time_stamp DESC
-        """
-
-        cursor.execute(query, params)
-        fires = [dict(row) for row in cursor.fetchall()]
+        query, params = current_fires_query(filter_type)
+        await self.write_cached_json((data_version.WILDFIRE_STATUS,), lambda: self.fetch_rows(query, params))
+
+    @staticmethod
+    def _history_row(row):
+        raw_ts       = row["time_stamp"]
+        raw_first_ts = row["first_time_stamp"]
+
+        ts = datetime.fromtimestamp(raw_ts / 1e9).isoformat()
+        first_ts = (
+            datetime.fromtimestamp(raw_first_ts / 1e9).isoformat()
+            if raw_first_ts else None
+        )
 
-        self.set_header("Content-Type", "application/json")
-        self.write(json.dumps(fires))
+        return {
+            "id":               row["id"],
+            "time_stamp":       ts,
+            "first_time_stamp": first_ts,
+            "size":             row["size"],
+            "flights":          row["flights"],
+            "intensity":        row["intensity"],
+            "max_temp":         row["max_temp"],
+            "min_temp":         row["min_temp"],
+            "alt_avg":          row["alt_avg"],
+            "avg_latitude":     row["avg_latitude"],
+            "avg_longitude":    row["avg_longitude"],
+            "num_data_points":  row["num_data_points"],
+            "status":           row["status"],
+            "last_flight_id":   row["last_flight_id"]
+        }
 
 def make_app():
     static_path = os.path.join(os.path.dirname(__file__), "app/static")
@@ -771,11 +1100,15 @@ def make_app():
         (r"/get_database", DatabaseQueryHandler),
         (r"/download_csv", DownloadCSVHandler),
         (r"/sync_firebase", FirebaseSyncHandler),
+        (r"/api/db_stats", DatabaseStatsHandler),
         (r"/add_packet", AddPacketHandler),
+        (r"/add_packets", AddPacketsHandler),
         (r"/fire_comparison", FireComparisonHandler),
         (r"/test", TestHandler),
         (r"/api/fires", FireDataHandler),
         (r"/api/thermal/([^/]+)", ThermalDataHandler),
+        (r"/api/rollup/([^/]+)", RollupHandler),
+        (r"/api/heatmap/([^/]+)", HeatmapGridHandler),
         (r"/api/flights", FlightDataHandler),
         (r"/api/flights/(\d+)", FlightDataHandler),
         (r"/api/flights/(.*)", FlightDataHandler),
@@ -795,12 +1128,12 @@ def make_app():
 def import_packets_from_file(file_path):
     """Reads a text file and processes each row as a packet."""
     try:
-        with open(file_path, 'r') as file:
+        with open(file_path, 'r') as file, IngestWriter() as writer:
             for line in file:
                 try:
                     packet_data = json.loads(line.strip())
                     name = packet_data.get("name", "Unnamed Fire")
-                    process_packet(packet_data, name, "active")
+                    writer.submit(packet_data, name, "active")
                 except json.JSONDecodeError as e:
                     print(f"Error decoding packet: {e}")
                 except Exception as e:
@@ -836,32 +1169,60 @@ def avionics_integration(output):
             output.put(export)
             enabled = 1
 
-def start_app():
+def start_app(live_queue=None):
     # Create and start the app
+    db_pool.configure(options.db_path)
+    query_executor.configure(options.db_workers, options.heavy_requests)
     app = make_app()
     app.listen(options.port)
+
+    # Push packets committed here, and by the radio process via live_queue,
+    # to the /ws/live subscribers
+    broker = live_broker.get_broker()
+    broker.attach(tornado.ioloop.IOLoop.current())
+    add_listener(broker.publish)
+    if live_queue is not None:
+        live_broker.start_queue_relay(live_queue, broker)
+
+    if options.firebase_sync_interval > 0:
+        FirebaseSyncWorker(FirebaseSync(), interval=options.firebase_sync_interval).start()
     
     print(f"Pyro Visualization server running at http://localhost:{options.port}/")
     print(f"Debug mode: {options.debug}")
 
-    tornado.ioloop.IOLoop.current().start()
+    # Let a terminate() from the parent unwind through the shutdown flush
+    signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+    try:
+        tornado.ioloop.IOLoop.current().start()
+    finally:
+        flush_flight_end_times()
+
+
+def flush_flight_end_times():
+    """Write the flight end times still batched in this process."""
+    try:
+        with db_pool.connection() as conn:
+            flush_flights(conn, force=True)
+    except Exception as e:
+        print(f"Error writing flight end times: {e}")
+
 
+def start_server(live_queue=None):
+    # Parse command line arguments
+    parse_command_line()
+    db_pool.configure(options.db_path)
 
-def start_server():
     # Initialize database
     init_db()
 
     # Optionally import test packets
     import_packets_from_file('_packets.txt')
     
-    # Parse command line arguments
-    parse_command_line()
-    
     # Start the avionics integration process and main server process
     q1 = mp.Queue()
     p1 = mp.Process(target=avionics_integration, args=(q1,))
 
-    p_server = mp.Process(target=start_app)
+    p_server = mp.Process(target=start_app, args=(live_queue,))
     p1.start()
     p_server.start()
     
@@ -0,0 +1,61 @@
+import time
+
+# Per-table data version counters.
+#
+# Every transaction that changes what the API serves from a table bumps that
+# table's counter in data_version, so a cached response tagged with the
+# versions it was built from is stale exactly when one of them has moved. The
+# counters live in the database because the radio process ingests on its own
+# connection in another process. Bookkeeping writes (the Firebase sync marks)
+# do not bump them.
+
+WILDFIRES = "wildfires"
+WILDFIRE_STATUS = "wildfire_status"
+TABLES = (WILDFIRES, WILDFIRE_STATUS)
+
+# Bumped only when wildfires rows already written are rewritten in place (the
+# telemetry merge), not when rows are added. Aggregates that fold in new rows
+# only (FireWindow, in whichever process ingests) are rebuilt when it moves.
+WILDFIRE_POSITIONS = "wildfire_positions"
+
+
+def fire(name):
+    """Counter of the rows added to one fire's wildfires rows, for caches of
+    a single fire that ingest into other fires should leave alone. Created
+    by its first bump_fires, read() gives 0 until then."""
+    return f"{WILDFIRES}:{name}"
+
+
+def bump(cursor, *tables):
+    """Advance the versions of tables inside the caller's transaction."""
+    cursor.execute(
+        f"UPDATE data_version SET version = version + 1, updated_at = ? "
+        f"WHERE key IN ({', '.join('?' * len(tables))})",
+        (time.time(), *tables)
+    )
+
+
+def bump_fires(cursor, names):
+    """Advance the fire() counters of names inside the caller's transaction."""
+    now = time.time()
+    cursor.executemany(
+        "INSERT INTO data_version (key, version, updated_at) VALUES (?, 1, ?) "
+        "ON CONFLICT(key) DO UPDATE SET version = version + 1, updated_at = excluded.updated_at",
+        [(fire(name), now) for name in names]
+    )
+
+
+def read(conn, tables):
+    """Returns (versions, updated_at) for tables: the version tuple in the
+    order given and the latest change time (epoch seconds).
+    """
+    rows = dict(
+        (row[0], (row[1], row[2]))
+        for row in conn.execute(
+            f"SELECT key, version, updated_at FROM data_version WHERE key IN ({', '.join('?' * len(tables))})",
+            tables
+        )
+    )
+    versions = tuple(rows.get(table, (0, 0.0))[0] for table in tables)
+    updated_at = max((rows.get(table, (0, 0.0))[1] for table in tables), default=0.0)
+    return versions, updated_at
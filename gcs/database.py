@@ -1,192 +1,258 @@
 import sqlite3
+import db_pool
 from typing import List, Tuple, Optional
 from datetime import datetime, timedelta
 import pandas as pd
-import requests
 import math
-import firebase_admin
-from firebase_admin import credentials, db
 import time
 from threading import Thread
+from migrations import migrate
+from fire_window import FireWindow
+from geocoding import ReverseGeocoder, UNKNOWN_LOCATION
+from firebase_sync import FirebaseSync
+from rollups import RollupBatch, rebuild as rebuild_rollups
+import data_version
+from telemetry_merge import align, TELEMETRY_FIELDS, MAX_GAP_NS, MERGE_WINDOW_NS
+from dedup_window import MAX_PACKET_ID
 
 _packet_counts: dict[str, int] = {}
 
-# Firebase Config
-FIREBASE_CREDENTIALS_PATH = "firebase_credentials.json"
-FIREBASE_DB_URL = "https://pyro-fire-tracking-default-rtdb.firebaseio.com/"
+# Set use_network=False to run fully offline (no background nominatim requests)
+_geocoder = ReverseGeocoder(use_network=True)
 
-# Initialize Firebase
-if not firebase_admin._apps:
-    cred = credentials.Certificate(FIREBASE_CREDENTIALS_PATH)
-    firebase_admin.initialize_app(cred, {"databaseURL": FIREBASE_DB_URL})
+# Called with a list of event dicts after every commit of new packets or fire
+# status snapshots (live_broker fans them out to WebSocket clients)
+_listeners = []
 
-firebase_ref = db.reference("wildfires")
+def add_listener(listener):
+    _listeners.append(listener)
 
-def init_db():
-    conn = sqlite3.connect("wildfire_data.db")
-    cursor = conn.cursor()
-    
-    cursor.execute("PRAGMA journal_mode=WAL;")
-    
-    # sync_status refers to whether data is synced to Firebase
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS wildfires (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            pac_id INTEGER NOT NULL DEFAULT -1,
-            latitude REAL,
-            longitude REAL,
-            alt REAL,
-            high_temp REAL,
-            low_temp REAL,
-            date_received STRING,
-            time_received STRING,
-            status TEXT DEFAULT 'active',
-            sync_status TEXT DEFAULT 'pending', 
-            time_stamp REAL,
-            heading REAL,
-            speed REAL,
-            flight_id INTEGER NOT NULL DEFAULT -1,
-            session_id STRING
-        )
-        """
-    )
-    
-    init_wildfire_status_db()
-    init_flights_db()
-    conn.commit()
-    conn.close()
+def remove_listener(listener):
+    _listeners.remove(listener)
 
-def is_data_in_firebase(name, date_received, time_received):
-    """Check if wildfire data exists in Firebase"""
-    try:
-        existing_data = firebase_ref.child("wildfires").get()
+def _notify(events):
+    if not events:
+        return
+    for listener in list(_listeners):
+        try:
+            listener(events)
+        except Exception as e:
+            print(f"Error notifying live listener: {e}")
 
-        if isinstance(existing_data, dict):
-            for key, fire in existing_data.items():
-                if isinstance(fire, dict) and fire.get("name") == name and fire.get("date_received") == date_received and fire.get("time_received") == time_received:
-                    return True
+def init_db():
+    """Open the database and bring its schema up to date."""
+    with db_pool.connection() as conn:
+        migrate(conn)
 
-        return False
+def sync_to_firebase(remote=None):
+    """Push all pending SQLite data to Firebase in chunked multi-path updates.
 
+    For continuous syncing run a firebase_sync.FirebaseSyncWorker instead.
+    """
+    try:
+        synced = FirebaseSync(remote=remote).sync_once()
+        if synced:
+            print(f"Successfully synced {synced} records to Firebase.")
+        else:
+            print("No new data to sync.")
+        return synced
     except Exception as e:
-        print(f"⚠ Firebase query failed: {e}")
-        return False
+        print(f"Failed to sync batch: {e}")
+        return 0
 
-def sync_to_firebase():
-    """Sync all pending SQLite data to Firebase using batch writes."""
-    conn = sqlite3.connect("wildfire_data.db")
-    cursor = conn.cursor()
-
-    # Fetch all unsynced data
-    cursor.execute("SELECT * FROM wildfires WHERE sync_status = 'pending'")
-    unsynced_data = cursor.fetchall()
-
-    if not unsynced_data:
-        print("No new data to sync.")
-        return
-
-    print(f"Found {len(unsynced_data)} pending records to sync...")
-
-    batch_data = {}
-    ids_to_update = []
-
-    for row in unsynced_data:
-        fire_data = {
-            "name": row[1],
-            "pac_id": row[2],
-            "latitude": row[3],
-            "longitude": row[4],
-            "alt": row[5],
-            "high_temp": row[6],
-            "low_temp": row[7],
-            "date_received": row[8],
-            "time_received": row[9],
-            "status": row[10],
-            "sync_status": row[11],
-            "time_stamp": row[12],
-            "heading": row[13],
-            "speed": row[14],
-            "flight_id": row[15],
-            "session_id": row[16]
-        }
-
-        # Add to batch only if it doesn't already exist in Firebase
-        if not is_data_in_firebase(fire_data["name"], fire_data["date_received"], fire_data["time_received"]):
-            batch_data[f"wildfires/{row[0]}"] = fire_data 
-            ids_to_update.append(row[0])
-
-    if batch_data:
-        try:
-            firebase_ref.update(batch_data) 
-            print(f"Successfully synced {len(batch_data)} records to Firebase.")
+def _packet_row(packet, name, status, flight_id, date_received, time_received):
+    """Build the wildfires INSERT parameters for a single decoded packet."""
+    ns24h = 24 * 60 * 60 * 1_000_000_000
+    gps_data = packet.get("gps_data", [0.0, 0.0])
+    return (
+        name,
+        packet.get("pac_id", -1),
+        gps_data[0],
+        gps_data[1],
+        packet.get("alt", 0.0),
+        packet.get("high_temp", 0.0),
+        packet.get("low_temp", 0.0),
+        status,
+        date_received,
+        time_received,
+        "pending",
+        packet.get("time_stamp", time.time_ns() - (1/200) * ns24h),
+        0,  # heading, filled in by update_mission_data
+        0,  # speed, filled in by update_mission_data
+        flight_id,
+        packet.get("session_id", -1),
+    )
 
-            cursor.executemany("UPDATE wildfires SET sync_status = 'synced' WHERE id = ?", [(id,) for id in ids_to_update])
-            conn.commit()
+# Largest integer SQLite stores, a bigger Python int fails the whole INSERT
+MAX_SQLITE_INTEGER = 2**63 - 1
+
+def _number(packet, key, default=None):
+    value = packet.get(key, default)
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError(f"{key} must be a finite number")
+    return value
+
+def validate_packet(packet):
+    """Check a decoded packet from an untrusted source (the HTTP ingest).
+
+    Returns the packet in the radio format process_packet_batch expects:
+    pac_id, gps_data, alt, high_temp, low_temp, session_id and time_stamp.
+    The position may be given as gps_data or as latitude/longitude.
+    Raises ValueError naming the first bad field.
+    """
+    if not isinstance(packet, dict):
+        raise ValueError("packet must be an object")
+
+    pac_id = packet.get("pac_id")
+    if isinstance(pac_id, bool) or not isinstance(pac_id, int):
+        raise ValueError("pac_id must be an integer")
+    if not 0 <= pac_id <= MAX_PACKET_ID:
+        raise ValueError(f"pac_id must be between 0 and {MAX_PACKET_ID}")
+
+    time_stamp = _number(packet, "time_stamp")
+    if not 0 < time_stamp <= MAX_SQLITE_INTEGER:
+        raise ValueError("time_stamp must be positive (ns since the epoch) and fit in 64 bits")
+
+    if "gps_data" in packet:
+        gps_data = packet["gps_data"]
+        if not isinstance(gps_data, (list, tuple)) or len(gps_data) != 2:
+            raise ValueError("gps_data must be [latitude, longitude]")
+        position = {"latitude": gps_data[0], "longitude": gps_data[1]}
+    else:
+        position = packet
+    latitude = _number(position, "latitude")
+    longitude = _number(position, "longitude")
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError("latitude/longitude out of range")
+
+    session_id = packet.get("session_id", -1)
+    if not isinstance(session_id, (str, int)) or isinstance(session_id, bool):
+        raise ValueError("session_id must be a string")
+    if isinstance(session_id, int) and not -MAX_SQLITE_INTEGER - 1 <= session_id <= MAX_SQLITE_INTEGER:
+        raise ValueError("session_id must fit in 64 bits")
+
+    return {
+        "pac_id": pac_id,
+        "gps_data": [latitude, longitude],
+        "alt": _number(packet, "alt", 0.0),
+        "high_temp": _number(packet, "high_temp", 0.0),
+        "low_temp": _number(packet, "low_temp", 0.0),
+        "session_id": session_id,
+        "time_stamp": time_stamp,
+    }
+
+def _packet_event(row_id, row):
+    """Live event for an inserted _packet_row, in the /api/thermal row format."""
+    return {
+        "type": "packet",
+        "id": row_id,
+        "name": row[0],
+        "flight_id": row[14],
+        "latitude": row[2],
+        "longitude": row[3],
+        "altitude": row[4],
+        "high_temp": row[5],
+        "low_temp": row[6],
+        "time_stamp": row[11],
+    }
+
+def process_packet_batch(batch, conn):
+    """Insert a batch of (packet, name, status) tuples in a single transaction.
+
+    Flight bookkeeping and the periodic fire status refresh run on the same
+    connection, so a batch costs one commit instead of one per packet.
+    Flight lookups come from the in-memory session map and flight end times
+    are written by flush_flights on an interval.
+    Packets already stored (same session_id, pac_id and time_stamp) are
+    dropped by the unique index, inserted ones are added to the rollups and
+    published to the live listeners once committed.
+    Returns (inserted, duplicates).
+    """
+    if not batch:
+        return 0, 0
+
+    now = datetime.now()
+    date_received = now.strftime("%Y-%m-%d")
+    time_received = now.strftime("%H:%M:%S")
 
-        except Exception as e:
-            print(f"Failed to sync batch: {e}")
+    cursor = conn.cursor()
+    rollup = RollupBatch()
+    events = [] if _listeners else None
+    inserted = 0
+    duplicates = 0
+    fires = set()
+    flushed = {}
+    try:
+        for packet, name, status in batch:
+            session_id = packet.get("session_id", -1)
+            flight_id = process_new_flight(name, session_id, conn, events) or 0
+            row = _packet_row(packet, name, status, flight_id, date_received, time_received)
+
+            cursor.execute(
+                """
+                INSERT OR IGNORE INTO wildfires (
+                    name, pac_id, latitude, longitude, alt, high_temp, low_temp, 
+                    status, date_received, time_received, sync_status, time_stamp,
+                    heading, speed, flight_id, session_id
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                row
+            )
+            if cursor.rowcount == 0:
+                duplicates += 1
+                continue
+            inserted += 1
+            fires.add(name)
+            rollup.add(name, flight_id, row[2], row[3], row[4], row[5], row[6], row[11])
+            if events is not None:
+                events.append(_packet_event(cursor.lastrowid, row))
+            _packet_counts[name] = _packet_counts.get(name, 0) + 1
+            update_flights(flight_id, session_id, name, "ulog_filename", conn)
+
+        rollup.write(cursor)
+        if inserted:
+            data_version.bump(cursor, data_version.WILDFIRES)
+            data_version.bump_fires(cursor, fires)
+        flushed = flush_flights(conn)
+        conn.commit()
+    except BaseException:
+        # Also on SystemExit from a SIGTERM handler, so the caller's retry
+        # does not see this batch's flights
+        conn.rollback()
+        requeue_flights(flushed)
+        # Flights created in this batch were rolled back, reload from the table
+        _flight_ids.clear()
+        raise
+
+    # Update fire status every 100 packets. The packets are committed by now,
+    # so a failure here is logged and left for the next batch to retry
+    # rather than failing (and getting retried) the whole batch.
+    due = [name for name, count in _packet_counts.items() if count >= 100]
+    status_events = len(events) if events is not None else 0
+    try:
+        for name in due:
+            update_fire_status(name, conn, events)
+        conn.commit()
+        for name in due:
+            _packet_counts[name] = 0
+    except Exception as e:
+        conn.rollback()
+        if events is not None:
+            del events[status_events:]
+        print(f"Error updating fire status: {e}")
+    _notify(events)
 
-    conn.close()
+    return inserted, duplicates
 
 def process_packet(packet, name, status="active"):
     """Process new packet and add to database if it doesn't exist already."""
     try:
-        ns24h = 24 * 60 * 60 * 1_000_000_000 
-        pac_id = packet.get("pac_id", -1)
-        session_id = packet.get("session_id", -1)
-        flight_id = process_new_flight(name, session_id) or 0
-        gps_data = packet.get("gps_data", [0.0, 0.0])
-        latitude, longitude = gps_data[0], gps_data[1]
-        alt = packet.get("alt", 0.0)
-        high_temp = packet.get("high_temp", 0.0)
-        low_temp = packet.get("low_temp", 0.0)
-        time_stamp = packet.get("time_stamp", time.time_ns() - (1/200) * ns24h)
-        heading = 0
-        speed = 0
-
-        now = datetime.now()
-        date_received = now.strftime("%Y-%m-%d")
-        time_received = now.strftime("%H:%M:%S")
-
-        conn = sqlite3.connect("wildfire_data.db", timeout=5)
-        cursor = conn.cursor()
+        with db_pool.connection() as conn:
+            inserted, _ = process_packet_batch([(packet, name, status)], conn)
 
-        # Check for duplicate packet based on pac_id and time_stamp
-        cursor.execute(
-            "SELECT COUNT(*) FROM wildfires WHERE pac_id = ? AND time_stamp = ?",
-            (pac_id, time_stamp)
-        )
-        duplicate_count = cursor.fetchone()[0]
-        if duplicate_count > 0:
-            #print(f"Duplicate packet (pac_id: {pac_id}, time_stamp: {time_stamp}) found. Skipping insertion.")
-            conn.close()
-            return
-
-        cursor.execute(
-            """
-            INSERT INTO wildfires (
-                name, pac_id, latitude, longitude, alt, high_temp, low_temp, 
-                status, date_received, time_received, sync_status, time_stamp,
-                heading, speed, flight_id, session_id
-            )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (name, pac_id, latitude, longitude, alt, high_temp, low_temp, status,
-             date_received, time_received, "pending", time_stamp, heading, speed, flight_id, session_id)
-        )
-
-        conn.commit()
-        conn.close()
-
-        # Update fire status every 100 packets
-        _packet_counts[name] = _packet_counts.get(name, 0) + 1
-        if _packet_counts[name] >= 100:
-            update_fire_status(name)
-            _packet_counts[name] = 0
-
-        update_flights(flight_id, session_id, name, "ulog_filename")
+        if not inserted:
+            print(f"Duplicate packet (pac_id: {packet.get('pac_id', -1)}, time_stamp: {packet.get('time_stamp')}) skipped.")
 
         # Run Firebase sync in a parallel thread
         #sync_thread = Thread(target=sync_to_firebase)
@@ -199,7 +265,7 @@ def process_packet(packet, name, status="active"):
 def fetch_fire_list(status: str = "active") -> List[dict]:
     """Returns list of all active fires."""
     try:
-        conn = sqlite3.connect('wildfire_data.db')
+        conn = db_pool.get_connection()
         cursor = conn.cursor()
         
         query = '''
@@ -246,145 +312,100 @@ def fetch_fire_list(status: str = "active") -> List[dict]:
     except Exception as e:
         print(f"Error fetching fire list: {e}")
         return []
-    finally:
-        if conn:
-            conn.close()
 
 
-def fetch_heatmap_data(name: str, date: Optional[str] = None, time: Optional[str] = None) -> List[dict]:
-    conn = sqlite3.connect('wildfire_data.db')
-    cursor = conn.cursor()
+def heatmap_query(name: Optional[str] = None, date: Optional[str] = None, time: Optional[str] = None):
+    """Query and params of the heatmap points, of one fire or of all of them."""
     query = '''
-        SELECT latitude, longitude, high_temp, low_temp, date_received, time_received, time_stamp, alt
-        FROM wildfires 
-        WHERE name = ?
+        SELECT latitude, longitude, high_temp, low_temp, date_received, time_received, time_stamp, alt AS altitude
+        FROM wildfires
     '''
-    params = [name]
-
-    if date:
-        query += ' AND date_received <= ?'
-        params.append(date)
-    if time:
-        query += ' AND time_received <= ?'
-        params.append(time)
-
-    cursor.execute(query, params)
-    results = cursor.fetchall()
-    conn.close()
-    return [
-        {"latitude": row[0], "longitude": row[1], "high_temp": row[2], "low_temp": row[3], "date_received": row[4], "time_received": row[5], "time_stamp": row[6], "altitude": row[7]}
-        for row in results
-    ]
+    params = []
+    if name:
+        query += ' WHERE name = ?'
+        params.append(name)
+
+        if date:
+            query += ' AND date_received <= ?'
+            params.append(date)
+        if time:
+            query += ' AND time_received <= ?'
+            params.append(time)
+    return query, params
+
+def fetch_heatmap_data(name: str, date: Optional[str] = None, time: Optional[str] = None) -> List[dict]:
+    cursor = db_pool.get_connection().cursor()
+    cursor.execute(*heatmap_query(name, date, time))
+    columns = [d[0] for d in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
 
 def fetch_all_heatmap_data() -> List[dict]:
-    conn = sqlite3.connect('wildfire_data.db')
-    cursor = conn.cursor()
-    query = '''
-        SELECT latitude, longitude, high_temp, low_temp, date_received, time_received, alt
-        FROM wildfires
-    '''
-    cursor.execute(query)
-    results = cursor.fetchall()
-    conn.close()
-    return [
-        {"latitude": row[0], "longitude": row[1], "high_temp": row[2], "low_temp": row[3], "date_received": row[4], "time_received": row[5], "time_stamp": row[6], "altitude": row[7]}
-        for row in results
-    ]
+    return fetch_heatmap_data(None)
 
 # Wildfire Status Db
 MIN_TEMP_THRESHOLD = 200
 
-def init_wildfire_status_db():
-    """Initialize Wildfire Status Table."""
-    conn = sqlite3.connect("wildfire_data.db")
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS wildfire_status (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT, 
-            location TEXT,
-            size REAL DEFAULT 0.0,
-            intensity REAL DEFAULT 0.0,
-            alt_avg REAL DEFAULT 0.0,
-            status TEXT DEFAULT 'active',
-            max_temp REAL DEFAULT 0.0,
-            min_temp REAL DEFAULT 0.0,
-            avg_latitude REAL DEFAULT 0.0,
-            avg_longitude REAL DEFAULT 0.0,
-            flights REAL DEFAULT 0.0,
-            num_data_points REAL DEFAULT 0.0,
-            first_time_stamp REAL, 
-            time_stamp REAL,
-            last_flight_id INTEGER DEFAULT NULL
-        );
-        """
-    )
-    conn.commit()
-    conn.close()
+# Per-fire sliding 24h aggregates, seeded once per process and then kept
+# current from newly written rows only
+_fire_windows: dict[str, FireWindow] = {}
 
 # Each record represents a data aggregate update from the past 24 hours
-def update_fire_status(name: str):
-    """Update Wildfire Status Table with all data from past 24 hours for given fire."""
-
-    conn = sqlite3.connect("wildfire_data.db")
+def update_fire_status(name: str, conn: Optional[sqlite3.Connection] = None, events: Optional[list] = None):
+    """Update Wildfire Status Table with all data from past 24 hours for given fire.
+
+    The aggregates come from the fire's FireWindow, so a snapshot reads only
+    the rows added since the previous one and merges per-minute buckets.
+    When conn is given the snapshot is written on that connection and the
+    caller commits (the batched ingest path) and the status event is
+    appended to events for it to publish; otherwise it is committed on the
+    thread's pooled connection and published right away.
+    """
+    if conn is None:
+        events = []
+        with db_pool.connection() as conn:
+            update_fire_status(name, conn, events)
+        _notify(events)
+        return
     cursor = conn.cursor()
 
-    cursor.execute(
-        "SELECT MAX(time_stamp) FROM wildfires WHERE name = ?",
-        (name,)
-    )
-    result = cursor.fetchone()
-    if not result or result[0] is None:
+    # catch_up only sees new rows, so rows rewritten by the telemetry merge
+    # (possibly in another process) mean reading the window again
+    (positions_version,), _ = data_version.read(cursor, (data_version.WILDFIRE_POSITIONS,))
+    window = _fire_windows.get(name)
+    if window is None or window.positions_version != positions_version:
+        window = _fire_windows[name] = FireWindow(name, MIN_TEMP_THRESHOLD)
+        window.positions_version = positions_version
+        window.load(cursor)
+    else:
+        window.catch_up(cursor)
+
+    if window.latest_ts is None:
         print(f"No data at all for fire {name}.")
-        conn.close()
         return
 
-    window_end = result[0]
-    ns24h = 24 * 60 * 60 * 1_000_000_000
-    window_start = window_end - ns24h
+    window_end = window.latest_ts
+    window_start = window_end - window.window_ns
 
-    # Find all data in last 24 hours by fire name
-    cursor.execute(
-        """
-        SELECT latitude, longitude, high_temp, low_temp, alt, flight_id, time_stamp 
-          FROM wildfires 
-         WHERE name = ?
-           AND time_stamp BETWEEN ? AND ?
-           AND high_temp >= ?
-        """,
-        (name, window_start, window_end, MIN_TEMP_THRESHOLD)
-    )
-    rows = cursor.fetchall()
-    if not rows:
+    snapshot = window.snapshot()
+    if snapshot is None:
         print(f"No recent data for fire {name} in the last 24h window ending at {window_end}.")
-        conn.close()
         return
 
-    latitudes   = [r[0] for r in rows]
-    longitudes  = [r[1] for r in rows]
-    high_temps  = [r[2] for r in rows]
-    low_temps   = [r[3] for r in rows]
-    altitudes   = [r[4] for r in rows]
-    flight_ids  = {r[5] for r in rows}
-    timestamps  = [r[6] for r in rows]
-    intensities = [(h + l) / 2 for h, l in zip(high_temps, low_temps)]
-
-    num_points          = len(intensities)
-    new_intensity       = sum(intensities) / num_points
-    new_alt_avg         = sum(altitudes) / num_points
-    new_avg_lat         = sum(latitudes) / num_points
-    new_avg_lon         = sum(longitudes) / num_points
-    new_max_temp        = max(high_temps)
-    new_min_temp        = min(low_temps)
-    new_flights         = len(flight_ids)
-    new_first_time_stamp= min(timestamps)
-    new_time_stamp      = max(timestamps)
-    new_last_flight_id  = max(flight_ids)
+    num_points          = snapshot["num_data_points"]
+    new_intensity       = snapshot["intensity"]
+    new_alt_avg         = snapshot["alt_avg"]
+    new_avg_lat         = snapshot["avg_latitude"]
+    new_avg_lon         = snapshot["avg_longitude"]
+    new_max_temp        = snapshot["max_temp"]
+    new_min_temp        = snapshot["min_temp"]
+    new_flights         = snapshot["flights"]
+    new_first_time_stamp= snapshot["first_time_stamp"]
+    new_time_stamp      = snapshot["time_stamp"]
+    new_last_flight_id  = snapshot["last_flight_id"]
 
     # Size Calculation
-    max_lat = max(latitudes); min_lat = min(latitudes)
-    max_lon = max(longitudes); min_lon = min(longitudes)
+    max_lat = snapshot["max_lat"]; min_lat = snapshot["min_lat"]
+    max_lon = snapshot["max_lon"]; min_lon = snapshot["min_lon"]
     lat_diff = max_lat - min_lat
     lon_diff = max_lon - min_lon
     avg_lat_for_conv = (max_lat + min_lat) / 2
@@ -392,33 +413,99 @@ def update_fire_status(name: str):
     lon_diff_km = lon_diff * 111.32 * math.cos(math.radians(avg_lat_for_conv))
     new_size = abs(lat_diff_km * lon_diff_km)
 
-    location = get_nearest_city(new_avg_lat, new_avg_lon)
+    location = get_nearest_city(new_avg_lat, new_avg_lon, conn)
 
+    # Compare against the latest snapshot of an earlier time_stamp; a refresh
+    # without newer packets keeps the comparison of the snapshot it repeats
+    current = cursor.execute(
+        """
+        SELECT size, intensity, time_stamp, prev_size, prev_intensity, prev_time_stamp
+        FROM fire_current WHERE name = ?
+        """,
+        (name,)
+    ).fetchone()
+    if current is None:
+        previous = (None, None, None)
+    elif current[2] is not None and current[2] < new_time_stamp:
+        previous = tuple(current[0:3])
+    else:
+        previous = tuple(current[3:6])
+
+    snapshot_row = (
+        name, location, new_size, new_intensity, new_alt_avg,
+        new_avg_lat, new_avg_lon, new_flights, num_points,
+        new_first_time_stamp, new_time_stamp, "active",
+        new_max_temp, new_min_temp, new_last_flight_id,
+        *previous
+    )
     cursor.execute(
         """
         INSERT INTO wildfire_status (
             name, location, size, intensity, alt_avg,
             avg_latitude, avg_longitude, flights, num_data_points,
             first_time_stamp, time_stamp, status,
-            max_temp, min_temp, last_flight_id
+            max_temp, min_temp, last_flight_id,
+            prev_size, prev_intensity, prev_time_stamp
         )
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """,
-        (
-            name, location, new_size, new_intensity, new_alt_avg,
-            new_avg_lat, new_avg_lon, new_flights, num_points,
-            new_first_time_stamp, new_time_stamp, "active",
-            new_max_temp, new_min_temp, new_last_flight_id
+        snapshot_row
+    )
+    # Same transaction: fire_current always holds the snapshot just written
+    cursor.execute(
+        """
+        INSERT OR REPLACE INTO fire_current (
+            id, name, location, size, intensity, alt_avg,
+            avg_latitude, avg_longitude, flights, num_data_points,
+            first_time_stamp, time_stamp, status,
+            max_temp, min_temp, last_flight_id,
+            prev_size, prev_intensity, prev_time_stamp
         )
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        (cursor.lastrowid, *snapshot_row)
     )
+    data_version.bump(cursor, data_version.WILDFIRE_STATUS)
+
+    if events is not None:
+        events.append({
+            "type": "status",
+            "name": name,
+            "status": "active",
+            "location": location,
+            "size": new_size,
+            "intensity": new_intensity,
+            "alt_avg": new_alt_avg,
+            "avg_latitude": new_avg_lat,
+            "avg_longitude": new_avg_lon,
+            "flights": new_flights,
+            "num_data_points": num_points,
+            "first_time_stamp": new_first_time_stamp,
+            "time_stamp": new_time_stamp,
+            "max_temp": new_max_temp,
+            "min_temp": new_min_temp,
+            "last_flight_id": new_last_flight_id,
+        })
 
-    conn.commit()
-    conn.close()
     print(f"✓ Fire status for '{name}' updated using data from {window_start} to {window_end}.")
 
-def process_new_flight(name: str, session_id: str):
+# Write-through cache of (name, session_id) -> flight_id. A session keeps the
+# same flight for its whole life, so only its first packet touches the table.
+_flight_ids: dict[tuple, int] = {}
+
+def process_new_flight(name: str, session_id: str, conn: Optional[sqlite3.Connection] = None,
+                       events: Optional[list] = None):
     """Creates new record in the Flights table if new data is the first with given session ID."""
-    conn = sqlite3.connect("wildfire_data.db")
+    flight_id = _flight_ids.get((name, session_id))
+    if flight_id is not None:
+        return flight_id
+
+    if conn is None:
+        events = []
+        with db_pool.connection() as conn:
+            flight_id = process_new_flight(name, session_id, conn, events)
+        _notify(events)
+        return flight_id
     cursor = conn.cursor()
 
     # Check if this session already exists in the flights table
@@ -429,7 +516,7 @@ def process_new_flight(name: str, session_id: str):
     row = cursor.fetchone()
 
     if row:
-        conn.close()
+        _flight_ids[(name, session_id)] = row[0]
         return row[0]  # Return existing flight_id
 
     # Assign new flight_id
@@ -440,7 +527,7 @@ def process_new_flight(name: str, session_id: str):
     result = cursor.fetchone()
     last_flight_id = result[0] if result and result[0] is not None else 0
     new_flight_id = last_flight_id + 1
-    update_fire_status(name)
+    update_fire_status(name, conn, events)
 
     # Insert new session/flight mapping
     cursor.execute(
@@ -451,133 +538,191 @@ def process_new_flight(name: str, session_id: str):
         (new_flight_id, name, session_id, time.time())
     )
 
-    conn.commit()
-    conn.close()
-
+    _flight_ids[(name, session_id)] = new_flight_id
     print(f"New flight session '{session_id}' received for {name}. Assigned flight ID {new_flight_id}.")
     return new_flight_id
     
-def get_nearest_city(latitude: float, longitude: float) -> str:
-    """Returns nearest city from given coordinates."""
+def get_nearest_city(latitude: float, longitude: float, conn: Optional[sqlite3.Connection] = None) -> str:
+    """Returns nearest city from given coordinates.
+
+    Served from the geocode cache or the offline gazetteer, never blocking on
+    the network; nominatim refinements happen in the background.
+    """
     try:
-        url = f"https://nominatim.openstreetmap.org/reverse?format=json&lat={latitude}&lon={longitude}&zoom=5"
-        response = requests.get(url, headers={"User-Agent": "wildfire-status-app"})
-        if response.status_code == 200:
-            data = response.json()
-            return data.get("address", {}).get("city", "Unknown Location")
-        else:
-            print(f"Failed to fetch location: {response.status_code}, {response.text}")
-            return "Unknown Location"
+        return _geocoder.lookup(latitude, longitude, conn)
     except Exception as e:
         print(f"Error getting nearest city: {e}")
-        return "Unknown Location"
+        return UNKNOWN_LOCATION
   
-def update_mission_data(export):
-    """Updates wildfires table with avionics integration data."""
-    mission_time = export.get("time_stamp")
-    gps_lat = export.get("latitude", 0.0) / 1e6
-    gps_lon = export.get("longitude", 0.0) / 1e6
-    alt = export.get("altitude", 0.0)
-    heading = export.get("heading", 0.0)
-    speed = export.get("speed", 0.0)
-
-    tenmins_ns = 10 * 60 * 1_000_000_000
-    now_ns = time.time_ns()
-    tenminsago_ns = now_ns - tenmins_ns
-
-    conn = sqlite3.connect("wildfire_data.db")
+def update_mission_data(export, conn: Optional[sqlite3.Connection] = None):
+    """Store an avionics telemetry sample and merge telemetry into new packets.
+
+    Packets from the last MERGE_WINDOW_NS up to the sample that have not been
+    merged yet get the telemetry closest in time, interpolated between the
+    neighbouring samples (see telemetry_merge.align). Packets newer than the
+    sample wait for the next one. Returns the number of packets updated.
+    """
+    mission_time = export.get("time_stamp") or time.time_ns()
+    sample = (
+        int(mission_time),
+        export.get("latitude", 0.0) / 1e6,
+        export.get("longitude", 0.0) / 1e6,
+        export.get("altitude", 0.0),
+        export.get("heading", 0.0),
+        export.get("speed", 0.0),
+    )
+
+    if conn is None:
+        with db_pool.connection() as conn:
+            return update_mission_data(export, conn)
     cursor = conn.cursor()
 
     try:
-        # Get all wildfire records after this time that don't yet have mission data
-        # Also received in the last 10 minutes
-        select_query = """
-            SELECT id
-            FROM wildfires
-            WHERE time_stamp <= ?
-            AND (heading IS NULL    OR heading = 0
-                OR alt     IS NULL    OR alt     = 0)
-            ORDER BY time_stamp DESC
-        """
-        cursor.execute(select_query, (now_ns,))
-        rows_to_update = cursor.fetchall()
+        cursor.execute(
+            """
+            INSERT OR REPLACE INTO telemetry (time_stamp, latitude, longitude, alt, heading, speed)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            sample
+        )
 
-        if not rows_to_update:
-            print("No wildfire records found to update mission data.")
-            return
+        cursor.execute(
+            """
+            SELECT id, name, time_stamp
+              FROM wildfires
+             WHERE telemetry_ts IS NULL
+               AND time_stamp BETWEEN ? AND ?
+             ORDER BY time_stamp
+            """,
+            (mission_time - MERGE_WINDOW_NS, mission_time)
+        )
+        rows = cursor.fetchall()
+        if not rows:
+            conn.commit()
+            return 0
 
-        update_query = """
-            UPDATE wildfires
-            SET 
-                heading = ?,
-                speed = ?,
-                latitude = ?,
-                longitude = ?,
-                alt = ?,
-                sync_status = 'pending'
-            WHERE id = ?
-        """
+        cursor.execute(
+            f"""
+            SELECT time_stamp, {", ".join(TELEMETRY_FIELDS)}
+              FROM telemetry
+             WHERE time_stamp BETWEEN ? AND ?
+             ORDER BY time_stamp
+            """,
+            (rows[0][2] - MAX_GAP_NS, mission_time + MAX_GAP_NS)
+        )
+        samples = cursor.fetchall()
 
-        for row in rows_to_update: 
-            record_id = row[0]
-            cursor.execute(update_query, (heading, speed, gps_lat, gps_lon, alt, record_id))
+        matched, values, fix_ts = align(
+            [s[0] for s in samples], [s[1:] for s in samples], [row[2] for row in rows]
+        )
+        updates = [
+            (*values[i].tolist(), int(fix_ts[i]), rows[i][0])
+            for i in range(len(rows)) if matched[i]
+        ]
+        cursor.executemany(
+            """
+            UPDATE wildfires
+               SET latitude = ?,
+                   longitude = ?,
+                   alt = ?,
+                   heading = ?,
+                   speed = ?,
+                   telemetry_ts = ?,
+                   sync_status = 'pending'
+             WHERE id = ?
+            """,
+            updates
+        )
 
+        # Positions changed under the rollups, rebuild them. FireWindows are
+        # rebuilt by update_fire_status once it sees WILDFIRE_POSITIONS move.
+        changed = {}
+        for i in range(len(rows)):
+            if matched[i]:
+                name, ts = rows[i][1], rows[i][2]
+                low, high = changed.get(name, (ts, ts))
+                changed[name] = (min(low, ts), max(high, ts))
+        for name, (time_from, time_to) in changed.items():
+            rebuild_rollups(cursor, name, time_from, time_to)
+        if updates:
+            data_version.bump(cursor, data_version.WILDFIRES, data_version.WILDFIRE_POSITIONS)
         conn.commit()
-        print(f"✅ Updated mission data to {len(rows_to_update)} wildfire records.")
+
+        if updates:
+            print(f"✅ Updated mission data to {len(updates)} wildfire records.")
+        return len(updates)
 
     except Exception as e:
+        conn.rollback()
         print(f"❌ Error updating mission data: {e}")
-    finally:
-        conn.close()
+        return 0
 
 
 # Flight_id / Ulog Database
-def init_flights_db():
-    """Initialize Flights Table."""
-    conn = sqlite3.connect("wildfire_data.db")
+# Newest packet per (name, flight_id) not yet written to flights.time_ended,
+# as (time_ended, session_id, ulog_filename)
+_flight_end_times: dict[tuple, tuple] = {}
+_last_flight_flush = 0.0
+FLIGHT_FLUSH_INTERVAL = 5.0  # seconds between time_ended writes
+
+def update_flights(flight_id, session_id, name, ulog_filename, conn=None):
+    """Updates flights table each time a new packet is processed
+
+    With a conn (the ingest path) this only records the flight's new end time,
+    which flush_flights writes at most every FLIGHT_FLUSH_INTERVAL seconds.
+    Without one the change is written immediately.
+
+    The recorded end times live in this process only: whoever passes a conn
+    must call flush_flights(conn, force=True) and commit before it stops
+    (or the last FLIGHT_FLUSH_INTERVAL seconds of end times are lost).
+    """
+    _flight_end_times[(name, flight_id)] = (time.time_ns(), session_id, ulog_filename)
+
+    if conn is None:
+        with db_pool.connection() as conn:
+            flush_flights(conn, force=True)
+
+def flush_flights(conn, force=False):
+    """Write pending flight end times on conn. The caller commits, and
+    passes the returned end times to requeue_flights if it rolls back.
+
+    Without force this is a no-op until FLIGHT_FLUSH_INTERVAL seconds have
+    passed since the last write. Every process that ingests with a conn
+    forces it on shutdown: send_packet_to_server (on a None on its queue or
+    SIGTERM), IngestWriter, the server (start_app) and AddPacketsHandler
+    after each request.
+    """
+    global _last_flight_flush
+    now = time.monotonic()
+    if not _flight_end_times or (not force and now - _last_flight_flush < FLIGHT_FLUSH_INTERVAL):
+        return {}
+    _last_flight_flush = now
+
+    flushed = dict(_flight_end_times)
+    _flight_end_times.clear()
     cursor = conn.cursor()
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS flights (
-            flight_id INTEGER,
-            name TEXT,
-            session_id STRING,
-            ulog_filename TEXT,
-            time_started REAL,
-            time_ended
-        )
-        """
-    )
-    conn.commit()
-    conn.close()
-
-def update_flights(flight_id, session_id, name, ulog_filename):
-    """Updates flights table each time a new packet is processed"""
-    conn = sqlite3.connect("wildfire_data.db")
-    cursor = conn.cursor()
-
-    cursor.execute("SELECT COUNT(*) FROM flights WHERE flight_id = ? AND name = ?", (flight_id, name,))
-    count = cursor.fetchone()[0]
-
-    if count == 0:
-        # Insert new flight with current timestamp
-        time_started = time.time_ns()
-        cursor.execute(
-            """
-            INSERT INTO flights (flight_id, name, session_id, ulog_filename, time_started, time_ended)
-            VALUES (?, ?, ?, ?, ?, ?)
-            """,
-            (flight_id, name, session_id, ulog_filename, time_started, time_started)
-        )
-        conn.commit()
-    else:
+    for (name, flight_id), (time_ended, session_id, ulog_filename) in flushed.items():
         cursor.execute(
             """
             UPDATE flights
             SET time_ended = ?
-            WHERE flight_id = ?
+            WHERE name = ? AND flight_id = ?
             """,
-            (time.time_ns(), flight_id)
+            (time_ended, name, flight_id)
         )
-        conn.commit()
-        conn.close()
+        if cursor.rowcount == 0:
+            # Insert new flight with current timestamp
+            cursor.execute(
+                """
+                INSERT INTO flights (flight_id, name, session_id, ulog_filename, time_started, time_ended)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (flight_id, name, session_id, ulog_filename, time_ended, time_ended)
+            )
+    return flushed
+
+def requeue_flights(flushed):
+    """Put end times returned by flush_flights back after their transaction
+    was rolled back, unless the flight has a newer one by now."""
+    for key, value in flushed.items():
+        _flight_end_times.setdefault(key, value)
@@ -0,0 +1,220 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# Connection management for wildfire_data.db.
+#
+# Every module gets its connections from here so they all point at the
+# configured database and carry the same pragmas. get_connection() returns a
+# per-thread pooled connection that stays open for the life of the thread,
+# connect() a dedicated one the caller closes (long-lived writer threads).
+# Connection setup and every statement are timed; stats() reports the totals
+# and statements slower than SLOW_QUERY_SECONDS are logged.
+
+DEFAULT_PATH = "wildfire_data.db"
+MEMORY_PATH = ":memory:"
+
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",    # WAL is still durable across application crashes
+    "cache_size": -65536,       # 64 MiB page cache
+    "mmap_size": 268435456,     # 256 MiB memory-mapped reads
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,       # ms to wait on a locked database
+}
+
+SLOW_QUERY_SECONDS = 0.25
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_local = threading.local()
+_path = DEFAULT_PATH
+_uri = False
+_pragmas = dict(PRAGMAS)
+_generation = 0
+_memory_anchor = None     # keeps a shared in-memory database alive
+
+_connect_count = 0
+_connect_seconds = 0.0
+_query_stats = {}         # sql -> [count, total_seconds, max_seconds]
+
+
+def _record_query(sql, seconds):
+    key = " ".join(sql.split())
+    with _lock:
+        entry = _query_stats.get(key)
+        if entry is None:
+            _query_stats[key] = [1, seconds, seconds]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+            if seconds > entry[2]:
+                entry[2] = seconds
+    if seconds >= SLOW_QUERY_SECONDS:
+        logger.warning(f"Slow query ({seconds * 1000:.1f} ms): {key[:200]}")
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor that records how long each statement takes to execute."""
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            _record_query(sql, time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _record_query(sql, time.perf_counter() - start)
+
+
+class TimedConnection(sqlite3.Connection):
+    """Connection whose cursors (and shortcut execute calls) are timed."""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def configure(path=None, pragmas=None):
+    """Point all new connections at path (":memory:" for a shared in-memory
+    database) and optionally override pragmas. Pooled connections opened
+    before the call are replaced on their next use.
+    """
+    global _path, _uri, _pragmas, _generation, _memory_anchor
+    with _lock:
+        _generation += 1
+        if pragmas is not None:
+            _pragmas = {**PRAGMAS, **pragmas}
+        if _memory_anchor is not None:
+            _memory_anchor.close()
+            _memory_anchor = None
+
+        path = path or DEFAULT_PATH
+        if path == MEMORY_PATH:
+            # One in-memory database shared by every connection of this process
+            _path = f"file:pyro-memory-{os.getpid()}-{_generation}?mode=memory&cache=shared"
+            _uri = True
+        else:
+            _path = path
+            _uri = False
+
+    if _uri:
+        _memory_anchor = connect()
+
+
+def db_path():
+    """The configured database path (a URI for in-memory databases)."""
+    return _path
+
+
+def connect(path=None):
+    """Open a new connection with the configured pragmas. The caller closes it."""
+    global _connect_count, _connect_seconds
+    start = time.perf_counter()
+    if path is None:
+        conn = sqlite3.connect(_path, uri=_uri, factory=TimedConnection, check_same_thread=False)
+    else:
+        conn = sqlite3.connect(path, factory=TimedConnection, check_same_thread=False)
+    for pragma, value in _pragmas.items():
+        conn.execute(f"PRAGMA {pragma} = {value}")
+    elapsed = time.perf_counter() - start
+    with _lock:
+        _connect_count += 1
+        _connect_seconds += elapsed
+    return conn
+
+
+def get_connection(row_factory=None):
+    """The calling thread's pooled connection (one per row_factory).
+
+    Do not close it. Commit or roll back before returning to the pool owner,
+    or use connection() which does that for you.
+    """
+    pool = getattr(_local, "pool", None)
+    if pool is None or _local.generation != _generation or _local.pid != os.getpid():
+        # New thread, reconfigured path, or a pool inherited through fork
+        if pool is not None and _local.pid == os.getpid():
+            for conn in pool.values():
+                conn.close()
+        pool = _local.pool = {}
+        _local.generation = _generation
+        _local.pid = os.getpid()
+        _local.depth = 0
+
+    conn = pool.get(row_factory)
+    if conn is None:
+        conn = pool[row_factory] = connect()
+        conn.row_factory = row_factory
+    return conn
+
+
+@contextmanager
+def connection(row_factory=None):
+    """Pooled connection for a unit of work: commits on success and rolls
+    back on error. Nested blocks on the same thread share the outer
+    transaction.
+    """
+    conn = get_connection(row_factory)
+    _local.depth += 1
+    try:
+        yield conn
+        if _local.depth == 1 and conn.in_transaction:
+            conn.commit()
+    except BaseException:
+        if _local.depth == 1 and conn.in_transaction:
+            conn.rollback()
+        raise
+    finally:
+        _local.depth -= 1
+
+
+def close_thread_connections():
+    """Close the calling thread's pooled connections."""
+    pool = getattr(_local, "pool", None)
+    if pool and _local.pid == os.getpid():
+        for conn in pool.values():
+            conn.close()
+    _local.pool = None
+
+
+def stats():
+    """Connection setup and per-statement timing totals, slowest first."""
+    with _lock:
+        queries = sorted(_query_stats.items(), key=lambda item: item[1][1], reverse=True)
+        return {
+            "path": _path,
+            "connections": _connect_count,
+            "connect_seconds": _connect_seconds,
+            "queries": [
+                {
+                    "sql": sql,
+                    "count": count,
+                    "total_seconds": total,
+                    "avg_seconds": total / count,
+                    "max_seconds": longest,
+                }
+                for sql, (count, total, longest) in queries
+            ],
+        }
+
+
+def reset_stats():
+    global _connect_count, _connect_seconds
+    with _lock:
+        _connect_count = 0
+        _connect_seconds = 0.0
+        _query_stats.clear()
@@ -0,0 +1,132 @@
+from array import array
+from collections import OrderedDict
+
+# Bounded duplicate detection for received DAT packets.
+#
+# The radio used to remember every (session_id, pac_id) it had ever seen.
+# Instead each session keeps a window of the `size` most recent pac_ids:
+# pac_id % size picks a slot holding the id and how many times it came in,
+# so every id within size of the highest one has its own slot. size is a
+# power of two, which makes the slots continue seamlessly when pac_ids wrap
+# from MAX_PACKET_ID back to 0. Late packets older than the window go to a
+# small overflow map (oldest dropped first), and only the most recently
+# active sessions are kept. Memory is bounded by
+# max_sessions * (6 * size + overflow entries) bytes, give or take.
+#
+# What counts as a new packet is unchanged: anything above the highest
+# pac_id of the session, or a wraparound (highest near MAX_PACKET_ID and the
+# new id below WRAPAROUND_THRESHOLD). Older ids are late packets the first
+# time and duplicates after that. Ids that have fallen out of both the
+# window and the overflow map are accepted again as late packets; ingest
+# drops them on the unique packet key if they were stored before.
+
+MAX_PACKET_ID = 2147483647
+WRAPAROUND_THRESHOLD = 200
+DEFAULT_SIZE = 4096
+DEFAULT_OVERFLOW = 256
+DEFAULT_MAX_SESSIONS = 8
+
+# receive() outcomes
+FIRST = "first"             # first packet of a session
+NEW = "new"                 # above the highest pac_id so far
+WRAPAROUND = "wraparound"   # pac_id wrapped back to the start
+LATE = "late"               # older than the highest, not seen before
+DUPLICATE = "duplicate"     # seen before
+
+_EMPTY = -1
+_MAX_COUNT = 0xFFFF
+
+
+class _SessionWindow:
+    """Slots of the most recent pac_ids of one session."""
+    __slots__ = ("highest", "ids", "counts", "overflow")
+
+    def __init__(self, size):
+        self.highest = None
+        self.ids = array("i", [_EMPTY]) * size
+        self.counts = array("H", [0]) * size
+        self.overflow = OrderedDict()    # pac_id -> count, oldest first
+
+
+class SessionDedup:
+    """Accept/duplicate decisions for DAT packets, per session."""
+
+    def __init__(self, size=DEFAULT_SIZE, overflow=DEFAULT_OVERFLOW, max_sessions=DEFAULT_MAX_SESSIONS,
+                 max_packet_id=MAX_PACKET_ID, wraparound_threshold=WRAPAROUND_THRESHOLD):
+        space = max_packet_id + 1
+        if size <= 0 or size & (size - 1) or space % size:
+            raise ValueError("size must be a power of two dividing the pac_id space")
+        self.size = size
+        self.max_overflow = overflow
+        self.max_sessions = max_sessions
+        self.max_packet_id = max_packet_id
+        self.wraparound_threshold = wraparound_threshold
+        self._space = space
+        self._mask = size - 1
+        self._sessions = OrderedDict()   # session_id -> _SessionWindow, least recently used first
+
+    def receive(self, session_id, pac_id):
+        """Record a received packet. Returns (outcome, times received).
+
+        The packet should be passed on unless the outcome is DUPLICATE.
+        """
+        window = self._sessions.get(session_id)
+        if window is None:
+            window = self._sessions[session_id] = _SessionWindow(self.size)
+            if len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            window.highest = pac_id
+            self._store(window, pac_id, 1)
+            return FIRST, 1
+        self._sessions.move_to_end(session_id)
+
+        highest = window.highest
+        is_wraparound = (
+            highest > self.max_packet_id - self.wraparound_threshold and
+            pac_id < self.wraparound_threshold
+        )
+        if pac_id > highest or is_wraparound:
+            window.highest = pac_id
+            window.overflow.pop(pac_id, None)
+            self._store(window, pac_id, 1)
+            return (WRAPAROUND if is_wraparound else NEW), 1
+
+        slot = pac_id & self._mask
+        if window.ids[slot] == pac_id:
+            count = min(window.counts[slot] + 1, _MAX_COUNT)
+            window.counts[slot] = count
+            return DUPLICATE, count
+        if pac_id in window.overflow:
+            count = window.overflow[pac_id] = window.overflow[pac_id] + 1
+            return DUPLICATE, count
+
+        # Late packet: it takes the slot unless a more recent id holds it
+        held = window.ids[slot]
+        if held == _EMPTY or self._age(window, held) > self._age(window, pac_id):
+            self._store(window, pac_id, 1)
+        else:
+            window.overflow[pac_id] = 1
+            if len(window.overflow) > self.max_overflow:
+                window.overflow.popitem(last=False)
+        return LATE, 1
+
+    def contains(self, session_id, pac_id):
+        """Whether pac_id of a session is known to have been received."""
+        window = self._sessions.get(session_id)
+        if window is None:
+            return False
+        return window.ids[pac_id & self._mask] == pac_id or pac_id in window.overflow
+
+    def highest(self, session_id):
+        """Highest pac_id received in a session, None if it is not tracked."""
+        window = self._sessions.get(session_id)
+        return window.highest if window else None
+
+    def _store(self, window, pac_id, count):
+        slot = pac_id & self._mask
+        window.ids[slot] = pac_id
+        window.counts[slot] = count
+
+    def _age(self, window, pac_id):
+        """How far pac_id is behind the session's highest, across wraparound."""
+        return (window.highest - pac_id) % self._space
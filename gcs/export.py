@@ -0,0 +1,150 @@
+import csv
+import io
+
+# Streaming export of the wildfires table.
+#
+# Rows are read from a cursor with fetchmany and each chunk is encoded and
+# handed to a write callable before the next one is read, so memory stays flat
+# for any table size and nothing touches the disk. CSV is always available;
+# Arrow IPC and Parquet need pyarrow, imported on first use.
+
+CHUNK_ROWS = 5000
+PARQUET_CHUNK_ROWS = 50000    # one row group per chunk
+
+FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+def build_query(name=None, flight_id=None, time_from=None, time_to=None):
+    """SELECT for the export filters (time stamps in ns). Returns (sql, params)."""
+    query = "SELECT * FROM wildfires WHERE 1=1"
+    params = []
+    if name is not None:
+        query += " AND name = ?"
+        params.append(name)
+    if flight_id is not None:
+        query += " AND flight_id = ?"
+        params.append(flight_id)
+    if time_from is not None:
+        query += " AND time_stamp >= ?"
+        params.append(time_from)
+    if time_to is not None:
+        query += " AND time_stamp <= ?"
+        params.append(time_to)
+    # By fire the (name, time_stamp) indexes give time order for free
+    query += " ORDER BY time_stamp, id" if name is not None else " ORDER BY id"
+    return query, params
+
+
+def _chunks(cursor, size):
+    while True:
+        rows = cursor.fetchmany(size)
+        if not rows:
+            return
+        yield rows
+
+
+def write_csv(cursor, write, chunk_rows=CHUNK_ROWS):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow([column[0] for column in cursor.description])
+    for rows in _chunks(cursor, chunk_rows):
+        writer.writerows(rows)
+        write(buffer.getvalue().encode("utf-8"))
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        write(buffer.getvalue().encode("utf-8"))
+
+
+class _WriteSink(io.RawIOBase):
+    """File object for pyarrow that forwards every write to a callable."""
+
+    def __init__(self, write):
+        self._write = write
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._write(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+
+def _arrow_schema(conn, cursor):
+    import pyarrow as pa
+
+    declared = {row[1]: (row[2] or "").upper() for row in conn.execute("PRAGMA table_info(wildfires)")}
+    fields = []
+    for column in cursor.description:
+        kind = declared.get(column[0], "")
+        if "INT" in kind:
+            arrow_type = pa.int64()
+        elif "REAL" in kind or "FLOA" in kind or "DOUB" in kind:
+            arrow_type = pa.float64()
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(column[0], arrow_type))
+    return pa.schema(fields)
+
+
+def _record_batch(schema, rows):
+    import pyarrow as pa
+
+    columns = list(zip(*rows))
+    return pa.record_batch(
+        [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+        schema=schema,
+    )
+
+
+def write_arrow(conn, cursor, write, chunk_rows=CHUNK_ROWS):
+    import pyarrow as pa
+
+    schema = _arrow_schema(conn, cursor)
+    with pa.ipc.new_stream(_WriteSink(write), schema) as writer:
+        for rows in _chunks(cursor, chunk_rows):
+            writer.write_batch(_record_batch(schema, rows))
+
+
+def write_parquet(conn, cursor, write, chunk_rows=PARQUET_CHUNK_ROWS):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema(conn, cursor)
+    with pq.ParquetWriter(_WriteSink(write), schema) as writer:
+        for rows in _chunks(cursor, chunk_rows):
+            writer.write_table(pa.Table.from_batches([_record_batch(schema, rows)]))
+
+
+def export_wildfires(conn, write, fmt="csv", name=None, flight_id=None, time_from=None, time_to=None):
+    """Stream the filtered wildfires rows to write(bytes) in fmt.
+
+    Raises ValueError for an unknown format and ImportError when fmt needs
+    pyarrow and it is not installed.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}")
+    if fmt != "csv":
+        import pyarrow  # noqa: F401  (fail before anything is written)
+
+    query, params = build_query(name, flight_id, time_from, time_to)
+    cursor = conn.execute(query, params)
+    try:
+        if fmt == "csv":
+            write_csv(cursor, write)
+        elif fmt == "arrow":
+            write_arrow(conn, cursor, write)
+        else:
+            write_parquet(conn, cursor, write)
+    finally:
+        cursor.close()
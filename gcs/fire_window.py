@@ -0,0 +1,186 @@
+import math
+
+BUCKET_NS = 60 * 1_000_000_000           # 1 minute buckets
+WINDOW_NS = 24 * 60 * 60 * 1_000_000_000  # 24 hour status window
+
+
+class _Bucket:
+    """Running aggregates for the packets of one fire that fall in one bucket."""
+    __slots__ = ("count", "sum_intensity", "sum_alt", "sum_lat", "sum_lon",
+                 "max_temp", "min_temp", "min_lat", "max_lat", "min_lon", "max_lon",
+                 "first_ts", "last_ts", "flight_ids")
+
+    def __init__(self):
+        self.count = 0
+        self.sum_intensity = 0.0
+        self.sum_alt = 0.0
+        self.sum_lat = 0.0
+        self.sum_lon = 0.0
+        self.max_temp = -math.inf
+        self.min_temp = math.inf
+        self.min_lat = math.inf
+        self.max_lat = -math.inf
+        self.min_lon = math.inf
+        self.max_lon = -math.inf
+        self.first_ts = math.inf
+        self.last_ts = -math.inf
+        self.flight_ids = set()
+
+    def add(self, latitude, longitude, high_temp, low_temp, alt, flight_id, time_stamp):
+        self.count += 1
+        self.sum_intensity += (high_temp + low_temp) / 2
+        self.sum_alt += alt
+        self.sum_lat += latitude
+        self.sum_lon += longitude
+        self.max_temp = max(self.max_temp, high_temp)
+        self.min_temp = min(self.min_temp, low_temp)
+        self.min_lat = min(self.min_lat, latitude)
+        self.max_lat = max(self.max_lat, latitude)
+        self.min_lon = min(self.min_lon, longitude)
+        self.max_lon = max(self.max_lon, longitude)
+        self.first_ts = min(self.first_ts, time_stamp)
+        self.last_ts = max(self.last_ts, time_stamp)
+        self.flight_ids.add(flight_id)
+
+
+class FireWindow:
+    """Sliding 24 hour aggregates for a single fire, kept in time buckets.
+
+    Packets are folded into per-minute buckets as they are read, and buckets
+    that fall out of the window are dropped, so a snapshot merges at most
+    window_ns / bucket_ns buckets no matter how many rows the fire has.
+    The window edge is bucket aligned: the oldest bucket is kept whole while
+    any part of it is inside the window.
+    """
+
+    def __init__(self, name, min_temp, window_ns=WINDOW_NS, bucket_ns=BUCKET_NS):
+        self.name = name
+        self.min_temp = min_temp
+        self.window_ns = window_ns
+        self.bucket_ns = bucket_ns
+
+        self.buckets = {}       # bucket index -> _Bucket
+        self.latest_ts = None   # newest time_stamp seen for the fire, any temperature
+        self.last_id = 0        # highest wildfires.id folded in
+        self.positions_version = None  # data_version of rewritten rows when loaded
+
+    def add(self, latitude, longitude, high_temp, low_temp, alt, flight_id, time_stamp):
+        """Fold one wildfires row into the window."""
+        if time_stamp is None:
+            return
+        if self.latest_ts is None or time_stamp > self.latest_ts:
+            self.latest_ts = time_stamp
+        if high_temp is None or high_temp < self.min_temp:
+            return
+        if time_stamp < self.latest_ts - self.window_ns:
+            return  # late packet that is already outside the window
+
+        index = int(time_stamp // self.bucket_ns)
+        bucket = self.buckets.get(index)
+        if bucket is None:
+            bucket = self.buckets[index] = _Bucket()
+        bucket.add(latitude or 0.0, longitude or 0.0, high_temp, low_temp or 0.0,
+                   alt or 0.0, flight_id, time_stamp)
+
+    def expire(self):
+        """Drop buckets that lie entirely before the start of the window."""
+        if self.latest_ts is None:
+            return
+        oldest = int((self.latest_ts - self.window_ns) // self.bucket_ns)
+        for index in [i for i in self.buckets if i < oldest]:
+            del self.buckets[index]
+
+    def load(self, cursor):
+        """Seed the window from the database (one indexed read of the last 24h)."""
+        cursor.execute("SELECT MAX(id) FROM wildfires")
+        self.last_id = cursor.fetchone()[0] or 0
+
+        cursor.execute("SELECT MAX(time_stamp) FROM wildfires WHERE name = ?", (self.name,))
+        window_end = cursor.fetchone()[0]
+        if window_end is None:
+            return
+        self.latest_ts = window_end
+
+        cursor.execute(
+            """
+            SELECT latitude, longitude, high_temp, low_temp, alt, flight_id, time_stamp
+              FROM wildfires
+             WHERE name = ?
+               AND time_stamp BETWEEN ? AND ?
+               AND high_temp >= ?
+               AND id <= ?
+            """,
+            (self.name, window_end - self.window_ns, window_end, self.min_temp, self.last_id)
+        )
+        for row in cursor.fetchall():
+            self.add(*row)
+
+    def catch_up(self, cursor):
+        """Fold in rows written since the last read, by any process.
+
+        SQLite has a single writer, so every id up to the current MAX(id) is
+        already committed and the range (last_id, MAX(id)] is complete. The
+        unary + keeps SQLite on that rowid range instead of the name index,
+        so only new rows are visited.
+        """
+        cursor.execute("SELECT MAX(id) FROM wildfires")
+        upper = cursor.fetchone()[0] or 0
+        if upper <= self.last_id:
+            return
+
+        cursor.execute(
+            """
+            SELECT latitude, longitude, high_temp, low_temp, alt, flight_id, time_stamp
+              FROM wildfires
+             WHERE id > ? AND id <= ? AND +name = ?
+            """,
+            (self.last_id, upper, self.name)
+        )
+        for row in cursor.fetchall():
+            self.add(*row)
+        self.last_id = upper
+
+    def snapshot(self):
+        """Aggregate the live buckets. Returns None if the window is empty."""
+        self.expire()
+        if not self.buckets:
+            return None
+
+        count = 0
+        sum_intensity = sum_alt = sum_lat = sum_lon = 0.0
+        max_temp = max_lat = max_lon = last_ts = -math.inf
+        min_temp = min_lat = min_lon = first_ts = math.inf
+        flight_ids = set()
+        for bucket in self.buckets.values():
+            count += bucket.count
+            sum_intensity += bucket.sum_intensity
+            sum_alt += bucket.sum_alt
+            sum_lat += bucket.sum_lat
+            sum_lon += bucket.sum_lon
+            max_temp = max(max_temp, bucket.max_temp)
+            min_temp = min(min_temp, bucket.min_temp)
+            min_lat = min(min_lat, bucket.min_lat)
+            max_lat = max(max_lat, bucket.max_lat)
+            min_lon = min(min_lon, bucket.min_lon)
+            max_lon = max(max_lon, bucket.max_lon)
+            first_ts = min(first_ts, bucket.first_ts)
+            last_ts = max(last_ts, bucket.last_ts)
+            flight_ids |= bucket.flight_ids
+
+        return {
+            "num_data_points": count,
+            "intensity": sum_intensity / count,
+            "alt_avg": sum_alt / count,
+            "avg_latitude": sum_lat / count,
+            "avg_longitude": sum_lon / count,
+            "max_temp": max_temp,
+            "min_temp": min_temp,
+            "min_lat": min_lat,
+            "max_lat": max_lat,
+            "min_lon": min_lon,
+            "max_lon": max_lon,
+            "flights": len(flight_ids),
+            "last_flight_id": max(flight_ids),
+            "first_time_stamp": first_ts,
+            "time_stamp": last_ts,
+        }
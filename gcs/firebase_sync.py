@@ -0,0 +1,220 @@
+import abc
+import copy
+import json
+import db_pool
+import threading
+
+# Incremental SQLite -> Firebase Realtime Database sync.
+#
+# New rows are found by a high-water mark on wildfires.id (a rowid range, no
+# scan), rows that were changed after being synced are found through the
+# partial sync_status = 'pending' index. Each chunk is pushed with a single
+# multi-path update and then marked synced together with the new watermark.
+
+FIREBASE_CREDENTIALS_PATH = "firebase_credentials.json"
+FIREBASE_DB_URL = "https://pyro-fire-tracking-default-rtdb.firebaseio.com/"
+FIREBASE_ROOT = "wildfires"
+WATERMARK_KEY = "firebase_watermark"
+
+SYNC_COLUMNS = (
+    "id", "name", "pac_id", "latitude", "longitude", "alt", "high_temp", "low_temp",
+    "date_received", "time_received", "status", "sync_status", "time_stamp",
+    "heading", "speed", "flight_id", "session_id"
+)
+
+
+class RealtimeRemote(abc.ABC):
+    """Minimal interface of the Realtime Database used by the sync engine."""
+
+    @abc.abstractmethod
+    def update(self, updates: dict):
+        """Apply a multi-path update: {"path/to/node": value, ...}."""
+
+    @abc.abstractmethod
+    def get(self, path: str = ""):
+        """Value of the node at path, relative to the sync root."""
+
+
+class FirebaseRemote(RealtimeRemote):
+    """The real Realtime Database, initialised on first use."""
+
+    def __init__(self, credentials_path=FIREBASE_CREDENTIALS_PATH, database_url=FIREBASE_DB_URL, root=FIREBASE_ROOT):
+        self.credentials_path = credentials_path
+        self.database_url = database_url
+        self.root = root
+        self._ref = None
+
+    def _reference(self):
+        if self._ref is None:
+            import firebase_admin
+            from firebase_admin import credentials, db
+
+            if not firebase_admin._apps:
+                cred = credentials.Certificate(self.credentials_path)
+                firebase_admin.initialize_app(cred, {"databaseURL": self.database_url})
+            self._ref = db.reference(self.root)
+        return self._ref
+
+    def update(self, updates: dict):
+        self._reference().update(updates)
+
+    def get(self, path: str = ""):
+        ref = self._reference()
+        return (ref.child(path) if path else ref).get()
+
+
+class InMemoryRemote(RealtimeRemote):
+    """In-process stand-in for the Realtime Database, for tests and benchmarks.
+
+    Values round-trip through JSON like they would over the wire. fail_next
+    makes the next n updates raise, to exercise retries.
+    """
+
+    def __init__(self):
+        self.tree = {}
+        self.updates = 0
+        self.nodes_written = 0
+        self.fail_next = 0
+        self._lock = threading.Lock()
+
+    def update(self, updates: dict):
+        payload = json.loads(json.dumps(updates))
+        with self._lock:
+            if self.fail_next:
+                self.fail_next -= 1
+                raise ConnectionError("simulated Realtime Database failure")
+            for path, value in payload.items():
+                parts = [p for p in path.split("/") if p]
+                node = self.tree
+                for part in parts[:-1]:
+                    node = node.setdefault(part, {})
+                node[parts[-1]] = value
+            self.updates += 1
+            self.nodes_written += len(payload)
+
+    def get(self, path: str = ""):
+        with self._lock:
+            node = self.tree
+            for part in [p for p in path.split("/") if p]:
+                if not isinstance(node, dict) or part not in node:
+                    return None
+                node = node[part]
+            return copy.deepcopy(node)
+
+
+class FirebaseSync:
+    """Pushes unsynced wildfires rows to a RealtimeRemote in bounded chunks."""
+
+    def __init__(self, db_path=None, remote=None, chunk_size=500):
+        self.db_path = db_path
+        self.remote = remote if remote is not None else FirebaseRemote()
+        self.chunk_size = chunk_size
+
+    def _connect(self):
+        return db_pool.connect(self.db_path)
+
+    def watermark(self, conn):
+        row = conn.execute("SELECT value FROM sync_state WHERE key = ?", (WATERMARK_KEY,)).fetchone()
+        return row[0] if row else 0
+
+    def _pending_chunk(self, conn, watermark):
+        # telemetry_ts last: rows are only marked synced if it is unchanged
+        columns = ", ".join(SYNC_COLUMNS + ("telemetry_ts",))
+        # Rows changed after they were synced (e.g. by update_mission_data)
+        rows = conn.execute(
+            f"""
+            SELECT {columns} FROM wildfires
+             WHERE sync_status = 'pending' AND id <= ?
+             ORDER BY id LIMIT ?
+            """,
+            (watermark, self.chunk_size)
+        ).fetchall()
+        if len(rows) < self.chunk_size:
+            # New rows past the watermark
+            rows += conn.execute(
+                f"SELECT {columns} FROM wildfires WHERE id > ? ORDER BY id LIMIT ?",
+                (watermark, self.chunk_size - len(rows))
+            ).fetchall()
+        return rows
+
+    def push_chunk(self, conn):
+        """Push one chunk. Returns the number of rows synced (0 when caught up)."""
+        watermark = self.watermark(conn)
+        rows = self._pending_chunk(conn, watermark)
+        if not rows:
+            return 0
+
+        updates = {}
+        for row in rows:
+            fire_data = dict(zip(SYNC_COLUMNS[1:], row[1:-1]))
+            fire_data["sync_status"] = "synced"
+            updates[f"wildfires/{row[0]}"] = fire_data
+
+        self.remote.update(updates)
+
+        # A row the telemetry merge rewrote since it was read (possibly in
+        # another process) stays pending, so its new position is pushed next
+        pushed = [(row[0], row[-1]) for row in rows]
+        new_watermark = max(watermark, max(row[0] for row in rows))
+        try:
+            conn.executemany(
+                "UPDATE wildfires SET sync_status = 'synced' WHERE id = ? AND telemetry_ts IS ?", pushed
+            )
+            conn.execute(
+                "INSERT INTO sync_state (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (WATERMARK_KEY, new_watermark)
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return len(rows)
+
+    def sync_once(self, max_chunks=None):
+        """Push chunks until caught up (or max_chunks). Returns rows synced."""
+        conn = self._connect()
+        total = 0
+        chunks = 0
+        try:
+            while max_chunks is None or chunks < max_chunks:
+                pushed = self.push_chunk(conn)
+                if not pushed:
+                    break
+                total += pushed
+                chunks += 1
+        finally:
+            conn.close()
+        return total
+
+
+class FirebaseSyncWorker(threading.Thread):
+    """Background sync loop with exponential backoff on failures."""
+
+    def __init__(self, sync: FirebaseSync, interval=10.0, max_backoff=300.0):
+        super().__init__(name="FirebaseSyncWorker", daemon=True)
+        self.sync = sync
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self.failures = 0
+        self.rows_synced = 0
+        self._stop_event = threading.Event()
+
+    def stop(self, timeout=None):
+        self._stop_event.set()
+        self.join(timeout)
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                pushed = self.sync.sync_once()
+                self.rows_synced += pushed
+                if pushed:
+                    print(f"Successfully synced {pushed} records to Firebase.")
+                self.failures = 0
+                delay = self.interval
+            except Exception as e:
+                self.failures += 1
+                delay = min(self.interval * (2 ** self.failures), self.max_backoff)
+                print(f"Failed to sync batch (attempt {self.failures}), retrying in {delay:.0f}s: {e}")
+            self._stop_event.wait(delay)
@@ -0,0 +1,205 @@
+import csv
+import math
+import os
+import queue
+import sqlite3
+import db_pool
+import threading
+import time
+import requests
+
+# Reverse geocoding for fire locations.
+#
+# Lookups never wait on the network. A location is resolved from, in order:
+#   1. the geocode_cache table, keyed on a coarse lat/lon cell
+#   2. the bundled offline gazetteer (geodata/us_places.csv, US places with
+#      population >= 1000 from GeoNames cities1000, CC BY 4.0)
+# If network lookups are enabled, cells answered offline are queued for a
+# background nominatim request whose answer replaces the cached entry.
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "geodata", "us_places.csv")
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/reverse"
+UNKNOWN_LOCATION = "Unknown Location"
+
+CELL_DEGREES = 0.05        # cache cell, roughly 5 km
+GRID_DEGREES = 1.0         # gazetteer index cell
+MAX_PLACE_DISTANCE_KM = 250
+EARTH_RADIUS_KM = 6371.0
+
+
+def cell_key(latitude: float, longitude: float) -> str:
+    """Cache key for the cell containing the given coordinates."""
+    return f"{math.floor(latitude / CELL_DEGREES)}:{math.floor(longitude / CELL_DEGREES)}"
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class Gazetteer:
+    """Offline place list with a 1 degree grid index for nearest-place search."""
+
+    def __init__(self, places):
+        self.grid = {}
+        for latitude, longitude, name in places:
+            key = (math.floor(latitude / GRID_DEGREES), math.floor(longitude / GRID_DEGREES))
+            self.grid.setdefault(key, []).append((latitude, longitude, name))
+
+    @classmethod
+    def from_csv(cls, path=GAZETTEER_PATH):
+        with open(path, newline="", encoding="utf-8") as file:
+            return cls(
+                (float(row["latitude"]), float(row["longitude"]), row["name"])
+                for row in csv.DictReader(file)
+            )
+
+    def nearest(self, latitude: float, longitude: float, max_km: float = MAX_PLACE_DISTANCE_KM):
+        """Returns (name, distance_km) of the closest place, or (None, None)."""
+        cell_lat = math.floor(latitude / GRID_DEGREES)
+        cell_lon = math.floor(longitude / GRID_DEGREES)
+        # One grid cell is at least this many km across in latitude, and the
+        # longitude spacing shrinks with cos(latitude)
+        cell_km = GRID_DEGREES * 111.32 * max(math.cos(math.radians(min(abs(latitude) + GRID_DEGREES, 89.0))), 0.01)
+
+        best_name, best_km = None, math.inf
+        ring = 0
+        while True:
+            for dlat in range(-ring, ring + 1):
+                for dlon in range(-ring, ring + 1):
+                    if max(abs(dlat), abs(dlon)) != ring:
+                        continue  # only the cells on this ring
+                    for place_lat, place_lon, name in self.grid.get((cell_lat + dlat, cell_lon + dlon), ()):
+                        km = haversine_km(latitude, longitude, place_lat, place_lon)
+                        if km < best_km:
+                            best_name, best_km = name, km
+
+            # Everything beyond this ring is at least ring * cell_km away
+            if best_km <= ring * cell_km or ring * cell_km > max_km:
+                break
+            ring += 1
+
+        if best_km > max_km:
+            return None, None
+        return best_name, best_km
+
+
+def fetch_nominatim(latitude: float, longitude: float):
+    """Blocking nominatim reverse lookup. Returns a place name or None."""
+    response = requests.get(
+        NOMINATIM_URL,
+        params={"format": "json", "lat": latitude, "lon": longitude, "zoom": 10},
+        headers={"User-Agent": "wildfire-status-app"},
+        timeout=5
+    )
+    if response.status_code != 200:
+        print(f"Failed to fetch location: {response.status_code}, {response.text}")
+        return None
+    address = response.json().get("address", {})
+    return address.get("city") or address.get("town") or address.get("village") or address.get("county")
+
+
+class ReverseGeocoder:
+    """Cache-first, offline-backed reverse geocoder.
+
+    lookup() only touches the cache table and the in-memory gazetteer. With
+    use_network enabled, cells answered offline are refined by a background
+    thread that calls fetch (nominatim by default) and rewrites the cache.
+    """
+
+    def __init__(self, db_path=None, gazetteer=None, use_network=True, fetch=fetch_nominatim):
+        self.db_path = db_path
+        self.use_network = use_network
+        self.fetch = fetch
+        self._gazetteer = gazetteer
+        self._memory = {}
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._worker = None
+
+    @property
+    def gazetteer(self):
+        if self._gazetteer is None:
+            self._gazetteer = Gazetteer.from_csv()
+        return self._gazetteer
+
+    def lookup(self, latitude: float, longitude: float, conn: sqlite3.Connection = None) -> str:
+        """Returns the nearest place name without blocking on the network.
+
+        conn is used for the cache table when given, so the lookup can run
+        inside the caller's transaction.
+        """
+        key = cell_key(latitude, longitude)
+        cached = self._memory.get(key)
+        if cached is not None:
+            return cached
+
+        own_conn = conn is None
+        if own_conn:
+            conn = db_pool.connect(self.db_path)
+        try:
+            row = conn.execute(
+                "SELECT location, source FROM geocode_cache WHERE cell = ?", (key,)
+            ).fetchone()
+            if row:
+                location, source = row
+            else:
+                name, _ = self.gazetteer.nearest(latitude, longitude)
+                location, source = name or UNKNOWN_LOCATION, "offline"
+                conn.execute(
+                    "INSERT OR IGNORE INTO geocode_cache (cell, location, source, updated_at) VALUES (?, ?, ?, ?)",
+                    (key, location, source, time.time())
+                )
+                if own_conn:
+                    conn.commit()
+        finally:
+            if own_conn:
+                conn.close()
+
+        if source == "offline" and self.use_network:
+            self._refine(key, latitude, longitude, location)
+        else:
+            self._memory[key] = location
+        return location
+
+    def _refine(self, key, latitude, longitude, offline_location):
+        with self._lock:
+            if key in self._pending:
+                return
+            self._pending.add(key)
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="ReverseGeocoder", daemon=True)
+                self._worker.start()
+        self._queue.put((key, latitude, longitude, offline_location))
+
+    def _run(self):
+        conn = db_pool.connect(self.db_path)
+        while True:
+            key, latitude, longitude, offline_location = self._queue.get()
+            # Whatever happens, do not retry this cell for the life of the process
+            location = offline_location
+            try:
+                fetched = self.fetch(latitude, longitude)
+                if fetched:
+                    location = fetched
+                    conn.execute(
+                        """
+                        INSERT INTO geocode_cache (cell, location, source, updated_at) VALUES (?, ?, 'nominatim', ?)
+                        ON CONFLICT(cell) DO UPDATE SET location = excluded.location,
+                                                        source = excluded.source,
+                                                        updated_at = excluded.updated_at
+                        """,
+                        (key, location, time.time())
+                    )
+                    conn.commit()
+            except Exception as e:
+                print(f"Error getting nearest city: {e}")
+            finally:
+                self._memory[key] = location
+                with self._lock:
+                    self._pending.discard(key)
+                self._queue.task_done()
@@ -0,0 +1,148 @@
+import math
+import numpy as np
+
+# Server-side heatmap binning on the Web Mercator tile pyramid.
+#
+# Each map tile (zoom, x, y) is divided into GRID x GRID cells, so a cell
+# covers 256 / GRID screen pixels at that zoom whatever the data volume.
+# Points are projected to global cell coordinates with NumPy, sorted by cell
+# and reduced with reduceat into count, mean and max temperature per cell.
+# Tiles are the unit of caching: panning only bins the tiles that came into
+# view. A cell is [lat, lon, count, mean, max] with lat/lon at its centre.
+
+GRID = 64                 # cells per tile side (4 px cells on 256 px tiles)
+MAX_ZOOM = 22
+MAX_TILES = 256           # largest bbox accepted, in tiles at the requested zoom
+MAX_LATITUDE = 85.0511287798   # Web Mercator limit
+
+CELL_COLUMNS = ("lat", "lon", "count", "mean", "max")
+
+
+def parse_bbox(value):
+    """Parses a Leaflet toBBoxString() "west,south,east,north" bbox.
+
+    Raises ValueError when it is malformed or empty.
+    """
+    try:
+        west, south, east, north = (float(v) for v in value.split(","))
+    except (AttributeError, ValueError):
+        raise ValueError("bbox must be west,south,east,north")
+    if not (west < east and south < north):
+        raise ValueError("bbox must have west < east and south < north")
+    west, east = max(west, -180.0), min(east, 180.0)
+    south, north = max(south, -MAX_LATITUDE), min(north, MAX_LATITUDE)
+    return west, south, east, north
+
+
+def _project(lat, lon, zoom):
+    """Global (x, y) cell coordinates, as floats, of lat/lon arrays at zoom."""
+    scale = GRID * (1 << zoom)
+    lat = np.radians(np.clip(lat, -MAX_LATITUDE, MAX_LATITUDE))
+    x = (np.asarray(lon) + 180.0) / 360.0 * scale
+    y = (1.0 - np.log(np.tan(lat) + 1.0 / np.cos(lat)) / math.pi) / 2.0 * scale
+    return x, y
+
+
+def _unproject(x, y, zoom):
+    """lat/lon arrays of global cell coordinates at zoom."""
+    scale = GRID * (1 << zoom)
+    lon = x / scale * 360.0 - 180.0
+    lat = np.degrees(np.arctan(np.sinh(math.pi * (1.0 - 2.0 * y / scale))))
+    return lat, lon
+
+
+def tiles_for_bbox(bbox, zoom):
+    """The (x, y) tiles covering bbox at zoom, row by row.
+
+    Raises ValueError past MAX_TILES.
+    """
+    west, south, east, north = bbox
+    x, y = _project(np.array([north, south]), np.array([west, east]), zoom)
+    last = (1 << zoom) - 1
+    x0, x1 = (min(int(v) // GRID, last) for v in x)
+    y0, y1 = (min(int(v) // GRID, last) for v in y)
+    if (x1 - x0 + 1) * (y1 - y0 + 1) > MAX_TILES:
+        raise ValueError(f"bbox covers more than {MAX_TILES} tiles at zoom {zoom}")
+    return [(tx, ty) for ty in range(y0, y1 + 1) for tx in range(x0, x1 + 1)]
+
+
+def tile_bbox(zoom, tx, ty):
+    """(west, south, east, north) of a tile."""
+    lat, lon = _unproject(np.array([tx, tx + 1]) * GRID, np.array([ty + 1, ty]) * GRID, zoom)
+    return float(lon[0]), float(lat[0]), float(lon[1]), float(lat[1])
+
+
+def bin_tiles(lat, lon, temp, zoom, tiles):
+    """Bins points into the cells of tiles at zoom.
+
+    lat, lon, temp: (n,) arrays. Returns {(tx, ty): [cell, ...]} with an
+    entry, possibly empty, for every tile asked for.
+    """
+    result = {tile: [] for tile in tiles}
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    temp = np.asarray(temp, dtype=np.float64)
+    keep = np.isfinite(lat) & np.isfinite(lon) & np.isfinite(temp)
+    if not keep.any():
+        return result
+
+    x, y = _project(lat[keep], lon[keep], zoom)
+    last = GRID * (1 << zoom) - 1
+    cx = np.clip(x.astype(np.int64), 0, last)
+    cy = np.clip(y.astype(np.int64), 0, last)
+    temp = temp[keep]
+
+    # Only the points in the tiles asked for
+    wanted = np.array([ty * (1 << zoom) + tx for tx, ty in tiles], dtype=np.int64)
+    in_tiles = np.isin((cy // GRID) * (1 << zoom) + cx // GRID, wanted)
+    cx, cy, temp = cx[in_tiles], cy[in_tiles], temp[in_tiles]
+    if len(temp) == 0:
+        return result
+
+    # One sort by cell, then every aggregate is a reduceat over the runs
+    keys = (cy << 32) | cx
+    order = np.argsort(keys, kind="stable")
+    keys, temp = keys[order], temp[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    counts = np.diff(np.r_[starts, len(keys)])
+    means = np.add.reduceat(temp, starts) / counts
+    maxes = np.maximum.reduceat(temp, starts)
+
+    cell_x = keys[starts] & 0xFFFFFFFF
+    cell_y = keys[starts] >> 32
+    centre_lat, centre_lon = _unproject(cell_x + 0.5, cell_y + 0.5, zoom)
+    for i, (tx, ty) in enumerate(zip((cell_x // GRID).tolist(), (cell_y // GRID).tolist())):
+        result[(tx, ty)].append([
+            round(float(centre_lat[i]), 6), round(float(centre_lon[i]), 6),
+            int(counts[i]), round(float(means[i]), 2), round(float(maxes[i]), 2)
+        ])
+    return result
+
+
+def fetch_points(conn, name, bbox, flight_id=None):
+    """(lat, lon, high_temp) arrays of a fire's packets inside bbox."""
+    west, south, east, north = bbox
+    query = """
+        SELECT latitude, longitude, high_temp
+        FROM wildfires
+        WHERE name = ? AND latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ?
+    """
+    params = [name, south, north, west, east]
+    if flight_id is not None:
+        query += " AND flight_id = ?"
+        params.append(flight_id)
+    rows = conn.execute(query, params).fetchall()
+    if not rows:
+        empty = np.empty(0)
+        return empty, empty, empty
+    points = np.array(rows, dtype=np.float64)
+    return points[:, 0], points[:, 1], points[:, 2]
+
+
+def compute_tiles(conn, name, zoom, tiles, flight_id=None):
+    """Cells of tiles for a fire, read in one query over their joint bbox."""
+    boxes = [tile_bbox(zoom, tx, ty) for tx, ty in tiles]
+    bbox = (min(b[0] for b in boxes), min(b[1] for b in boxes),
+            max(b[2] for b in boxes), max(b[3] for b in boxes))
+    lat, lon, temp = fetch_points(conn, name, bbox, flight_id)
+    return bin_tiles(lat, lon, temp, zoom, tiles)
@@ -0,0 +1,234 @@
+import queue
+import sqlite3
+import db_pool
+import threading
+import time
+from database import process_packet_batch, flush_flights
+
+BATCH_RETRIES = 4       # retries of a batch that found the database locked
+RETRY_BACKOFF = 0.1     # seconds before the first retry, doubled for each one after
+
+
+def drain(q, batch_size, max_latency, idle_timeout=None, until=None):
+    """Take the next batch off q (a queue.Queue or multiprocessing.Queue).
+
+    Blocks until the first item arrives (at most idle_timeout seconds, None
+    waits forever), then keeps taking items until batch_size of them are in
+    hand or max_latency seconds have passed since the first one, or an item
+    for which until(item) is true was taken. Returns (items, stop): stop is
+    True when a None item asked the consumer to stop, items are the ones
+    before it.
+    """
+    try:
+        item = q.get(timeout=idle_timeout)
+    except queue.Empty:
+        return [], False
+    if item is None:
+        return [], True
+
+    items = [item]
+    if until is not None and until(item):
+        return items, False
+    deadline = time.monotonic() + max_latency
+    while len(items) < batch_size:
+        try:
+            item = q.get_nowait()
+        except queue.Empty:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = q.get(timeout=remaining)
+            except queue.Empty:
+                break
+        if item is None:
+            return items, True
+        items.append(item)
+        if until is not None and until(item):
+            break
+    return items, False
+
+
+def write_batch(batch, conn, log_prefix="", retries=BATCH_RETRIES, backoff=RETRY_BACKOFF):
+    """process_packet_batch, without losing the whole batch to one failure.
+
+    A sqlite3.OperationalError (the database locked by the other process
+    writing to it) is retried with backoff. Any other error, or a lock that
+    outlasts the retries, and the packets are written one at a time so
+    only the ones that fail on their own are dropped, each of them printed.
+    Returns (inserted, duplicates, dropped).
+    """
+    for attempt in range(retries + 1):
+        try:
+            return (*process_packet_batch(batch, conn), 0)
+        except sqlite3.OperationalError as e:
+            error = e
+            if attempt < retries:
+                time.sleep(backoff * 2 ** attempt)
+        except Exception as e:
+            error = e
+            break
+
+    print(f"{log_prefix}Error writing packet batch of {len(batch)}: {error}")
+    if len(batch) == 1:
+        return 0, 0, 1
+    inserted = duplicates = dropped = 0
+    for item in batch:
+        try:
+            one_inserted, one_duplicate = process_packet_batch([item], conn)
+        except Exception as e:
+            print(f"{log_prefix}Dropped packet {item[0]!r}: {e}")
+            dropped += 1
+            continue
+        inserted += one_inserted
+        duplicates += one_duplicate
+    return inserted, duplicates, dropped
+
+
+def queue_depth(q):
+    """q.qsize(), or None where the platform cannot tell (macOS mp queues)."""
+    try:
+        return q.qsize()
+    except NotImplementedError:
+        return None
+
+
+class BatchStats:
+    """Batch size distribution and queue depth of a batching consumer.
+
+    Batch sizes are counted in power-of-two buckets, keyed by the bucket's
+    upper bound (1, 2, 4, ... batch_size).
+    """
+
+    def __init__(self):
+        self.batches = 0
+        self.packets = 0
+        self.sizes = {}
+        self.queue_depth = None
+        self.max_queue_depth = 0
+        self.last_batch_seconds = 0.0
+
+    def record(self, size, queue_depth=None, seconds=0.0):
+        self.batches += 1
+        self.packets += size
+        bucket = 1 << (size - 1).bit_length() if size > 0 else 0
+        self.sizes[bucket] = self.sizes.get(bucket, 0) + 1
+        self.queue_depth = queue_depth
+        if queue_depth is not None:
+            self.max_queue_depth = max(self.max_queue_depth, queue_depth)
+        self.last_batch_seconds = seconds
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "packets": self.packets,
+            "batch_sizes": dict(sorted(self.sizes.items())),
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "last_batch_seconds": self.last_batch_seconds,
+        }
+
+    def summary(self):
+        sizes = ", ".join(f"<={bucket}: {count}" for bucket, count in sorted(self.sizes.items()))
+        mean = self.packets / self.batches if self.batches else 0.0
+        return (f"{self.packets} packets in {self.batches} batches (mean {mean:.1f}; {sizes or 'none'}), "
+                f"queue depth {self.queue_depth} (max {self.max_queue_depth})")
+
+
+class IngestWriter:
+    """Group-commit writer for incoming packets.
+
+    Packets handed to submit() are buffered and written by a single background
+    thread that owns one long-lived SQLite connection. A batch is committed as
+    soon as it reaches batch_size packets or the oldest buffered packet has
+    waited max_latency seconds, whichever comes first. Batches are taken
+    with drain and written with write_batch, like the radio's consumer.
+    """
+
+    def __init__(self, db_path=None, batch_size=500, max_latency=0.25):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.max_latency = max_latency
+
+        self._queue = queue.Queue()
+        self._thread = None
+
+        self.packets_submitted = 0
+        self.packets_written = 0
+        self.duplicates_dropped = 0
+        self.packets_failed = 0
+        self.batches_written = 0
+        self.last_batch_seconds = 0.0
+
+    def start(self):
+        """Start the writer thread. Returns self so it can be chained."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="IngestWriter", daemon=True)
+            self._thread.start()
+        return self
+
+    def submit(self, packet, name, status="active"):
+        """Queue a decoded packet dict for insertion."""
+        self.packets_submitted += 1
+        self._queue.put((packet, name, status))
+
+    def flush(self, timeout=None):
+        """Block until everything submitted so far has been committed."""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        """Flush remaining packets and stop the writer thread."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def stats(self):
+        return {
+            "submitted": self.packets_submitted,
+            "written": self.packets_written,
+            "duplicates": self.duplicates_dropped,
+            "failed": self.packets_failed,
+            "batches": self.batches_written,
+            "pending": self._queue.qsize(),
+            "last_batch_seconds": self.last_batch_seconds,
+        }
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _write(self, conn, batch):
+        started = time.perf_counter()
+        inserted, duplicates, failed = write_batch(batch, conn)
+        self.packets_written += inserted
+        self.duplicates_dropped += duplicates
+        self.packets_failed += failed
+        self.batches_written += 1
+        self.last_batch_seconds = time.perf_counter() - started
+
+    def _run(self):
+        conn = db_pool.connect(self.db_path)
+        stop = False
+
+        while not stop:
+            # A flush() marker ends the batch early, so it is written right away
+            items, stop = drain(self._queue, self.batch_size, self.max_latency,
+                                until=lambda item: isinstance(item, threading.Event))
+            batch = [item for item in items if not isinstance(item, threading.Event)]
+            if batch:
+                self._write(conn, batch)
+            for item in items:
+                if isinstance(item, threading.Event):
+                    item.set()
+
+        try:
+            flush_flights(conn, force=True)
+            conn.commit()
+        except Exception as e:
+            print(f"Error writing flight end times: {e}")
+        conn.close()
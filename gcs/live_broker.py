@@ -0,0 +1,228 @@
+import logging
+import queue
+import threading
+import tornado.ioloop
+
+# In-process pub/sub for live data.
+#
+# database.py notifies its listeners after every commit of new packets or fire
+# status snapshots. The broker fans those events out to connected clients
+# (LiveDataWebSocketHandler), so open dashboards cost no polling queries.
+#
+# Each client has a bounded buffer. While a send is in flight new events
+# accumulate and go out together in the next message, keeping only the latest
+# status per fire. If a client falls max_pending packets behind, its buffered
+# packets are dropped and replaced by a gap carrying the keyset cursor of the
+# last row it was sent, from which it backfills through /api/thermal.
+#
+# The radio process ingests in its own process; there queue_publisher() forwards
+# events into a multiprocessing queue which the server drains into its broker.
+
+DEFAULT_MAX_PENDING = 1000
+QUEUE_SIZE = 1000
+
+logger = logging.getLogger(__name__)
+
+
+def packet_cursor(event):
+    """Keyset cursor of a packet event (same format as /api/thermal)."""
+    return f"{int(event['time_stamp'])}:{event['id']}"
+
+
+class LiveClient:
+    """One subscriber. send is an async callable taking a message dict."""
+
+    def __init__(self, send, max_pending=DEFAULT_MAX_PENDING):
+        self.send = send
+        self.max_pending = max_pending
+        self.subscriptions = set()   # (name, flight_id); None matches anything
+        self.messages_sent = 0
+        self.packets_dropped = 0
+        self.closed = False
+
+        self._packets = []
+        self._status = {}            # name -> latest unsent status event
+        self._gaps = {}              # (name, flight_id) -> cursor the gap starts after
+        self._sent = {}              # (name, flight_id) -> cursor of the last row sent
+        self._flushing = False
+
+    def wants(self, event):
+        for name, flight_id in self.subscriptions:
+            if name is not None and name != event["name"]:
+                continue
+            if flight_id is None or event["type"] == "status" or flight_id == event["flight_id"]:
+                return True
+        return False
+
+    def offer(self, event):
+        """Buffer an event for sending. Call on the IOLoop."""
+        if self.closed:
+            return
+        if event["type"] == "status":
+            self._status[event["name"]] = event
+        elif event["type"] == "gap":
+            key = (event["name"], event["flight_id"])
+            self._gaps.setdefault(key, self._sent.get(key))
+        else:
+            key = (event["name"], event["flight_id"])
+            if key in self._gaps:
+                # The backfill from the gap cursor will include this row
+                return
+            self._packets.append(event)
+            if len(self._packets) > self.max_pending:
+                self._drop_packets()
+
+        if not self._flushing:
+            self._flushing = True
+            tornado.ioloop.IOLoop.current().add_callback(self._flush)
+
+    def _drop_packets(self):
+        for event in self._packets:
+            key = (event["name"], event["flight_id"])
+            if key not in self._gaps:
+                self._gaps[key] = self._sent.get(key)
+        self.packets_dropped += len(self._packets)
+        self._packets = []
+
+    def _take(self):
+        message = {"type": "update"}
+        if self._packets:
+            for event in self._packets:
+                self._sent[(event["name"], event["flight_id"])] = packet_cursor(event)
+            message["packets"] = self._packets
+            self._packets = []
+        if self._status:
+            message["status"] = list(self._status.values())
+            self._status = {}
+        if self._gaps:
+            message["gaps"] = [
+                {"name": name, "flight_id": flight_id, "after": after}
+                for (name, flight_id), after in self._gaps.items()
+            ]
+            self._gaps = {}
+        return message
+
+    async def _flush(self):
+        try:
+            while not self.closed and (self._packets or self._status or self._gaps):
+                await self.send(self._take())
+                self.messages_sent += 1
+        except Exception as e:
+            logger.info(f"Live client send failed, closing: {e}")
+            self.closed = True
+        finally:
+            self._flushing = False
+
+
+class LiveBroker:
+
+    def __init__(self, max_pending=DEFAULT_MAX_PENDING):
+        self.max_pending = max_pending
+        self.events_published = 0
+        self._loop = None
+        self._clients = set()
+        self._by_name = {}           # fire name (None for all fires) -> clients
+
+    def attach(self, loop=None):
+        """Deliver published events on loop (the server's IOLoop)."""
+        self._loop = loop or tornado.ioloop.IOLoop.current()
+
+    def publish(self, events):
+        """Hand committed events to the subscribers. Safe from any thread."""
+        if self._loop is not None and events:
+            self._loop.add_callback(self._dispatch, list(events))
+
+    def connect(self, send):
+        client = LiveClient(send, self.max_pending)
+        self._clients.add(client)
+        return client
+
+    def disconnect(self, client):
+        client.closed = True
+        self._clients.discard(client)
+        self._remove(client, set(client.subscriptions))
+
+    def subscribe(self, client, name=None, flight_id=None):
+        client.subscriptions.add((name, flight_id))
+        self._by_name.setdefault(name, set()).add(client)
+
+    def unsubscribe(self, client, name=None, flight_id=None):
+        self._remove(client, {(name, flight_id)} & client.subscriptions)
+
+    def _remove(self, client, subscriptions):
+        client.subscriptions -= subscriptions
+        for name in {sub[0] for sub in subscriptions}:
+            if any(sub[0] == name for sub in client.subscriptions):
+                continue
+            clients = self._by_name.get(name)
+            if clients is not None:
+                clients.discard(client)
+                if not clients:
+                    del self._by_name[name]
+
+    def _dispatch(self, events):
+        self.events_published += len(events)
+        everyone = self._by_name.get(None, ())
+        for event in events:
+            for client in self._by_name.get(event["name"], ()):
+                if client.wants(event):
+                    client.offer(event)
+            for client in everyone:
+                if client.wants(event):
+                    client.offer(event)
+
+    def stats(self):
+        return {
+            "clients": len(self._clients),
+            "events_published": self.events_published,
+            "packets_dropped": sum(client.packets_dropped for client in self._clients),
+        }
+
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        _broker = LiveBroker()
+    return _broker
+
+
+def queue_publisher(live_queue):
+    """Listener for database.add_listener that forwards events to another
+    process. Never blocks the ingest path: when the queue is full the events
+    are dropped and the next publish starts with a gap event for each flight
+    that lost packets, so its subscribers backfill them through the API.
+    """
+    lost = set()
+
+    def publish(events):
+        if lost:
+            events = [{"type": "gap", "name": name, "flight_id": flight_id}
+                      for name, flight_id in lost] + list(events)
+        try:
+            live_queue.put_nowait(events)
+            lost.clear()
+        except queue.Full:
+            publish.dropped += len(events)
+            lost.update((e["name"], e["flight_id"]) for e in events if e["type"] != "status")
+
+    publish.dropped = 0
+    return publish
+
+
+def start_queue_relay(live_queue, broker=None):
+    """Drain events another process put on live_queue into the broker."""
+    broker = broker or get_broker()
+
+    def relay():
+        while True:
+            events = live_queue.get()
+            if events is None:
+                break
+            broker.publish(events)
+
+    thread = threading.Thread(target=relay, name="LiveRelay", daemon=True)
+    thread.start()
+    return thread
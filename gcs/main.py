@@ -24,6 +24,8 @@ from PyQt5.QtGui import QPixmap
 from serial.tools import list_ports
 from radio import start_radio
 from backend_server import start_server
+from tornado.options import options, parse_command_line
+from live_broker import QUEUE_SIZE
 
 radio_proc = None
 server_proc = None
@@ -57,6 +59,7 @@ class GCSMainWindow(QMainWindow):
         self.radio_process = None
         self.server_process = None
         self.q_transciever_functional = mp.Queue()
+        self.q_live = mp.Queue(QUEUE_SIZE)  # radio ingest -> server live broker
 
         # Tab Widget
         self.tabs = QTabWidget()
@@ -81,7 +84,7 @@ class GCSMainWindow(QMainWindow):
         # Start Server Process!!!
         self.server_process = mp.Process(
             target=start_server,
-            args=()
+            args=(self.q_live,)
         )
         self.server_process.start()
 
@@ -372,7 +375,8 @@ class GCSMainWindow(QMainWindow):
         # Start fresh process
         self.radio_process = mp.Process(
             target=start_radio,
-            args=(self.prog_mode, self.trans_port, self.call_sign, self.flight_session_name, self.q_transciever_functional)
+            args=(self.prog_mode, self.trans_port, self.call_sign, self.flight_session_name, self.q_transciever_functional, self.q_live),
+            kwargs={"db_path": options.db_path}   # the database the server reads
         )
         self.radio_process.start()
 
@@ -513,6 +517,8 @@ def show_splash_screen(app):
 
 
 if __name__ == "__main__":
+    # Server options (--db_path ...), start_server parses them again in its process
+    parse_command_line()
     app = QApplication(sys.argv)
 
     # Show splash screen with fade
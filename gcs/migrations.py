@@ -0,0 +1,410 @@
+import sqlite3
+import time
+
+# Schema migrations for wildfire_data.db.
+#
+# Each migration is (version, description, function). Migrations run in
+# version order, each in its own transaction, and the applied versions are
+# recorded in schema_version so every database is brought up to date exactly
+# once. Never edit a migration that has shipped, append a new one instead.
+
+
+def _baseline_tables(cursor):
+    """Tables as they existed before versioning (safe on existing databases)."""
+    # sync_status refers to whether data is synced to Firebase
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS wildfires (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            pac_id INTEGER NOT NULL DEFAULT -1,
+            latitude REAL,
+            longitude REAL,
+            alt REAL,
+            high_temp REAL,
+            low_temp REAL,
+            date_received STRING,
+            time_received STRING,
+            status TEXT DEFAULT 'active',
+            sync_status TEXT DEFAULT 'pending',
+            time_stamp REAL,
+            heading REAL,
+            speed REAL,
+            flight_id INTEGER NOT NULL DEFAULT -1,
+            session_id STRING
+        )
+        """
+    )
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS wildfire_status (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            location TEXT,
+            size REAL DEFAULT 0.0,
+            intensity REAL DEFAULT 0.0,
+            alt_avg REAL DEFAULT 0.0,
+            status TEXT DEFAULT 'active',
+            max_temp REAL DEFAULT 0.0,
+            min_temp REAL DEFAULT 0.0,
+            avg_latitude REAL DEFAULT 0.0,
+            avg_longitude REAL DEFAULT 0.0,
+            flights REAL DEFAULT 0.0,
+            num_data_points REAL DEFAULT 0.0,
+            first_time_stamp REAL,
+            time_stamp REAL,
+            last_flight_id INTEGER DEFAULT NULL
+        )
+        """
+    )
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS flights (
+            flight_id INTEGER,
+            name TEXT,
+            session_id STRING,
+            ulog_filename TEXT,
+            time_started REAL,
+            time_ended
+        )
+        """
+    )
+
+
+def _packet_key(cursor):
+    """Unique packet identity, used by ingest for INSERT OR IGNORE dedup."""
+    # Older databases may hold duplicates from before this key existed, keep
+    # the first copy of each so the unique index can be built. The index
+    # treats NULLs as distinct while GROUP BY puts them in one group, so rows
+    # with a NULL key column are not duplicates and are left alone.
+    cursor.execute(
+        """
+        DELETE FROM wildfires
+         WHERE session_id IS NOT NULL AND time_stamp IS NOT NULL
+           AND id NOT IN (
+            SELECT MIN(id) FROM wildfires
+             WHERE session_id IS NOT NULL AND time_stamp IS NOT NULL
+             GROUP BY session_id, pac_id, time_stamp
+         )
+        """
+    )
+    cursor.execute(
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_wildfires_packet
+            ON wildfires (session_id, pac_id, time_stamp)
+        """
+    )
+
+
+def _hot_path_indexes(cursor):
+    """Indexes matching the filters used by the API handlers and sync."""
+    # ThermalDataHandler / FlightDataHandler / LiveFlightHandler point queries
+    # (name, flight_id) ordered by time_stamp
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_wildfires_name_flight_time ON wildfires (name, flight_id, time_stamp)"
+    )
+    # ThermalDataHandler without flight_id, update_fire_status 24h window
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_wildfires_name_time ON wildfires (name, time_stamp)"
+    )
+    # sync_to_firebase only ever looks for pending rows, keep the index small
+    cursor.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_wildfires_pending
+            ON wildfires (sync_status, id) WHERE sync_status = 'pending'
+        """
+    )
+    # WildfireStatusHandler history and FireComparisonHandler lookups
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_status_name_time ON wildfire_status (name, time_stamp)"
+    )
+    # Latest-row-per-fire subqueries filtered by status
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_status_status_name_time ON wildfire_status (status, name, time_stamp)"
+    )
+    # Flight lookups by fire, by session (process_new_flight) and by start time
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_flights_name_flight ON flights (name, flight_id)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_flights_name_session ON flights (name, session_id)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_flights_time_started ON flights (time_started)"
+    )
+
+
+def _geocode_cache(cursor):
+    """Persistent reverse geocoding results, keyed on a coarse lat/lon cell."""
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS geocode_cache (
+            cell TEXT PRIMARY KEY,
+            location TEXT,
+            source TEXT,
+            updated_at REAL
+        )
+        """
+    )
+
+
+def _sync_state(cursor):
+    """Firebase sync high-water mark on wildfires.id."""
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS sync_state (
+            key TEXT PRIMARY KEY,
+            value INTEGER
+        )
+        """
+    )
+    # Rows below the mark are only revisited while still pending, so start it
+    # at the current end of the table: anything already synced stays synced.
+    cursor.execute(
+        """
+        INSERT OR IGNORE INTO sync_state (key, value)
+        SELECT 'firebase_watermark', COALESCE(MAX(id), 0) FROM wildfires
+        """
+    )
+
+
+def _telemetry(cursor):
+    """Avionics telemetry samples and the per-packet merge marker."""
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS telemetry (
+            time_stamp INTEGER PRIMARY KEY,
+            latitude REAL,
+            longitude REAL,
+            alt REAL,
+            heading REAL,
+            speed REAL
+        )
+        """
+    )
+    columns = [row[1] for row in cursor.execute("PRAGMA table_info(wildfires)").fetchall()]
+    if "telemetry_ts" not in columns:
+        cursor.execute("ALTER TABLE wildfires ADD COLUMN telemetry_ts INTEGER")
+    # Rows the old update_mission_data already filled in count as merged
+    cursor.execute(
+        "UPDATE wildfires SET telemetry_ts = time_stamp WHERE heading IS NOT NULL AND heading != 0"
+    )
+    # update_mission_data only looks at recent packets that are not merged yet
+    cursor.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_wildfires_unmerged
+            ON wildfires (time_stamp) WHERE telemetry_ts IS NULL
+        """
+    )
+
+
+def _rollups(cursor):
+    """1 and 15 minute time series per fire and per flight, backfilled."""
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS rollups (
+            resolution INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            flight_id INTEGER NOT NULL,
+            bucket INTEGER NOT NULL,
+            count INTEGER NOT NULL,
+            sum_high REAL,
+            sum_low REAL,
+            min_temp REAL,
+            max_temp REAL,
+            sum_alt REAL,
+            min_lat REAL,
+            max_lat REAL,
+            min_lon REAL,
+            max_lon REAL,
+            first_ts INTEGER,
+            last_ts INTEGER,
+            PRIMARY KEY (resolution, name, flight_id, bucket)
+        ) WITHOUT ROWID
+        """
+    )
+    # Backfill as rollups.py computed them at this version: 1 and 15 minute
+    # buckets, once per fire (flight_id -2) and once per flight
+    for width in (60_000_000_000, 900_000_000_000):
+        for flight, group in (("-2", "name, bucket"), ("flight_id", "name, flight_id, bucket")):
+            cursor.execute(
+                f"""
+                INSERT INTO rollups (
+                    resolution, name, flight_id, bucket, count, sum_high, sum_low, min_temp, max_temp,
+                    sum_alt, min_lat, max_lat, min_lon, max_lon, first_ts, last_ts
+                )
+                SELECT {width // 1_000_000_000}, name, {flight},
+                       CAST(time_stamp / {width} AS INTEGER) * {width} AS bucket,
+                       COUNT(*), SUM(COALESCE(high_temp, 0)), SUM(COALESCE(low_temp, 0)),
+                       MIN(COALESCE(low_temp, 0)), MAX(COALESCE(high_temp, 0)), SUM(COALESCE(alt, 0)),
+                       MIN(COALESCE(latitude, 0)), MAX(COALESCE(latitude, 0)),
+                       MIN(COALESCE(longitude, 0)), MAX(COALESCE(longitude, 0)),
+                       MIN(time_stamp), MAX(time_stamp)
+                  FROM wildfires
+                 WHERE time_stamp IS NOT NULL
+                 GROUP BY {group}
+                """
+            )
+
+
+def _data_version(cursor):
+    """Per-table change counters for the API response cache."""
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS data_version (
+            key TEXT PRIMARY KEY,
+            version INTEGER NOT NULL,
+            updated_at REAL NOT NULL
+        ) WITHOUT ROWID
+        """
+    )
+    cursor.executemany(
+        "INSERT OR IGNORE INTO data_version (key, version, updated_at) VALUES (?, 1, ?)",
+        [(table, time.time()) for table in ("wildfires", "wildfire_status")]
+    )
+
+
+def _fire_current(cursor):
+    """Latest wildfire_status snapshot per fire, backfilled.
+
+    The latest snapshot is the last one written (highest id); from now on
+    update_fire_status upserts it in the same transaction as the snapshot.
+    """
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS fire_current (
+            id INTEGER NOT NULL,
+            name TEXT PRIMARY KEY,
+            location TEXT,
+            size REAL,
+            intensity REAL,
+            alt_avg REAL,
+            status TEXT,
+            max_temp REAL,
+            min_temp REAL,
+            avg_latitude REAL,
+            avg_longitude REAL,
+            flights REAL,
+            num_data_points REAL,
+            first_time_stamp REAL,
+            time_stamp REAL,
+            last_flight_id INTEGER
+        ) WITHOUT ROWID
+        """
+    )
+    cursor.execute(
+        """
+        INSERT OR REPLACE INTO fire_current (
+            id, name, location, size, intensity, alt_avg, status, max_temp, min_temp,
+            avg_latitude, avg_longitude, flights, num_data_points, first_time_stamp,
+            time_stamp, last_flight_id
+        )
+        SELECT
+            id, name, location, size, intensity, alt_avg, status, max_temp, min_temp,
+            avg_latitude, avg_longitude, flights, num_data_points, first_time_stamp,
+            time_stamp, last_flight_id
+        FROM wildfire_status
+        WHERE id IN (SELECT MAX(id) FROM wildfire_status WHERE name IS NOT NULL GROUP BY name)
+        """
+    )
+
+
+def _status_deltas(cursor):
+    """Previous size and intensity on every snapshot, backfilled.
+
+    The previous snapshot is the latest one with an earlier time_stamp, as
+    the fire comparison has always defined it; update_fire_status fills the
+    columns in when it writes a snapshot.
+    """
+    for table in ("wildfire_status", "fire_current"):
+        columns = [row[1] for row in cursor.execute(f"PRAGMA table_info({table})").fetchall()]
+        for column in ("prev_size", "prev_intensity", "prev_time_stamp"):
+            if column not in columns:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} REAL")
+    cursor.execute(
+        """
+        UPDATE wildfire_status AS w
+           SET (prev_size, prev_intensity, prev_time_stamp) = (
+                SELECT p.size, p.intensity, p.time_stamp
+                FROM wildfire_status AS p
+                WHERE p.name = w.name AND p.time_stamp < w.time_stamp
+                ORDER BY p.time_stamp DESC, p.id DESC
+                LIMIT 1
+           )
+        """
+    )
+    cursor.execute(
+        """
+        UPDATE fire_current
+           SET (prev_size, prev_intensity, prev_time_stamp) = (
+                SELECT prev_size, prev_intensity, prev_time_stamp
+                FROM wildfire_status WHERE wildfire_status.id = fire_current.id
+           )
+        """
+    )
+
+
+def _positions_version(cursor):
+    """Change counter for wildfires rows rewritten in place."""
+    cursor.execute(
+        "INSERT OR IGNORE INTO data_version (key, version, updated_at) VALUES ('wildfire_positions', 1, ?)",
+        (time.time(),)
+    )
+
+
+MIGRATIONS = [
+    (1, "baseline tables", _baseline_tables),
+    (2, "unique packet key on wildfires", _packet_key),
+    (3, "hot path indexes", _hot_path_indexes),
+    (4, "reverse geocoding cache", _geocode_cache),
+    (5, "firebase sync watermark", _sync_state),
+    (6, "telemetry samples", _telemetry),
+    (7, "time series rollups", _rollups),
+    (8, "data version counters", _data_version),
+    (9, "current status per fire", _fire_current),
+    (10, "previous snapshot values for comparisons", _status_deltas),
+    (11, "rewritten wildfires rows counter", _positions_version),
+]
+
+
+def current_version(conn: sqlite3.Connection) -> int:
+    """Returns the highest applied migration version (0 for a new database)."""
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at REAL
+        )
+        """
+    )
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Apply all pending migrations in order. Returns the resulting version."""
+    version = current_version(conn)
+    conn.commit()
+
+    for target, description, apply in MIGRATIONS:
+        if target <= version:
+            continue
+
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN")
+            apply(cursor)
+            cursor.execute(
+                "INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+                (target, description, time.time())
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        version = target
+        print(f"✓ Applied schema migration {target}: {description}")
+
+    return version
@@ -0,0 +1,146 @@
+# DESCRIPTION:
+# V5 keeps the V4 DAT packet as is and adds selective/cumulative
+# acknowledgements on the uplink. Instead of one 17 byte ACK per DAT
+# packet the GCS sends a SAK every few packets (or on a timer):
+#
+#   call sign <6s> | b"SAK" | cumulative pac_id <I> | bitmap <Q> | crc32 <I>
+#
+# which acknowledges every pac_id up to and including the cumulative one,
+# and cumulative + 1 + i for every bit i set in the bitmap.
+#
+# Version negotiation: a V5 drone sends a CAP packet (same size as a DAT
+# packet) every few seconds, naming its session, protocol version and the
+# oldest pac_id it still waits on. Its checksum is seeded with CAP_CRC_SEED,
+# so a V4 GCS drops it as a corrupted packet and keeps sending V4 ACKs,
+# which a V5 drone still understands. A V5 GCS only switches a session to
+# SAKs once it has seen that session's CAP, so V4 drones keep getting ACKs.
+
+
+import struct # For serialization of the data
+import zlib # checksum/error detection
+from .._v4.packet import Packet, Packet_Info, deserialize_pac, MAX_SEND_TIMEOUT_SEC
+from .._v4.packet import Packet_Info_Dict as _V4_Packet_Info_Dict
+
+PROTOCOL_VERSION = 5
+MAX_PAC_ID = 2147483647 # Drone pac_ids run 1..MAX_PAC_ID, then start over at 1
+DAT_PACKET_SIZE = 57
+
+ACK_FORMAT = '<6s3sI'
+SAK_FORMAT = '<6s3sIQ'
+CAP_FORMAT = '<6s3sB19sI'
+ACK_PACKET_SIZE = struct.calcsize(ACK_FORMAT) + 4 # 17
+SAK_PACKET_SIZE = struct.calcsize(SAK_FORMAT) + 4 # 25
+CAP_PACKET_SIZE = DAT_PACKET_SIZE # Fixed size framing of the downlink stays intact
+SAK_BITS = 64
+CAP_CRC_SEED = 0x50525935 # b"PRY5", anything but 0 makes V4 checksums fail
+
+# Uplink packets by type: size in bytes
+UPLINK_SIZES = {b"ACK": ACK_PACKET_SIZE, b"SAK": SAK_PACKET_SIZE}
+
+
+def _call_sign(call_sign):
+    return call_sign.encode('utf-8')[:6].ljust(6, b'\x00')
+
+
+def _with_checksum(payload, seed=0):
+    return payload + struct.pack('<I', zlib.crc32(payload, seed))
+
+
+def next_pac_id(pac_id):
+    return 1 if pac_id >= MAX_PAC_ID else pac_id + 1
+
+
+def pac_id_distance(newer, older):
+    """How far newer is ahead of older, across the wraparound (MAX_PAC_ID is followed by 1)."""
+    return (newer - older) % MAX_PAC_ID
+
+
+def serialize_ack(call_sign, pac_id):
+    """V4 ACK of a single DAT packet."""
+    return _with_checksum(struct.pack(ACK_FORMAT, _call_sign(call_sign), b"ACK", pac_id))
+
+
+def serialize_sak(call_sign, cumulative, bitmap):
+    return _with_checksum(struct.pack(SAK_FORMAT, _call_sign(call_sign), b"SAK", cumulative, bitmap))
+
+
+def serialize_cap(call_sign, session_id, base_pac_id, version=PROTOCOL_VERSION):
+    payload = struct.pack(CAP_FORMAT, _call_sign(call_sign), b"CAP", version,
+                          session_id.encode('utf-8')[:19].ljust(19, b'\x00'), base_pac_id)
+    payload = payload.ljust(CAP_PACKET_SIZE - 4, b'\x00')
+    return _with_checksum(payload, CAP_CRC_SEED)
+
+
+def deserialize_cap(data):
+    """(session_id, version, base_pac_id) of a CAP packet, None if data is not one."""
+    if len(data) != CAP_PACKET_SIZE:
+        return None
+    payload = data[:-4]
+    if struct.unpack('<I', data[-4:])[0] != zlib.crc32(payload, CAP_CRC_SEED):
+        return None
+    _, pac_type, version, session_id, base_pac_id = struct.unpack_from(CAP_FORMAT, payload)
+    if pac_type != b"CAP":
+        return None
+    return session_id.rstrip(b'\x00').decode('utf-8'), version, base_pac_id
+
+
+def split_uplink(buffer):
+    """Splits received uplink bytes into ACK and SAK packets.
+
+    Returns (packets, rest): packets are ("ACK", pac_id) and
+    ("SAK", cumulative, bitmap) tuples, rest the bytes of an incomplete
+    packet to prepend to the next read. Bytes that do not start a valid
+    packet are skipped one at a time until the stream lines up again.
+    """
+    packets = []
+    start = 0
+    while len(buffer) - start >= 9:
+        size = UPLINK_SIZES.get(bytes(buffer[start + 6:start + 9]))
+        if size is None:
+            start += 1
+            continue
+        if len(buffer) - start < size:
+            break
+        frame = bytes(buffer[start:start + size])
+        if zlib.crc32(frame[:-4]) != struct.unpack('<I', frame[-4:])[0]:
+            start += 1
+            continue
+        if size == ACK_PACKET_SIZE:
+            _, _, pac_id = struct.unpack_from(ACK_FORMAT, frame)
+            packets.append(("ACK", pac_id))
+        else:
+            _, _, cumulative, bitmap = struct.unpack_from(SAK_FORMAT, frame)
+            packets.append(("SAK", cumulative, bitmap))
+        start += size
+    return packets, bytes(buffer[start:])
+
+
+def sak_covers(pac_id, cumulative, bitmap):
+    """Whether a SAK acknowledges pac_id."""
+    ahead = pac_id_distance(pac_id, cumulative)
+    if ahead == 0 or ahead > MAX_PAC_ID // 2:
+        return True # At or before the cumulative pac_id
+    return ahead <= SAK_BITS and bool(bitmap >> (ahead - 1) & 1)
+
+
+########################################################################
+#   Class Name: Packet_Info_Dict                                       #
+#   Parameters: packet_info_instance<Packet_Info>                      #
+#   Description: V4 Packet_Info_Dict plus the V5 handshake: popping    #
+#                every packet a SAK covers in one call (one round trip #
+#                through the manager proxy instead of one per packet)  #
+########################################################################
+class Packet_Info_Dict(_V4_Packet_Info_Dict):
+
+    def pop_acked(self, cumulative, bitmap):
+        """Pops every packet covered by a SAK, returns their pac_ids."""
+        acked = [pac_id for pac_id in self.master_dictionary if sak_covers(pac_id, cumulative, bitmap)]
+        for pac_id in acked:
+            del self.master_dictionary[pac_id]
+        return acked
+
+    def oldest_pac_id(self, next_to_send):
+        """The unACKed pac_id furthest behind next_to_send (next_to_send if there is none)."""
+        if not self.master_dictionary:
+            return next_to_send
+        return max(self.master_dictionary, key=lambda pac_id: pac_id_distance(next_to_send, pac_id))
@@ -0,0 +1,217 @@
+import gzip
+import json
+import struct
+import zlib
+import numpy as np
+
+# Response encodings of the bulk point endpoints (thermal, flight paths,
+# heatmap data).
+#
+# "json" is the original array of one object per row. "columnar" is one JSON
+# array per field, so keys are not repeated for every point. "binary" is one
+# little-endian typed array per field behind a small JSON header, which the
+# browser can wrap in Float64Array & co. without parsing anything:
+#
+#   b"PYRO" | uint32 header length | header JSON, space padded to 8 bytes | columns
+#
+# The header is {"version", "count", "columns": [{"name", "type", "offset"}],
+# "meta"}; offsets are relative to the end of the header and 8-byte aligned.
+# String columns are dictionary encoded: uint32 indices into the column's
+# "dictionary" list. The format is picked from the Accept header or a
+# ?format= argument, and large bodies are gzip/deflate compressed according
+# to Accept-Encoding.
+
+JSON = "json"
+COLUMNAR = "columnar"
+BINARY = "binary"
+
+COLUMNAR_TYPE = "application/vnd.pyro.columnar+json"
+BINARY_TYPE = "application/vnd.pyro.points"
+CONTENT_TYPES = {JSON: "application/json", COLUMNAR: COLUMNAR_TYPE, BINARY: BINARY_TYPE}
+
+MAGIC = b"PYRO"
+VERSION = 1
+COMPRESS_MIN_BYTES = 1024
+COMPRESS_LEVEL = 6
+
+# Binary types of the narrower columns; other numeric columns are float64
+# (time_stamp is a REAL column, so float64 loses nothing there).
+COLUMN_TYPES = {
+    "id": "uint32",
+    "flight_id": "int32",
+    "pac_id": "int32",
+    "alt": "float32",
+    "altitude": "float32",
+    "high_temp": "float32",
+    "low_temp": "float32",
+}
+_DTYPES = {"uint32": "<u4", "int32": "<i4", "float32": "<f4", "float64": "<f8"}
+
+
+class Points:
+    """A query result as column names and row tuples."""
+
+    __slots__ = ("columns", "rows")
+
+    def __init__(self, columns, rows):
+        self.columns = tuple(columns)
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def value(self, row, column):
+        return self.rows[row][self.columns.index(column)]
+
+    def records(self):
+        """One dict per row, the original response shape."""
+        columns = self.columns
+        return [dict(zip(columns, row)) for row in self.rows]
+
+    def column_lists(self):
+        if not self.rows:
+            return [[] for _ in self.columns]
+        return [list(values) for values in zip(*self.rows)]
+
+
+def fetch_points(conn, query, params=()):
+    """Run query and return its result as Points."""
+    cursor = conn.cursor()
+    cursor.row_factory = None     # plain tuples, whatever the connection uses
+    cursor.execute(query, params)
+    return Points((d[0] for d in cursor.description), cursor.fetchall())
+
+
+def negotiate(accept=None, format_arg=None):
+    """The response format for a request.
+
+    An explicit ?format= wins (ValueError if unknown); otherwise the Accept
+    header selects columnar or binary, and anything else gets json.
+    """
+    if format_arg:
+        if format_arg not in CONTENT_TYPES:
+            raise ValueError(f"format must be one of {sorted(CONTENT_TYPES)}")
+        return format_arg
+    accept = accept or ""
+    if BINARY_TYPE in accept:
+        return BINARY
+    if COLUMNAR_TYPE in accept:
+        return COLUMNAR
+    return JSON
+
+
+def json_array(records, chunk_size=1000):
+    """json.dumps for a large list, encoded in chunks.
+
+    The C encoder holds the GIL for the whole call, so one big dumps on a
+    worker thread would stall the IOLoop just like running it there.
+    """
+    parts = []
+    for start in range(0, len(records), chunk_size):
+        parts.append(json.dumps(records[start:start + chunk_size])[1:-1])
+    return "[" + ",".join(parts) + "]"
+
+
+def encode_json(points, meta=None, field=None):
+    """The original array of row objects."""
+    body = json_array(points.records())
+    if meta is not None:
+        body = json.dumps(meta)[:-1] + (", " if meta else "") + json.dumps(field) + ": " + body + "}"
+    return body.encode("utf-8")
+
+
+def encode_columnar(points, meta=None, field=None):
+    data = {"count": len(points), "columns": dict(zip(points.columns, points.column_lists()))}
+    if meta is not None:
+        data = {**meta, field: data}
+    return json.dumps(data).encode("utf-8")
+
+
+def _binary_column(name, values):
+    """(header entry, little-endian bytes) of one column."""
+    if any(isinstance(v, str) for v in values):
+        dictionary = {}
+        indices = [dictionary.setdefault(v, len(dictionary)) for v in values]
+        return {"name": name, "type": "uint32", "dictionary": list(dictionary)}, \
+            np.asarray(indices, dtype="<u4").tobytes()
+
+    kind = COLUMN_TYPES.get(name, "float64")
+    array = np.asarray(values, dtype=np.float64)     # None -> NaN
+    if kind in ("uint32", "int32") and np.isnan(array).any():
+        kind = "float64"                            # nulls only survive as NaN
+    return {"name": name, "type": kind}, array.astype(_DTYPES[kind]).tobytes()
+
+
+def encode_binary(points, meta=None):
+    columns, blobs, offset = [], [], 0
+    for name, values in zip(points.columns, points.column_lists()):
+        entry, blob = _binary_column(name, values)
+        entry["offset"] = offset
+        columns.append(entry)
+        padding = -len(blob) % 8
+        blobs.append(blob + b"\0" * padding)
+        offset += len(blob) + padding
+
+    header = json.dumps({"version": VERSION, "count": len(points), "columns": columns,
+                         "meta": meta or {}}).encode("utf-8")
+    # magic + length are 8 bytes, so padding the header keeps the columns aligned
+    header += b" " * (-len(header) % 8)
+    return MAGIC + struct.pack("<I", len(header)) + header + b"".join(blobs)
+
+
+def encode(points, fmt, meta=None, field="wildfire_data"):
+    """Encode points in fmt. With meta, the JSON formats nest the points
+    under field of the meta object; binary carries meta in its header.
+    """
+    if fmt == BINARY:
+        return encode_binary(points, meta)
+    if fmt == COLUMNAR:
+        return encode_columnar(points, meta, field)
+    return encode_json(points, meta, field)
+
+
+def accepted_encoding(accept_encoding):
+    """gzip or deflate if the client accepts it (gzip preferred), else None."""
+    accepted = set()
+    for token in (accept_encoding or "").split(","):
+        coding, _, params = token.partition(";")
+        name, _, value = params.strip().partition("=")
+        try:
+            if name.strip() == "q" and float(value) == 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(coding.strip().lower())
+    for coding in ("gzip", "deflate"):
+        if coding in accepted:
+            return coding
+    return None
+
+
+def compress(body, coding):
+    """body compressed with coding, unless it is too small to be worth it.
+
+    Returns (body, content encoding or None).
+    """
+    if coding is None or len(body) < COMPRESS_MIN_BYTES:
+        return body, None
+    if coding == "gzip":
+        return gzip.compress(body, COMPRESS_LEVEL, mtime=0), coding
+    return zlib.compress(body, COMPRESS_LEVEL), coding
+
+
+def decode_binary(body):
+    """Columns of a binary body as {name: list}, and its meta (for tests and tools)."""
+    if body[:4] != MAGIC:
+        raise ValueError("not a binary points body")
+    (length,) = struct.unpack_from("<I", body, 4)
+    header = json.loads(body[8:8 + length])
+    start = 8 + length
+    columns = {}
+    for entry in header["columns"]:
+        dtype = np.dtype(_DTYPES[entry["type"]])
+        values = np.frombuffer(body, dtype, header["count"], start + entry["offset"]).tolist()
+        if "dictionary" in entry:
+            values = [entry["dictionary"][i] for i in values]
+        columns[entry["name"]] = values
+    return columns, header["meta"]
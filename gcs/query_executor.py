@@ -0,0 +1,74 @@
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+import tornado.ioloop
+import tornado.locks
+import db_pool
+
+# Runs database work for the Tornado handlers off the IOLoop.
+#
+# Each worker thread of the bounded pool keeps its own pooled connection
+# (db_pool.get_connection), so at most max_workers queries run at once and the
+# IOLoop only ever waits on futures. Heavy requests (full table dumps and
+# exports) additionally take a slot of a small semaphore, so a few of them can
+# never occupy every worker and starve the cheap map and status endpoints.
+
+DEFAULT_WORKERS = 4
+DEFAULT_HEAVY_LIMIT = 1
+
+
+class QueryExecutor:
+
+    def __init__(self, max_workers=DEFAULT_WORKERS, heavy_limit=DEFAULT_HEAVY_LIMIT):
+        self.max_workers = max_workers
+        self.heavy_limit = heavy_limit
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db")
+        self._heavy = tornado.locks.Semaphore(heavy_limit)
+
+    @staticmethod
+    def _call(fn, row_factory, args):
+        conn = db_pool.get_connection(row_factory)
+        try:
+            result = fn(conn, *args)
+            if conn.in_transaction:
+                conn.commit()
+            return result
+        except BaseException:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+
+    async def run(self, fn, *args, row_factory=sqlite3.Row):
+        """Run fn(conn, *args) on a worker's connection and return its result.
+
+        Anything fn leaves uncommitted is committed when it returns.
+        """
+        return await tornado.ioloop.IOLoop.current().run_in_executor(
+            self._pool, self._call, fn, row_factory, args
+        )
+
+    async def run_heavy(self, fn, *args, row_factory=sqlite3.Row):
+        """Like run(), but at most heavy_limit of these run at the same time."""
+        async with self._heavy:
+            return await self.run(fn, *args, row_factory=row_factory)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
+
+
+_executor = None
+
+
+def configure(max_workers=DEFAULT_WORKERS, heavy_limit=DEFAULT_HEAVY_LIMIT):
+    """Replace the shared executor (call before the IOLoop starts)."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown()
+    _executor = QueryExecutor(max_workers, heavy_limit)
+    return _executor
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = QueryExecutor()
+    return _executor
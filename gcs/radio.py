@@ -20,17 +20,26 @@ import requests
 import argparse
 import multiprocessing as mp
 from packet_class._v4.packet import Packet, deserialize_pac
+from packet_class._v5.packet import serialize_ack, deserialize_cap
 import time
 import os
-import csv
+import queue
 import pandas as pd
 import numpy
-from database import process_packet
+import db_pool
+import session_log
+from dedup_window import SessionDedup, FIRST, NEW, WRAPAROUND, LATE, DUPLICATE
+from selective_ack import SelectiveAcks, SAK_DUE, ACK_ALONE
+from stream_decoder import DownlinkDecoder, CAP
+from ingest_writer import drain, write_batch, queue_depth, BatchStats
+from database import add_listener, flush_flights
+from live_broker import queue_publisher
 # FOR DESKAPP
 import sys
 import os
 import subprocess
 import signal
+import threading
 
 # ------------------ #
 # NETWORK MANAGEMENT #
@@ -39,15 +48,32 @@ DAT_PACKET_SIZE = 57 #32  # ADJUST?
 REQ_PACKET_SIZE = (3 + 4) # String (of three letters) + integer size
 DRONE_ADDRESS = ("127.0.0.1", 5004)  # Localhost UDP port for drone in mode 2
 UDP_PORT = 5005 # Port for UDP communication in debug mode (2)
+UDP_RECEIVE_SIZE = 4096 # Largest datagram read, the decoder splits it into packets
 rf_serial = None
 CALL_SIGN = "KK72PA"
 WRAPAROUND_THRESHOLD = 200
 MAX_PACKET_ID = 2147483647
+DEDUP_WINDOW = 4096         # most recent pac_ids remembered per session (power of two)
+DEDUP_OVERFLOW = 256        # late pac_ids older than the window remembered per session
+DEDUP_MAX_SESSIONS = 8      # sessions tracked at once, least recently active dropped
+SAK_EVERY = 16              # V5 sessions: DAT packets acknowledged by one SAK at most
+SAK_INTERVAL = 1.0          # V5 sessions: seconds a received DAT packet may wait for its SAK
+
+# ----------------- #
+# DATABASE HAND-OFF #
+# ----------------- #
+INGEST_BATCH_SIZE = 500     # most packets written in one transaction
+INGEST_MAX_LATENCY = 0.25   # seconds the first packet of a batch may wait for more
+STATS_INTERVAL = 60         # seconds between queue depth / batch size reports
+CONSUMER_STOP_TIMEOUT = 10  # seconds start_radio waits for the queued packets to be written
 
 # --------------- #
 # LOGS MANAGEMENT #
 # --------------- #
 LOG_DIR = "trans_logs"  # Folder to store logs of packet transmissions
+LOG_FORMAT = session_log.CSV    # or session_log.BINARY, see session_log.convert_to_csv
+LOG_FLUSH_ROWS = 256        # buffered log records written out together
+LOG_FLUSH_INTERVAL = 1.0    # seconds a buffered log record may wait
 os.makedirs(LOG_DIR, exist_ok=True)
 
 
@@ -59,31 +85,81 @@ os.makedirs(LOG_DIR, exist_ok=True)
 #   Description:                                                       #
 #   Return:                                                            #
 ########################################################################
-def send_packet_to_server(flight_session_name, q_unser_packets):
-    """Sends the decoded packet to the server."""
+def send_packet_to_server(flight_session_name, q_unser_packets, q_live=None, stats_interval=STATS_INTERVAL,
+                          db_path=None):
+    """Writes the decoded packets to the database, one transaction per batch.
+
+    Blocks on the queue while no packets come in. Once one arrives, every
+    packet that follows within INGEST_MAX_LATENCY (up to INGEST_BATCH_SIZE)
+    joins it and the batch is written in one transaction by write_batch,
+    which retries a locked database and drops only the packets that fail
+    on their own. Queue depth and the batch size distribution are reported
+    every stats_interval seconds. A None on the queue stops the consumer,
+    as does SIGTERM (start_radio's cleanup) when this is the process's main
+    thread. Either way the batch being written is finished and the pending
+    flight end times are flushed before it returns.
+    Packets go to db_path (the server's --db_path) when it is given.
+    Returns its BatchStats.
+    """
     if prog_mode != 0:
         print(f"SP: STARTING PROCESS")
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
 
-    while True:
-        if not q_unser_packets.empty():
-            try:
-                packet = q_unser_packets.get()
-
-                packet_data = {
-                    "pac_id": packet.pac_id,
-                    "gps_data": packet.gps_data,
-                    "alt": packet.alt,
-                    "high_temp": packet.high_temp,
-                    "low_temp": packet.low_temp,
-                    "time_stamp": packet.time_stamp,
-                    "session_id": packet.session_id
-                }
-
-                process_packet(packet_data, flight_session_name, "active")
-            except requests.RequestException as e:
-                print(f"Error connecting to the server: {e}")
-        else:
-            pass
+    # Same database as the server, whichever start method made this process
+    if db_path is not None:
+        db_pool.configure(db_path)
+
+    # Committed packets are forwarded to the server's live WebSocket clients
+    if q_live is not None:
+        add_listener(queue_publisher(q_live))
+
+    conn = db_pool.connect()
+    stats = BatchStats()
+    next_report = time.monotonic() + stats_interval
+    stop = False
+    batch = None  # drained, not yet written
+
+    try:
+        while not stop:
+            packets, stop = drain(q_unser_packets, INGEST_BATCH_SIZE, INGEST_MAX_LATENCY,
+                                  idle_timeout=max(0.0, next_report - time.monotonic()))
+            if packets:
+                started = time.perf_counter()
+                batch = [(packet_data(packet), flight_session_name, "active") for packet in packets]
+                write_batch(batch, conn, log_prefix="SP: ")
+                batch = None
+                stats.record(len(packets), queue_depth(q_unser_packets), time.perf_counter() - started)
+
+            if time.monotonic() >= next_report:
+                print(f"SP: {stats.summary()}")
+                next_report = time.monotonic() + stats_interval
+    finally:
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        try:
+            # Interrupted mid-write: process_packet_batch rolled it back, and
+            # rewriting a committed one only finds duplicates
+            if batch:
+                write_batch(batch, conn, log_prefix="SP: ")
+            flush_flights(conn, force=True)
+            conn.commit()
+        except Exception as e:
+            print(f"SP: Error writing flight end times: {e}")
+        conn.close()
+    return stats
+
+def packet_data(packet):
+    """Decoded Packet -> the packet dict the database layer takes."""
+    return {
+        "pac_id": packet.pac_id,
+        "gps_data": packet.gps_data,
+        "alt": packet.alt,
+        "high_temp": packet.high_temp,
+        "low_temp": packet.low_temp,
+        "time_stamp": packet.time_stamp,
+        "session_id": packet.session_id
+    }
 
 
 
@@ -95,79 +171,56 @@ def send_packet_to_server(flight_session_name, q_unser_packets):
 #                transmissions for debugging and performance eval.     #
 #   Return: None                                                       #
 ########################################################################
-def get_session_filename(session_id):
+def get_session_filename(session_id, fmt=session_log.CSV):
     """Generate session-specific file name."""
-    folder = "trans_logs"
-    os.makedirs(folder, exist_ok=True)  # Make sure the folder exists
-    return os.path.join(folder, f"session_{session_id}.csv")
-
-def setup_csv_logger(csv_file):
-    """Ensure CSV file has headers."""
-    if not os.path.exists(csv_file):
-        with open(csv_file, mode="w", newline="") as file:
-            writer = csv.writer(file)
-            writer.writerow(["timestamp", "session_id", "packet_id", "pac_type", 
-                             "send(s)/receive(r)", "trans_type", "num_transmissions", "corrupted"])
-
-def radio_log_listener(q_log):
-    """Process that listens for logs and writes them to CSV."""    
-    while True:
-        try:
-            record = q_log.get()
+    os.makedirs(LOG_DIR, exist_ok=True)  # Make sure the folder exists
+    return session_log.session_filename(LOG_DIR, session_id, fmt)
+
+def radio_log_listener(q_log, log_format=LOG_FORMAT):
+    """Process that listens for logs and writes them to the session logs.
+
+    Files stay open and rows are buffered, flushed every LOG_FLUSH_ROWS
+    records or LOG_FLUSH_INTERVAL seconds, and when the listener stops
+    (None on the queue, or SIGTERM from start_radio's cleanup).
+    """
+    signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+    with session_log.SessionLogWriter(LOG_DIR, log_format, flush_rows=LOG_FLUSH_ROWS,
+                                      flush_interval=LOG_FLUSH_INTERVAL) as writer:
+        while True:
+            try:
+                record = q_log.get(timeout=LOG_FLUSH_INTERVAL)
+            except queue.Empty:
+                writer.flush_if_due()
+                continue
             if record is None:
                 break  # Stop listener when None is received
-
-            csv_file = record["csv_file"]
-            setup_csv_logger(csv_file)  # Ensure headers if file doesn't exist
-
-            # Open and write within the same block
-            with open(csv_file, mode="a", newline="") as file:
-                writer = csv.writer(file)
-                writer.writerow([
-                    record["timestamp"], 
-                    record["session_id"], 
-                    record["packet_id"], 
-                    record["pac_type"], 
-                    record["send(s)/receive(r)"], 
-                    record["trans_type"], 
-                    record["num_transmissions"], 
-                    record["corrupted"]
-                ])
-                file.flush()
-
-        except Exception as e:
-            print("Logging error:", e)
+            try:
+                writer.write(*record)
+            except Exception as e:
+                print("Logging error:", e)
 
 
 def log_trans_gcs(session_id, pac_id, pac_type, send_or_recieve, num_transmissions, corrupted, q_log):
-    timestamp = time.strftime("%Y-%m-%d %H-%M-%S")
-    
     # --- #
     # LOG #
     # --- #
     trans_type = 'RF' if prog_mode != 2 else 'UDP'
-    
-    # Determine file for the session
-    csv_file = get_session_filename(session_id)
-    
-    q_log.put({"csv_file": csv_file,
-               "timestamp": timestamp, 
-               "session_id": session_id, 
-               "packet_id": pac_id, 
-               "send(s)/receive(r)": send_or_recieve, 
-               "pac_type": pac_type, 
-               "trans_type": trans_type, 
-               "num_transmissions": num_transmissions, 
-               "corrupted": corrupted})
+
+    # Fields in SessionLogWriter.write order, the timestamp is formatted when written
+    q_log.put((time.time(), session_id, pac_id, pac_type, send_or_recieve,
+               trans_type, num_transmissions, corrupted))
 
 def aggregate_logs(session_ids):
     """Aggregate logs from different session CSVs into a single dataframe."""
     all_data = []
     for session_id in session_ids:
         csv_file = get_session_filename(session_id)
+        binary_file = get_session_filename(session_id, session_log.BINARY)
         if os.path.exists(csv_file):
-            data = pd.read_csv(csv_file)
-            all_data.append(data)
+            all_data.append(pd.read_csv(csv_file))
+        elif os.path.exists(binary_file):
+            _, rows = session_log.read_binary(binary_file)
+            all_data.append(pd.DataFrame(rows, columns=session_log.LOG_FIELDS))
     return pd.concat(all_data, ignore_index=True)
 
 
@@ -188,7 +241,7 @@ def receive_and_decode_packets(prog_mode, rf_serial_usb_port, q_unser_packets, q
         rf_serial = serial.Serial(
             port=rf_serial_usb_port,
             baudrate=57600,
-            timeout=10,
+            timeout=SAK_INTERVAL,  # reads return partial data, the decoder keeps it
             rtscts=True,
             dsrdtr=True,
             write_timeout=10
@@ -210,144 +263,119 @@ def receive_and_decode_packets(prog_mode, rf_serial_usb_port, q_unser_packets, q
             print(f"RD: Error opening serial port: {e}")
             return
         
-    # Dictionary for logging packet transmissions
-    data_pacs_received = {} # {(SESSION_ID, PAC_ID) -> TIMES PACKET RECEIVED}
-    highest_pac_id_received = {} # per session_id
-        
+    # Duplicate detection, bounded per session (see dedup_window.py)
+    dedup = SessionDedup(DEDUP_WINDOW, DEDUP_OVERFLOW, DEDUP_MAX_SESSIONS,
+                         MAX_PACKET_ID, WRAPAROUND_THRESHOLD)
+    # V5 drones get a SAK every few packets instead of an ACK per packet
+    selective_acks = SelectiveAcks(dedup, call_sign, SAK_EVERY, SAK_INTERVAL)
+    if prog_mode == 2:
+        udp_socket.settimeout(SAK_INTERVAL)  # wake up for SAKs that are due
+    decoder = DownlinkDecoder(DAT_PACKET_SIZE)
+
+    def send_uplink(serialized_data):
+        if prog_mode != 2:
+            rf_serial.write(serialized_data)
+        else:
+            udp_socket.sendto(serialized_data, DRONE_ADDRESS)
+
+    def send_sak(session):
+        cumulative, bitmap, sak = selective_acks.sak(session)
+        send_uplink(sak)
+        if prog_mode != 0:
+            print(f"RD: SAK up to ID {cumulative} (+{bin(bitmap).count('1')}) sent for session {session}")
+        log_trans_gcs(session, cumulative, "SAK", "s", 1, False, q_log)
+
     # Program loop for receiving, deserializing, sending ACKs, and shipping
     # off packets to the send_packet_to_server() method
     while True:
         try:
+            # SAKs whose timer ran out
+            for session in selective_acks.due():
+                send_sak(session)
+
             # Receive the data off the bus
             if prog_mode == 2:
-                data, addr = udp_socket.recvfrom(DAT_PACKET_SIZE)
+                try:
+                    data, addr = udp_socket.recvfrom(UDP_RECEIVE_SIZE)
+                except socket.timeout:
+                    continue
                 print(f"Received packet from {addr}")
-            # Read the serialized data from the RF module
+            # Read the serialized data from the RF module, whatever has come in
             else:
-                data = rf_serial.read(DAT_PACKET_SIZE)
+                data = rf_serial.read(rf_serial.in_waiting or 1)
 
-            # Decode Packet info for debugging modes
-            if prog_mode != 0:
-                print(f"\nPACKET LENGTH: {len(data)}")
-                print(f'PACKET RECEIVED: {data.hex()}')  # Print as hex for readability
-                if len(data) != DAT_PACKET_SIZE:
-                    print("Incomplete packet received, skipping...")
-                    continue
-
-            # Unpack the payload and checksum
-            payload = data[:-4]  # setting to all but the sum . . . 
-            received_checksum = struct.unpack('<I', data[-4:])[0] # and here we check that sum
-            computed_checksum = zlib.crc32(payload)
-
-            if computed_checksum != received_checksum:
+            # Split the stream into checksum-valid packets, skipping past
+            # dropped/inserted/garbled bytes (see stream_decoder.py)
+            resyncs = decoder.resyncs
+            packets = decoder.feed(data)
+            if decoder.resyncs != resyncs:
                 log_trans_gcs("", "", "", "r", "", True, q_log)
-                print(f"RD: Checksum mismatch! Packet corrupted. \\ COMPUTED:{computed_checksum}, RECEIVED: {received_checksum}")
-                continue
-
-            # DESERIALIZE THE PAYLOAD, PUT BACK INTO A PACKET
-            dat_pac, dat_checksum = deserialize_pac(data)
-
-            # Print the decoded packet
-            if prog_mode != 0:
-                print(dat_pac)
+                print(f"RD: Corrupted bytes in the stream, resynchronizing ({decoder.skipped_bytes} skipped so far)")
 
+            for kind, data in packets:
+                # Decode Packet info for debugging modes
+                if prog_mode != 0:
+                    print(f"\nPACKET LENGTH: {len(data)}")
+                    print(f'PACKET RECEIVED: {data.hex()}')  # Print as hex for readability
+
+                # A V5 drone's CAP packet, see packet_class/_v5/packet.py
+                if kind == CAP:
+                    cap_session, version, base_pac_id = deserialize_cap(data)
+                    if selective_acks.negotiate(cap_session, version, base_pac_id) and prog_mode != 0:
+                        print(f"RD: Session {cap_session} speaks V{version}, oldest unACKed ID {base_pac_id}")
+                    log_trans_gcs(cap_session, base_pac_id, "CAP", "r", 1, False, q_log)
+                    continue
 
-            # HAS PACKET BEEN RECIEVED?
-            key = (dat_pac.session_id, dat_pac.pac_id)
-            current_id = dat_pac.pac_id
-            session = dat_pac.session_id
+                # DESERIALIZE THE PAYLOAD, PUT BACK INTO A PACKET
+                dat_pac, dat_checksum = deserialize_pac(data)
 
-            # Initialize session
-            if session not in highest_pac_id_received:
-                highest_pac_id_received[session] = current_id
-                data_pacs_received[key] = 1
-                q_unser_packets.put(dat_pac)
+                # Print the decoded packet
                 if prog_mode != 0:
-                    print(f"RD: New session {session}. Accepted first PAC_ID {current_id}.")
-
-            else:
-                highest_id = highest_pac_id_received[session]
+                    print(dat_pac)
 
-                is_wraparound = (
-                    highest_id > MAX_PACKET_ID - WRAPAROUND_THRESHOLD and
-                    current_id < WRAPAROUND_THRESHOLD
-                )
 
-                is_new_packet = (
-                    current_id > highest_id or
-                    is_wraparound
-                )
+                # HAS PACKET BEEN RECIEVED?
+                current_id = dat_pac.pac_id
+                session = dat_pac.session_id
+                outcome, times_received = dedup.receive(session, current_id)
 
-                if is_new_packet:
-                    # Accept the new packet
+                if outcome != DUPLICATE:
                     q_unser_packets.put(dat_pac)
-                    data_pacs_received[key] = 1
-                    highest_pac_id_received[session] = current_id
-                    if prog_mode != 0:
-                        if is_wraparound:
-                            print(f"RD: Wraparound detected. Accepted PAC_ID {current_id} in session {session}.")
-                        else:
-                            print(f"RD: Accepted new PAC_ID {current_id} in session {session}.")
-
-                elif key not in data_pacs_received:
-                    # Accept old but unseen packet (e.g., out-of-order)
-                    q_unser_packets.put(dat_pac)
-                    data_pacs_received[key] = 1
-                    if prog_mode != 0:
+                if prog_mode != 0:
+                    if outcome == FIRST:
+                        print(f"RD: New session {session}. Accepted first PAC_ID {current_id}.")
+                    elif outcome == WRAPAROUND:
+                        print(f"RD: Wraparound detected. Accepted PAC_ID {current_id} in session {session}.")
+                    elif outcome == NEW:
+                        print(f"RD: Accepted new PAC_ID {current_id} in session {session}.")
+                    elif outcome == LATE:
                         print(f"RD: Late/out-of-order PAC_ID {current_id} accepted for session {session}.")
+                    else:
+                        print(f"RD: Duplicate PAC_ID {current_id} in session {session} received {times_received} times.")
 
-                else:
-                    # True duplicate
-                    data_pacs_received[key] += 1
-                    if prog_mode != 0:
-                        print(f"RD: Duplicate PAC_ID {current_id} in session {session} received {data_pacs_received[key]} times.")
-
-
-
-            # # Has the DAT Packet already been received?
-            # if (dat_pac.session_id, dat_pac.pac_id) in data_pacs_received:
-            #     # Outside Wraparound Thresh . . .
-            #     if (highest_pac_id_received[dat_pac.session_id] - WRAPAROUND_THRESHOLD) > dat_pac.pac_id:
-            #         q_unser_packets.put(dat_pac)
-            #         data_pacs_received[(dat_pac.session_id, dat_pac.pac_id)] = 1
-            #         if prog_mode != 0:
-            #             print(f"RD: DAT Pac SESSION_ID {dat_pac.session_id}, PAC_ID {dat_pac.pac_id} has been received {data_pacs_received.get((dat_pac.session_id, dat_pac.pac_id))} for the first time.")
-            #     # Dat already recieved . . .
-            #     else:
-            #         data_pacs_received[(dat_pac.session_id, dat_pac.pac_id)] = data_pacs_received[(dat_pac.session_id, dat_pac.pac_id)] + 1
-            #         if highest_pac_id_received[dat_pac.session_id] < dat_pac.pac_id:
-            #             highest_pac_id_received[dat_pac.session_id] = dat_pac.pac_id
-            #         if prog_mode != 0:
-            #             print(f"RD: DAT Pac SESSION_ID {dat_pac.session_id}, PAC_ID {dat_pac.pac_id} has been received {data_pacs_received.get((dat_pac.session_id, dat_pac.pac_id))} times!")
-            # # Packet Id is completely new . . .
-            # else:
-            #     q_unser_packets.put(dat_pac)
-            #     data_pacs_received[(dat_pac.session_id, dat_pac.pac_id)] = 1
-            #     if prog_mode != 0:
-            #         print(f"RD: DAT Pac SESSION_ID {dat_pac.session_id}, PAC_ID {dat_pac.pac_id} has been received {data_pacs_received.get((dat_pac.session_id, dat_pac.pac_id))} for the first time.")
-
-            # Log/Acknowledge Recipient
-            if prog_mode != 0:
-                print(f"RD: Packet ID {dat_pac.pac_id} unpacked!")
-            log_trans_gcs(dat_pac.session_id, dat_pac.pac_id, "DAT", "r", data_pacs_received[(dat_pac.session_id, dat_pac.pac_id)], False, q_log)
-
-            # ---------------- #
-            # HANDSHAKE METHOD #
-            # ---------------- #
-            ack_payload = struct.pack('<6s3sI', call_sign.encode('utf-8')[:6].ljust(6, b'\x00'), b"ACK", dat_pac.pac_id)
-            ack_checksum = zlib.crc32(ack_payload)
-
-            ack_serialized_data = ack_payload + struct.pack('<I', ack_checksum)  # Append checksum as unsigned int
-            
-            if prog_mode != 2:
-                rf_serial.write(ack_serialized_data)
-            else:
-                udp_socket.sendto(ack_serialized_data, DRONE_ADDRESS)
-                print(f"RD: ACK for ID {dat_pac.pac_id} sent to {DRONE_ADDRESS}")
-                print(f"RD: ACK packet length: {len(ack_serialized_data)}")
-
-            # Log
-            log_trans_gcs(dat_pac.session_id, dat_pac.pac_id, "ACK", "s", 1, False, q_log)
+                # Log/Acknowledge Recipient
+                if prog_mode != 0:
+                    print(f"RD: Packet ID {dat_pac.pac_id} unpacked!")
+                log_trans_gcs(dat_pac.session_id, dat_pac.pac_id, "DAT", "r", times_received, False, q_log)
+
+                # ---------------- #
+                # HANDSHAKE METHOD #
+                # ---------------- #
+                if selective_acks.is_selective(session):
+                    sak_state = selective_acks.received(session, current_id)
+                    if sak_state == SAK_DUE:
+                        send_sak(session)
+                    if sak_state != ACK_ALONE:
+                        continue
+
+                ack_serialized_data = serialize_ack(call_sign, dat_pac.pac_id)
+                send_uplink(ack_serialized_data)
+                if prog_mode == 2:
+                    print(f"RD: ACK for ID {dat_pac.pac_id} sent to {DRONE_ADDRESS}")
+                    print(f"RD: ACK packet length: {len(ack_serialized_data)}")
+
+                # Log
+                log_trans_gcs(dat_pac.session_id, dat_pac.pac_id, "ACK", "s", 1, False, q_log)
 
         except struct.error as e:
             print(f"RD: Error decoding packet: {e}")
@@ -363,7 +391,8 @@ def receive_and_decode_packets(prog_mode, rf_serial_usb_port, q_unser_packets, q
 #   Description:                                                       #
 #   Return: None                                                       #
 ########################################################################
-def start_radio(prog_mode, usb_port_trans, call_sign, flight_session_name, q_transciever_functional):
+def start_radio(prog_mode, usb_port_trans, call_sign, flight_session_name, q_transciever_functional, q_live=None,
+                db_path=None):
     # mp.set_start_method('fork')    # 'spawn' : for windows deployment (and safe on linux)
                                     #           + safer for I/O bound and thread-sensitive tasks
                                     #           + safer with multithreading and c-extension libaries
@@ -420,7 +449,8 @@ def start_radio(prog_mode, usb_port_trans, call_sign, flight_session_name, q_tra
 
     p_rad_log_listener = mp.Process(target=radio_log_listener, args=(q_log,))
     p_rec_and_dec = mp.Process(target=receive_and_decode_packets, args=(prog_mode, usb_port_trans, q_unser_packets, q_log, call_sign,))
-    p_send_pac_to_serv = mp.Process(target=send_packet_to_server, args=(flight_session_name, q_unser_packets,))
+    p_send_pac_to_serv = mp.Process(target=send_packet_to_server, args=(flight_session_name, q_unser_packets, q_live,),
+                                    kwargs={"db_path": db_path})
 
     processes.extend([p_rad_log_listener, p_rec_and_dec, p_send_pac_to_serv])
     try:
@@ -436,6 +466,13 @@ def start_radio(prog_mode, usb_port_trans, call_sign, flight_session_name, q_tra
     finally:
         if prog_mode != 0:
             print("[start_radio] Cleaning up child processes")
+        # Stop the producer, then let the consumer write what is queued
+        if p_rec_and_dec.is_alive():
+            p_rec_and_dec.terminate()
+            p_rec_and_dec.join()
+        if p_send_pac_to_serv.is_alive():
+            q_unser_packets.put(None)
+            p_send_pac_to_serv.join(CONSUMER_STOP_TIMEOUT)
         for p in processes:
             if p.is_alive():
                 p.terminate()
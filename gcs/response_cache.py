@@ -0,0 +1,42 @@
+from collections import OrderedDict
+
+# Encoded API responses keyed by endpoint and arguments.
+#
+# Each entry remembers the data versions (see data_version) it was built from.
+# A lookup with different versions is a miss, so nothing ever has to be
+# invalidated explicitly: the next request after a write rebuilds the entry.
+# Least recently used entries are evicted past max_entries. Only used from the
+# IOLoop, so there is no locking.
+
+DEFAULT_MAX_ENTRIES = 256
+
+
+class ResponseCache:
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()    # key -> (versions, body)
+
+    def get(self, key, versions):
+        """The cached body for key if it was built from versions, else None."""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != versions:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key, versions, body):
+        self._entries[key] = (versions, body)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
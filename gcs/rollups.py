@@ -0,0 +1,174 @@
+# Time series rollups of the wildfires table.
+#
+# Every packet is counted in one bucket per resolution, once for the whole
+# fire (flight_id = FIRE_ROLLUP) and once for its flight. Ingest folds each
+# batch into in-memory buckets and upserts them, so the rollups table is
+# current after every commit and timelines read one row per bucket instead
+# of one row per packet.
+
+RESOLUTIONS = (60, 900)   # bucket widths in seconds: 1 minute and 15 minutes
+FIRE_ROLLUP = -2          # flight_id of the whole-fire rows (-1 is the wildfires default)
+NS = 1_000_000_000
+
+ROLLUP_COLUMNS = (
+    "count", "sum_high", "sum_low", "min_temp", "max_temp", "sum_alt",
+    "min_lat", "max_lat", "min_lon", "max_lon", "first_ts", "last_ts"
+)
+
+
+def bucket_start(time_stamp, resolution):
+    """Start (ns) of the resolution-second bucket holding time_stamp."""
+    width = resolution * NS
+    return int(time_stamp // width) * width
+
+
+class RollupBatch:
+    """Rollup buckets of the packets in one ingest batch."""
+
+    def __init__(self, resolutions=RESOLUTIONS):
+        self.resolutions = resolutions
+        self.buckets = {}   # (resolution, name, flight_id, bucket) -> [ROLLUP_COLUMNS]
+
+    def add(self, name, flight_id, latitude, longitude, alt, high_temp, low_temp, time_stamp):
+        if time_stamp is None:
+            return
+        high_temp = high_temp or 0.0
+        low_temp = low_temp or 0.0
+        latitude = latitude or 0.0
+        longitude = longitude or 0.0
+        alt = alt or 0.0
+        for resolution in self.resolutions:
+            start = bucket_start(time_stamp, resolution)
+            for flight in (FIRE_ROLLUP, flight_id):
+                key = (resolution, name, flight, start)
+                b = self.buckets.get(key)
+                if b is None:
+                    self.buckets[key] = [1, high_temp, low_temp, low_temp, high_temp, alt,
+                                         latitude, latitude, longitude, longitude, time_stamp, time_stamp]
+                    continue
+                b[0] += 1
+                b[1] += high_temp
+                b[2] += low_temp
+                b[3] = min(b[3], low_temp)
+                b[4] = max(b[4], high_temp)
+                b[5] += alt
+                b[6] = min(b[6], latitude)
+                b[7] = max(b[7], latitude)
+                b[8] = min(b[8], longitude)
+                b[9] = max(b[9], longitude)
+                b[10] = min(b[10], time_stamp)
+                b[11] = max(b[11], time_stamp)
+
+    def write(self, cursor):
+        """Merge the batch into the rollups table (caller commits)."""
+        if not self.buckets:
+            return
+        cursor.executemany(
+            f"""
+            INSERT INTO rollups (resolution, name, flight_id, bucket, {", ".join(ROLLUP_COLUMNS)})
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (resolution, name, flight_id, bucket) DO UPDATE SET
+                count    = count    + excluded.count,
+                sum_high = sum_high + excluded.sum_high,
+                sum_low  = sum_low  + excluded.sum_low,
+                min_temp = MIN(min_temp, excluded.min_temp),
+                max_temp = MAX(max_temp, excluded.max_temp),
+                sum_alt  = sum_alt  + excluded.sum_alt,
+                min_lat  = MIN(min_lat, excluded.min_lat),
+                max_lat  = MAX(max_lat, excluded.max_lat),
+                min_lon  = MIN(min_lon, excluded.min_lon),
+                max_lon  = MAX(max_lon, excluded.max_lon),
+                first_ts = MIN(first_ts, excluded.first_ts),
+                last_ts  = MAX(last_ts, excluded.last_ts)
+            """,
+            [(*key, *values) for key, values in self.buckets.items()]
+        )
+        self.buckets.clear()
+
+
+def _group_select(resolution, fire_rollup):
+    """SELECT computing rollup rows from wildfires for one resolution."""
+    width = resolution * NS
+    flight = str(FIRE_ROLLUP) if fire_rollup else "flight_id"
+    group = "name, bucket" if fire_rollup else "name, flight_id, bucket"
+    return f"""
+        SELECT {resolution}, name, {flight}, CAST(time_stamp / {width} AS INTEGER) * {width} AS bucket,
+               COUNT(*), SUM(COALESCE(high_temp, 0)), SUM(COALESCE(low_temp, 0)),
+               MIN(COALESCE(low_temp, 0)), MAX(COALESCE(high_temp, 0)), SUM(COALESCE(alt, 0)),
+               MIN(COALESCE(latitude, 0)), MAX(COALESCE(latitude, 0)),
+               MIN(COALESCE(longitude, 0)), MAX(COALESCE(longitude, 0)),
+               MIN(time_stamp), MAX(time_stamp)
+          FROM wildfires
+         WHERE time_stamp IS NOT NULL {{where}}
+         GROUP BY {group}
+    """
+
+
+def rebuild(cursor, name=None, time_from=None, time_to=None):
+    """Recompute the buckets overlapping [time_from, time_to] from wildfires.
+
+    Used when stored packets change (update_mission_data) and to backfill.
+    With no arguments every bucket is rebuilt.
+    """
+    for resolution in RESOLUTIONS:
+        bucket_where, where, params = "", "", []
+        if name is not None:
+            bucket_where += " AND name = ?"
+            where += " AND name = ?"
+            params.append(name)
+        if time_from is not None:
+            bucket_where += " AND bucket >= ?"
+            where += " AND time_stamp >= ?"
+            params.append(bucket_start(time_from, resolution))
+        if time_to is not None:
+            bucket_where += " AND bucket < ?"
+            where += " AND time_stamp < ?"
+            params.append(bucket_start(time_to, resolution) + resolution * NS)
+
+        cursor.execute(f"DELETE FROM rollups WHERE resolution = ?{bucket_where}", [resolution, *params])
+        for fire_rollup in (True, False):
+            cursor.execute(
+                f"INSERT INTO rollups (resolution, name, flight_id, bucket, {', '.join(ROLLUP_COLUMNS)}) "
+                + _group_select(resolution, fire_rollup).format(where=where),
+                params
+            )
+
+
+def fetch_rollups(cursor, name, resolution, flight_id=None, time_from=None, time_to=None):
+    """Rollup rows of a fire (or one of its flights) as dicts, oldest first."""
+    query = """
+        SELECT bucket, flight_id, count, sum_high, sum_low, min_temp, max_temp, sum_alt,
+               min_lat, max_lat, min_lon, max_lon, first_ts, last_ts
+          FROM rollups
+         WHERE resolution = ? AND name = ? AND flight_id = ?
+    """
+    params = [resolution, name, FIRE_ROLLUP if flight_id is None else flight_id]
+    if time_from is not None:
+        query += " AND bucket >= ?"
+        params.append(bucket_start(time_from, resolution))
+    if time_to is not None:
+        query += " AND bucket <= ?"
+        params.append(time_to)
+    query += " ORDER BY bucket"
+
+    rows = []
+    for (bucket, flight, count, sum_high, sum_low, min_temp, max_temp, sum_alt,
+         min_lat, max_lat, min_lon, max_lon, first_ts, last_ts) in cursor.execute(query, params):
+        rows.append({
+            "time_stamp": bucket,
+            "flight_id": None if flight == FIRE_ROLLUP else flight,
+            "count": count,
+            "high_temp": sum_high / count,
+            "low_temp": sum_low / count,
+            "avg_temp": (sum_high + sum_low) / (2 * count),
+            "max_temp": max_temp,
+            "min_temp": min_temp,
+            "alt_avg": sum_alt / count,
+            "min_lat": min_lat,
+            "max_lat": max_lat,
+            "min_lon": min_lon,
+            "max_lon": max_lon,
+            "first_time_stamp": first_ts,
+            "last_time_stamp": last_ts,
+        })
+    return rows
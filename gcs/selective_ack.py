@@ -0,0 +1,112 @@
+import time
+from collections import OrderedDict
+from packet_class._v5.packet import (PROTOCOL_VERSION, MAX_PAC_ID, SAK_BITS, next_pac_id,
+                                     pac_id_distance, serialize_sak)
+
+# When and what to acknowledge for sessions that speak the V5 handshake.
+#
+# A session switches to SAKs once its drone's CAP packet has come in (see
+# packet_class/_v5/packet.py). From then on received DAT packets are not
+# acknowledged one by one: a SAK goes out once `every` packets are waiting
+# for one, or `interval` seconds after the first of them. It carries the
+# cumulative pac_id, the last one of an unbroken run of received packets
+# starting at the drone's oldest unACKed pac_id, and a bitmap of which of
+# the SAK_BITS following pac_ids were received. Which packets were received
+# is read from the dedup window. A packet too far ahead of the cumulative
+# pac_id for the bitmap to reach gets a V4 ACK of its own, which V5 drones
+# understand as well, so every received packet is acknowledged.
+
+ACK_EVERY = 16       # DAT packets acknowledged by one SAK at most
+ACK_INTERVAL = 1.0   # seconds a received DAT packet may wait for its SAK
+MAX_SESSIONS = 8
+
+# received() results
+SAK_DUE = "sak"
+ACK_ALONE = "ack"
+
+
+class _SakSession:
+    __slots__ = ("cumulative", "pending", "first_pending")
+
+    def __init__(self, cumulative):
+        self.cumulative = cumulative
+        self.pending = 0
+        self.first_pending = None
+
+
+class SelectiveAcks:
+    """SAK state of the sessions that negotiated V5."""
+
+    def __init__(self, dedup, call_sign, every=ACK_EVERY, interval=ACK_INTERVAL, max_sessions=MAX_SESSIONS):
+        self.dedup = dedup
+        self.call_sign = call_sign
+        self.every = every
+        self.interval = interval
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()   # session_id -> _SakSession
+
+    def negotiate(self, session_id, version, base_pac_id):
+        """Handle a CAP packet. Returns whether the session uses SAKs."""
+        if version < PROTOCOL_VERSION:
+            return False
+        # Everything before the drone's oldest unACKed packet needs no ACK
+        floor = base_pac_id - 1 if base_pac_id > 1 else MAX_PAC_ID
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = _SakSession(floor)
+            if len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        elif 0 < pac_id_distance(floor, session.cumulative) <= MAX_PAC_ID // 2:
+            session.cumulative = floor
+        self._sessions.move_to_end(session_id)
+        return True
+
+    def is_selective(self, session_id):
+        return session_id in self._sessions
+
+    def received(self, session_id, pac_id, now=None):
+        """Count a DAT packet of a selective session.
+
+        Returns ACK_ALONE when pac_id is too far ahead of the cumulative
+        pac_id for a SAK to cover it (it gets a V4 ACK of its own), SAK_DUE
+        when the session's SAK should go out now, else None.
+        """
+        session = self._sessions[session_id]
+        if pac_id_distance(pac_id, self._advance(session_id)) > SAK_BITS:
+            return ACK_ALONE
+        session.pending += 1
+        if session.first_pending is None:
+            session.first_pending = time.monotonic() if now is None else now
+        return SAK_DUE if session.pending >= self.every else None
+
+    def due(self, now=None):
+        """Sessions whose oldest unacknowledged DAT packet has waited interval seconds."""
+        now = time.monotonic() if now is None else now
+        return [session_id for session_id, session in self._sessions.items()
+                if session.pending and now - session.first_pending >= self.interval]
+
+    def sak(self, session_id):
+        """(cumulative, bitmap, serialized SAK) for a session, resetting its pending count."""
+        session = self._sessions[session_id]
+        cumulative = self._advance(session_id)
+        bitmap = 0
+        pac_id = cumulative
+        for bit in range(SAK_BITS):
+            pac_id = next_pac_id(pac_id)
+            if self.dedup.contains(session_id, pac_id):
+                bitmap |= 1 << bit
+        session.pending = 0
+        session.first_pending = None
+        return cumulative, bitmap, serialize_sak(self.call_sign, cumulative, bitmap)
+
+    def _advance(self, session_id):
+        """Moves the cumulative pac_id over the packets received since, returns it."""
+        session = self._sessions[session_id]
+        cumulative = session.cumulative
+        for _ in range(self.dedup.size):
+            following = next_pac_id(cumulative)
+            if not self.dedup.contains(session_id, following):
+                break
+            cumulative = following
+        session.cumulative = cumulative
+        return cumulative
@@ -0,0 +1,207 @@
+import csv
+import os
+import struct
+import sys
+import time
+from collections import OrderedDict
+
+# Per-session radio transmission logs (trans_logs/session_<id>.csv).
+#
+# SessionLogWriter keeps the files of the most recently used sessions open
+# (an LRU of at most max_open handles) and buffers their rows, writing them
+# out once flush_rows are pending or flush_interval seconds have passed, and
+# on close. A record therefore costs a list append instead of a stat, an
+# open, a write, a flush and a close.
+#
+# Besides CSV the writer can produce a compact binary log, a fixed-size
+# struct per record after a small header naming the session, which
+# convert_to_csv (or `python session_log.py <file.bin>...`) turns back into
+# the CSV the analysis scripts read.
+
+LOG_FIELDS = ["timestamp", "session_id", "packet_id", "pac_type",
+              "send(s)/receive(r)", "trans_type", "num_transmissions", "corrupted"]
+
+CSV = "csv"
+BINARY = "bin"
+
+DEFAULT_MAX_OPEN = 8
+DEFAULT_FLUSH_ROWS = 256
+DEFAULT_FLUSH_INTERVAL = 1.0
+TIMESTAMP_FORMAT = "%Y-%m-%d %H-%M-%S"
+
+# Binary layout: MAGIC, uint8 version, uint16 session id length, session id
+# (utf-8), then RECORD structs. Unknown values ("" in the CSV) are -1.
+MAGIC = b"PYRL"
+VERSION = 1
+_HEADER = struct.Struct("<4sBH")
+RECORD = struct.Struct("<dqqBBB?")    # time, packet_id, num_transmissions, pac_type, direction, trans_type, corrupted
+PAC_TYPES = ["", "DAT", "ACK", "REQ", "SAK", "CAP"]
+TRANS_TYPES = ["", "RF", "UDP"]
+DIRECTIONS = ["", "s", "r"]
+_PAC_TYPE_CODES = {name: code for code, name in enumerate(PAC_TYPES)}
+_TRANS_TYPE_CODES = {name: code for code, name in enumerate(TRANS_TYPES)}
+_DIRECTION_CODES = {name: code for code, name in enumerate(DIRECTIONS)}
+
+
+def session_filename(directory, session_id, fmt=CSV):
+    return os.path.join(directory, f"session_{session_id}.{fmt}")
+
+
+def format_timestamp(seconds):
+    return time.strftime(TIMESTAMP_FORMAT, time.localtime(seconds))
+
+
+def _csv_row(session_id, record):
+    stamp, packet_id, pac_type, direction, trans_type, num_transmissions, corrupted = record
+    return [format_timestamp(stamp), session_id, packet_id, pac_type, direction,
+            trans_type, num_transmissions, corrupted]
+
+
+def _int_or_unknown(value):
+    return -1 if value == "" or value is None else int(value)
+
+
+def _pack(record):
+    stamp, packet_id, pac_type, direction, trans_type, num_transmissions, corrupted = record
+    return RECORD.pack(stamp, _int_or_unknown(packet_id), _int_or_unknown(num_transmissions),
+                       _PAC_TYPE_CODES.get(pac_type, 0), _DIRECTION_CODES.get(direction, 0),
+                       _TRANS_TYPE_CODES.get(trans_type, 0), bool(corrupted))
+
+
+class _SessionFile:
+
+    def __init__(self, path, session_id, fmt):
+        self.session_id = session_id
+        self.fmt = fmt
+        self.rows = []
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        if fmt == BINARY:
+            self.file = open(path, "ab")
+            if new:
+                encoded = str(session_id).encode("utf-8")
+                self.file.write(_HEADER.pack(MAGIC, VERSION, len(encoded)) + encoded)
+        else:
+            self.file = open(path, "a", newline="")
+            self.csv = csv.writer(self.file)
+            if new:
+                self.csv.writerow(LOG_FIELDS)
+        self.file.flush()
+
+    def flush(self):
+        if self.rows:
+            if self.fmt == BINARY:
+                self.file.write(b"".join(_pack(record) for record in self.rows))
+            else:
+                self.csv.writerows(_csv_row(self.session_id, record) for record in self.rows)
+            self.rows = []
+        self.file.flush()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+class SessionLogWriter:
+    """Buffered writer of per-session transmission logs."""
+
+    def __init__(self, directory, fmt=CSV, max_open=DEFAULT_MAX_OPEN,
+                 flush_rows=DEFAULT_FLUSH_ROWS, flush_interval=DEFAULT_FLUSH_INTERVAL):
+        if fmt not in (CSV, BINARY):
+            raise ValueError(f"Unknown log format {fmt!r}")
+        self.directory = directory
+        self.fmt = fmt
+        self.max_open = max_open
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.records = 0
+        self.flushes = 0
+        self.opens = 0
+        self._files = OrderedDict()   # session_id -> _SessionFile, least recently used first
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, stamp, session_id, packet_id, pac_type, direction, trans_type, num_transmissions, corrupted):
+        """Buffer one record; stamp is epoch seconds (time.time())."""
+        log = self._files.get(session_id)
+        if log is None:
+            log = self._open(session_id)
+        else:
+            self._files.move_to_end(session_id)
+        log.rows.append((stamp, packet_id, pac_type, direction, trans_type, num_transmissions, corrupted))
+        self.records += 1
+        self._pending += 1
+        if self._pending >= self.flush_rows:
+            self.flush()
+        else:
+            self.flush_if_due()
+
+    def flush_if_due(self):
+        if self._pending and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        for log in self._files.values():
+            log.flush()
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        self.flushes += 1
+
+    def close(self):
+        for log in self._files.values():
+            log.close()
+        self._files.clear()
+        self._pending = 0
+
+    def _open(self, session_id):
+        if len(self._files) >= self.max_open:
+            _, evicted = self._files.popitem(last=False)
+            self._pending -= len(evicted.rows)
+            evicted.close()
+        log = self._files[session_id] = _SessionFile(
+            session_filename(self.directory, session_id, self.fmt), session_id, self.fmt
+        )
+        self.opens += 1
+        return log
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def read_binary(path):
+    """(session_id, rows) of a binary log, rows in the CSV column order."""
+    with open(path, "rb") as file:
+        data = file.read()
+    magic, version, length = _HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} session log")
+    start = _HEADER.size + length
+    session_id = data[_HEADER.size:start].decode("utf-8")
+    usable = (len(data) - start) // RECORD.size * RECORD.size   # ignore a torn last record
+    rows = []
+    for stamp, packet_id, num_transmissions, pac_type, direction, trans_type, corrupted in \
+            RECORD.iter_unpack(data[start:start + usable]):
+        rows.append(_csv_row(session_id, (
+            stamp, "" if packet_id == -1 else packet_id, PAC_TYPES[pac_type], DIRECTIONS[direction],
+            TRANS_TYPES[trans_type], "" if num_transmissions == -1 else num_transmissions, corrupted
+        )))
+    return session_id, rows
+
+
+def convert_to_csv(path, csv_path=None):
+    """Write the CSV equivalent of a binary log (next to it by default)."""
+    _, rows = read_binary(path)
+    csv_path = csv_path or os.path.splitext(path)[0] + ".csv"
+    with open(csv_path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(LOG_FIELDS)
+        writer.writerows(rows)
+    return csv_path
+
+
+if __name__ == "__main__":
+    for binary_log in sys.argv[1:]:
+        print(f"{binary_log} -> {convert_to_csv(binary_log)}")
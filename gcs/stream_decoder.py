@@ -0,0 +1,69 @@
+import struct
+import zlib
+from packet_class._v5.packet import DAT_PACKET_SIZE, CAP_CRC_SEED
+
+# Packet framing of the downlink byte stream.
+#
+# DAT (and V5 CAP) packets are DAT_PACKET_SIZE bytes, a payload followed by
+# its crc32, with no marker between them. Reading the serial port in
+# DAT_PACKET_SIZE chunks loses every packet after a dropped or inserted byte
+# until the stream happens to line up again. DownlinkDecoder buffers what
+# is read, in chunks of any size, and looks for a window whose checksum
+# matches: while aligned that is the first window every time, after a glitch
+# it slides forward a byte at a time. The packet hit by the glitch is lost,
+# the next intact one is found. A random window passes a crc32 with odds of
+# 1 in 2^32, and the wire format does not change, so V4 drones are fine.
+
+DAT = "DAT"
+CAP = "CAP"
+
+_CRC = struct.Struct('<I')
+
+
+class DownlinkDecoder:
+    """Splits the received byte stream into checksum-valid packets."""
+
+    def __init__(self, packet_size=DAT_PACKET_SIZE):
+        self.packet_size = packet_size
+        self.packets = 0          # valid packets found
+        self.skipped_bytes = 0    # bytes that were not part of one
+        self.resyncs = 0          # runs of skipped bytes
+        self._buffer = bytearray()
+        self._skipping = False
+
+    def feed(self, data):
+        """Adds received bytes, returns the (DAT|CAP, packet bytes) now complete."""
+        buffer = self._buffer
+        buffer += data
+        view = memoryview(buffer)
+        size = self.packet_size
+        payload_size = size - 4
+        found = []
+        start = 0
+        try:
+            while len(buffer) - start >= size:
+                end = start + payload_size
+                (checksum,) = _CRC.unpack_from(buffer, end)
+                if zlib.crc32(view[start:end]) == checksum:
+                    kind = DAT
+                elif buffer[start + 6:start + 9] == b"CAP" and zlib.crc32(view[start:end], CAP_CRC_SEED) == checksum:
+                    kind = CAP
+                else:
+                    start += 1
+                    self.skipped_bytes += 1
+                    if not self._skipping:
+                        self._skipping = True
+                        self.resyncs += 1
+                    continue
+                found.append((kind, bytes(view[start:start + size])))
+                self._skipping = False
+                self.packets += 1
+                start += size
+        finally:
+            view.release()
+        del buffer[:start]
+        return found
+
+    def pending(self):
+        """Bytes waiting for the rest of their packet."""
+        return len(self._buffer)
@@ -0,0 +1,60 @@
+import numpy as np
+
+# Time alignment of avionics telemetry with thermal packets.
+#
+# Telemetry samples and packets are both sorted by time_stamp, so each packet
+# finds its neighbouring samples with one searchsorted (an as-of join) and
+# takes the position interpolated between them. Samples further apart than
+# MAX_GAP_NS are not interpolated across: the packet takes the nearest sample
+# if that one is close enough, and is left alone otherwise.
+
+MAX_GAP_NS = 5 * 1_000_000_000              # largest gap to interpolate across
+MERGE_WINDOW_NS = 10 * 60 * 1_000_000_000   # how far back a new sample can fill packets
+
+# Column order of the telemetry samples (after time_stamp)
+TELEMETRY_FIELDS = ("latitude", "longitude", "alt", "heading", "speed")
+_HEADING = TELEMETRY_FIELDS.index("heading")
+
+
+def align(sample_ts, samples, packet_ts, max_gap_ns=MAX_GAP_NS):
+    """As-of join of packets onto telemetry.
+
+    sample_ts: sorted (n,) sample times, samples: (n, len(TELEMETRY_FIELDS))
+    values, packet_ts: (m,) packet times. Returns (matched, values, fix_ts):
+    a (m,) mask of packets that got telemetry, their (m, k) values and the
+    time of the nearest sample used.
+    """
+    sample_ts = np.asarray(sample_ts, dtype=np.float64)
+    samples = np.asarray(samples, dtype=np.float64)
+    packet_ts = np.asarray(packet_ts, dtype=np.float64)
+    if len(sample_ts) == 0 or len(packet_ts) == 0:
+        return np.zeros(len(packet_ts), dtype=bool), np.zeros((len(packet_ts), samples.shape[-1])), np.zeros(len(packet_ts))
+
+    last = len(sample_ts) - 1
+    after = np.searchsorted(sample_ts, packet_ts, side="left")
+    nxt = np.minimum(after, last)
+    prev = np.where(sample_ts[nxt] == packet_ts, nxt, np.maximum(after - 1, 0))
+
+    t0, t1 = sample_ts[prev], sample_ts[nxt]
+    dt_prev = np.abs(packet_ts - t0)
+    dt_next = np.abs(t1 - packet_ts)
+    nearest = np.where(dt_prev <= dt_next, prev, nxt)
+    dt_nearest = np.minimum(dt_prev, dt_next)
+
+    span = t1 - t0
+    bracketed = (t0 <= packet_ts) & (packet_ts <= t1) & (span > 0) & (span <= max_gap_ns)
+    matched = bracketed | (dt_nearest <= max_gap_ns)
+
+    # Interpolation weight towards the next sample; nearest-sample packets
+    # are expressed as weight 0 (prev) or 1 (next)
+    weight = np.where(bracketed, (packet_ts - t0) / np.where(span > 0, span, 1), (nearest == nxt).astype(np.float64))
+    weight = weight[:, None]
+
+    v0, v1 = samples[prev], samples[nxt]
+    values = v0 + weight * (v1 - v0)
+
+    # Headings wrap, interpolate along the shorter arc
+    turn = (v1[:, _HEADING] - v0[:, _HEADING] + 180.0) % 360.0 - 180.0
+    values[:, _HEADING] = (v0[:, _HEADING] + weight[:, 0] * turn) % 360.0
+
+    return matched, values, sample_ts[nearest]
@@ -0,0 +1,103 @@
+import unittest
+import json
+import database
+import db_pool
+import backend_server
+from fixtures import ServerTestCase, packet, START
+
+
+def packets(start, count, session="replay0"):
+    return [{"name": "Davis Fire", **packet(i, session)} for i in range(start, start + count)]
+
+
+class TestValidatePacket(unittest.TestCase):
+
+    def test_normalizes_position(self):
+        packet = database.validate_packet({"pac_id": 1, "latitude": 39.2, "longitude": -119.8,
+                                           "time_stamp": START})
+        self.assertEqual(packet["gps_data"], [39.2, -119.8])
+        self.assertEqual(packet["session_id"], -1)
+
+    def test_rejects_bad_fields(self):
+        good = packets(0, 1)[0]
+        for change in ({"pac_id": "7"}, {"pac_id": 2**70}, {"pac_id": -1}, {"time_stamp": None},
+                       {"time_stamp": 2**63}, {"session_id": 2**64}, {"gps_data": [91.0, 0.0]},
+                       {"gps_data": [1.0]}, {"high_temp": float("nan")}, {"alt": True}):
+            with self.subTest(change=change), self.assertRaises(ValueError):
+                database.validate_packet({**good, **change})
+        with self.assertRaises(ValueError):
+            database.validate_packet([1, 2])
+
+
+class TestAddPackets(ServerTestCase):
+
+    def post(self, body, content_type="application/json"):
+        response = self.fetch("/add_packets", method="POST", body=body,
+                              headers={"Content-Type": content_type})
+        return response.code, json.loads(response.body)
+
+    def test_json_array_with_duplicates_and_rejects(self):
+        rows = packets(0, 10) + [{"pac_id": 99}, "not a packet"]
+        code, counts = self.post(json.dumps(rows))
+        self.assertEqual(code, 200)
+        self.assertEqual((counts["received"], counts["accepted"], counts["duplicates"], counts["rejected"]),
+                         (12, 10, 0, 2))
+        self.assertEqual([e["row"] for e in counts["errors"]], [10, 11])
+
+        code, counts = self.post(json.dumps(packets(5, 10)))
+        self.assertEqual((counts["accepted"], counts["duplicates"]), (5, 5))
+
+        # Same pipeline as radio packets: the session got a flight
+        thermal = json.loads(self.fetch("/api/thermal/Davis%20Fire").body)
+        self.assertEqual(len(thermal), 15)
+        self.assertEqual({row["flight_id"] for row in thermal}, {1})
+
+        # The flight's end time is written with the batch, not left for a later flush
+        self.assertEqual(database._flight_end_times, {})
+        with db_pool.connection() as conn:
+            ended = conn.execute("SELECT time_ended FROM flights WHERE name = 'Davis Fire'").fetchall()
+        self.assertEqual(len(ended), 1)
+        self.assertIsNotNone(ended[0][0])
+
+    def test_shutdown_flush_writes_batched_end_times(self):
+        with db_pool.connection() as conn:
+            database.update_flights(3, "s3", "Davis Fire", "ulog_filename", conn)
+        self.assertIn(("Davis Fire", 3), database._flight_end_times)
+        backend_server.flush_flight_end_times()
+        self.assertEqual(database._flight_end_times, {})
+        with db_pool.connection() as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM flights WHERE flight_id = 3").fetchone()[0], 1)
+
+    def test_single_packet_endpoint_feeds_the_rollups(self):
+        for row in packets(0, 3) + packets(1, 1):
+            response = self.fetch("/add_packet", method="POST", body=json.dumps(row))
+            self.assertEqual(response.code, 200)
+        self.assertEqual(self.fetch("/add_packet", method="POST", body='{"pac_id": "7"}').code, 400)
+
+        for query in ("", "?flight_id=1"):
+            rollup = json.loads(self.fetch(f"/api/rollup/Davis%20Fire{query}").body)
+            self.assertEqual(sum(bucket["count"] for bucket in rollup), 3)
+
+    def test_out_of_range_integers_reject_only_their_row(self):
+        rows = packets(0, 3)
+        rows[1]["pac_id"] = 2**70
+        code, counts = self.post(json.dumps(rows))
+        self.assertEqual(code, 200)
+        self.assertEqual((counts["accepted"], counts["rejected"]), (2, 1))
+        self.assertEqual([e["row"] for e in counts["errors"]], [1])
+
+    def test_ndjson(self):
+        lines = [json.dumps(p) for p in packets(0, 5)]
+        lines.insert(2, "{broken")
+        code, counts = self.post("\n".join(lines) + "\n\n", "application/x-ndjson")
+        self.assertEqual(code, 200)
+        self.assertEqual((counts["accepted"], counts["rejected"]), (5, 1))
+        self.assertEqual(counts["errors"], [{"row": 2, "error": "not valid JSON"}])
+
+    def test_malformed_body(self):
+        self.assertEqual(self.post("[1, 2")[0], 400)
+        self.assertEqual(self.post(b"\xff\xfe[")[0], 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+import os
+import tempfile
+import threading
+import db_pool
+
+
+class TestDatabasePool(unittest.TestCase):
+
+    def tearDown(self):
+        db_pool.close_thread_connections()
+        db_pool.configure()
+
+    def test_pragmas_applied(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_pool.configure(os.path.join(tmp, "wildfire_data.db"))
+            conn = db_pool.get_connection()
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+            self.assertEqual(conn.execute("PRAGMA synchronous").fetchone()[0], 1)  # NORMAL
+            self.assertEqual(conn.execute("PRAGMA busy_timeout").fetchone()[0], 5000)
+            self.assertEqual(conn.execute("PRAGMA temp_store").fetchone()[0], 2)   # MEMORY
+            db_pool.close_thread_connections()
+
+    def test_pooled_per_thread(self):
+        db_pool.configure(db_pool.MEMORY_PATH)
+        self.assertIs(db_pool.get_connection(), db_pool.get_connection())
+
+        other = []
+        thread = threading.Thread(target=lambda: other.append(db_pool.get_connection()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(other[0], db_pool.get_connection())
+
+    def test_memory_database_is_shared(self):
+        db_pool.configure(db_pool.MEMORY_PATH)
+        with db_pool.connection() as conn:
+            conn.execute("CREATE TABLE t (x)")
+            conn.execute("INSERT INTO t VALUES (1)")
+
+        writer = db_pool.connect()
+        self.assertEqual(writer.execute("SELECT COUNT(*) FROM t").fetchone()[0], 1)
+        writer.close()
+
+    def test_connection_rolls_back_on_error(self):
+        db_pool.configure(db_pool.MEMORY_PATH)
+        with db_pool.connection() as conn:
+            conn.execute("CREATE TABLE t (x)")
+
+        with self.assertRaises(ValueError):
+            with db_pool.connection() as conn:
+                conn.execute("INSERT INTO t VALUES (1)")
+                with db_pool.connection() as inner:
+                    inner.execute("INSERT INTO t VALUES (2)")
+                raise ValueError()
+
+        self.assertFalse(conn.in_transaction)
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM t").fetchone()[0], 0)
+
+    def test_reconfigure_replaces_pooled_connection(self):
+        db_pool.configure(db_pool.MEMORY_PATH)
+        first = db_pool.get_connection()
+        db_pool.configure(db_pool.MEMORY_PATH)
+        self.assertIsNot(first, db_pool.get_connection())
+
+    def test_query_timing(self):
+        db_pool.configure(db_pool.MEMORY_PATH)
+        db_pool.reset_stats()
+        conn = db_pool.get_connection()
+        conn.execute("CREATE TABLE t (x)")
+        for _ in range(3):
+            conn.execute("SELECT 1").fetchone()
+        conn.cursor().executemany("INSERT INTO t VALUES (?)", [(1,), (2,)])
+
+        queries = {q["sql"]: q for q in db_pool.stats()["queries"]}
+        self.assertEqual(queries["SELECT 1"]["count"], 3)
+        self.assertEqual(queries["INSERT INTO t VALUES (?)"]["count"], 1)
+        self.assertGreaterEqual(db_pool.stats()["connections"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
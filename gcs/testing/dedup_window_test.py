@@ -0,0 +1,120 @@
+import unittest
+import random
+from dedup_window import (SessionDedup, MAX_PACKET_ID, WRAPAROUND_THRESHOLD,
+                          FIRST, NEW, WRAPAROUND, LATE, DUPLICATE)
+
+
+class UnboundedDedup:
+    """The original receive_and_decode_packets bookkeeping, for reference."""
+
+    def __init__(self):
+        self.data_pacs_received = {}
+        self.highest_pac_id_received = {}
+
+    def receive(self, session, current_id):
+        key = (session, current_id)
+        if session not in self.highest_pac_id_received:
+            self.highest_pac_id_received[session] = current_id
+            self.data_pacs_received[key] = 1
+            return True, 1
+        highest_id = self.highest_pac_id_received[session]
+        is_wraparound = (
+            highest_id > MAX_PACKET_ID - WRAPAROUND_THRESHOLD and
+            current_id < WRAPAROUND_THRESHOLD
+        )
+        if current_id > highest_id or is_wraparound:
+            self.data_pacs_received[key] = 1
+            self.highest_pac_id_received[session] = current_id
+            return True, 1
+        if key not in self.data_pacs_received:
+            self.data_pacs_received[key] = 1
+            return True, 1
+        self.data_pacs_received[key] += 1
+        return False, self.data_pacs_received[key]
+
+
+def radio_stream(rng, sessions, count, start_ids, lag=64, repeat=0.3):
+    """(session, pac_id) receptions as the link produces them: increasing
+    ids, with some lost and retransmitted later and some received twice."""
+    stream, pending = [], []
+    next_id = dict(zip(sessions, start_ids))
+    for _ in range(count):
+        session = rng.choice(sessions)
+        pac_id = next_id[session]
+        next_id[session] = (pac_id + 1) % (MAX_PACKET_ID + 1)
+        if rng.random() < 0.2:
+            pending.append((session, pac_id))      # lost, retransmitted later
+        else:
+            stream.append((session, pac_id))
+        if rng.random() < repeat:
+            stream.append((session, pac_id))       # ACK lost, drone resends
+        while pending and (len(pending) > lag or rng.random() < 0.3):
+            stream.append(pending.pop(rng.randrange(len(pending))))
+            if rng.random() < repeat:
+                stream.append(stream[-1])
+    return stream + pending
+
+
+class TestSessionDedup(unittest.TestCase):
+
+    def assert_same_decisions(self, stream, dedup):
+        reference = UnboundedDedup()
+        for session, pac_id in stream:
+            outcome, count = dedup.receive(session, pac_id)
+            self.assertEqual((outcome != DUPLICATE, count), reference.receive(session, pac_id),
+                             f"session {session} pac_id {pac_id}")
+
+    def test_matches_unbounded_dedup(self):
+        rng = random.Random(7)
+        for seed in range(5):
+            stream = radio_stream(rng, ["s0", "s1", "s2"], 20_000, [0, 1000, seed * 17])
+            self.assert_same_decisions(stream, SessionDedup(size=256))
+
+    def test_matches_across_wraparound(self):
+        rng = random.Random(11)
+        stream = radio_stream(rng, ["s0", "s1"], 5_000,
+                              [MAX_PACKET_ID - 100, MAX_PACKET_ID - 2_000], lag=16)
+        self.assert_same_decisions(stream, SessionDedup(size=64))
+
+    def test_outcomes(self):
+        dedup = SessionDedup(size=16)
+        self.assertEqual(dedup.receive("s0", 10), (FIRST, 1))
+        self.assertEqual(dedup.receive("s0", 12), (NEW, 1))
+        self.assertEqual(dedup.receive("s0", 11), (LATE, 1))
+        self.assertEqual(dedup.receive("s0", 11), (DUPLICATE, 2))
+        self.assertEqual(dedup.receive("s0", 10), (DUPLICATE, 2))
+        dedup.receive("s0", MAX_PACKET_ID - 1)
+        self.assertEqual(dedup.receive("s0", 3), (WRAPAROUND, 1))
+        self.assertEqual(dedup.receive("s0", MAX_PACKET_ID - 1), (NEW, 1))
+
+    def test_late_packets_older_than_the_window_use_the_overflow(self):
+        dedup = SessionDedup(size=16, overflow=2)
+        dedup.receive("s0", 100)
+        self.assertEqual(dedup.receive("s0", 20), (LATE, 1))     # slot 4 is free
+        dedup.receive("s0", 116)                                  # takes slot 4 back
+        self.assertEqual(dedup.receive("s0", 36), (LATE, 1))     # slot 4 held by 116
+        self.assertEqual(dedup.receive("s0", 36), (DUPLICATE, 2))
+        dedup.receive("s0", 52)
+        dedup.receive("s0", 68)                                   # overflow full, 36 dropped
+        self.assertEqual(dedup.receive("s0", 36), (LATE, 1))
+
+    def test_memory_is_bounded(self):
+        dedup = SessionDedup(size=32, overflow=4, max_sessions=2)
+        for session in range(5):
+            for pac_id in range(0, 10_000, 3):
+                dedup.receive(session, pac_id)
+                dedup.receive(session, pac_id // 2)
+        self.assertEqual(len(dedup._sessions), 2)
+        for window in dedup._sessions.values():
+            self.assertEqual(len(window.ids), 32)
+            self.assertLessEqual(len(window.overflow), 4)
+        self.assertIsNone(dedup.highest(0))
+        self.assertEqual(dedup.highest(4), 9999)
+
+    def test_size_must_be_a_power_of_two(self):
+        with self.assertRaises(ValueError):
+            SessionDedup(size=100)
+
+
+if __name__ == "__main__":
+    unittest.main()
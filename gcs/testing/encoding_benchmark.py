@@ -0,0 +1,98 @@
+"""Serialization benchmark of the bulk point endpoints: the original
+dict(row) + json.dumps response against the columnar and binary encodings,
+with and without gzip.
+
+Loads --rows packets replayed from washoe_fire_packets.txt into an in-memory
+database and encodes the /api/thermal/{name} query for one fire.
+
+Usage (from gcs/):  python testing/encoding_benchmark.py [--rows N] [--repeat R]
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+
+GCS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, GCS_DIR)
+
+import database
+import db_pool
+import point_encoding
+
+PACKETS_FILE = os.path.join(GCS_DIR, "testing", "washoe_fire_packets.txt")
+
+THERMAL_QUERY = """
+    SELECT id, name, latitude, longitude, alt as altitude, high_temp, low_temp, time_stamp, flight_id
+    FROM wildfires
+    WHERE name = ?
+    ORDER BY time_stamp, id
+"""
+
+
+def build_db(rows):
+    db_pool.configure(db_pool.MEMORY_PATH)
+    database._geocoder.use_network = False
+    database.init_db()
+
+    with open(PACKETS_FILE, "r") as file:
+        packets = [json.loads(line) for line in file if line.strip()]
+
+    conn = db_pool.get_connection()
+    batch = []
+    for i in range(rows):
+        packet = dict(packets[i % len(packets)])
+        copy = i // len(packets)
+        packet["session_id"] = f"{packet['session_id']}_{copy}"
+        packet["time_stamp"] += copy * 3_600_000_000_000
+        batch.append((packet, packet["name"], "active"))
+        if len(batch) == 5000:
+            database.process_packet_batch(batch, conn)
+            batch = []
+    database.process_packet_batch(batch, conn)
+    conn.commit()
+    return conn
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    conn = build_db(args.rows)
+    name = conn.execute("SELECT name FROM wildfires LIMIT 1").fetchone()[0]
+
+    def original():
+        conn.row_factory = sqlite3.Row
+        rows = [dict(row) for row in conn.execute(THERMAL_QUERY, (name,)).fetchall()]
+        return json.dumps(rows).encode("utf-8")
+
+    cases = [("original json", original)]
+    for fmt in (point_encoding.JSON, point_encoding.COLUMNAR, point_encoding.BINARY):
+        cases.append((fmt, lambda fmt=fmt: point_encoding.encode(
+            point_encoding.fetch_points(conn, THERMAL_QUERY, (name,)), fmt)))
+
+    points = len(point_encoding.fetch_points(conn, THERMAL_QUERY, (name,)))
+    print(f"{points} points of {name}, best of {args.repeat}\n")
+    print(f"{'format':<15}{'encode ms':>10}{'B/point':>9}{'+gzip ms':>10}{'gz B/point':>12}")
+    for label, encode in cases:
+        seconds, body = timed(encode, args.repeat)
+        gz_seconds, (compressed, _) = timed(lambda: point_encoding.compress(body, "gzip"), args.repeat)
+        print(f"{label:<15}{seconds * 1000:>10.1f}{len(body) / points:>9.1f}"
+              f"{(seconds + gz_seconds) * 1000:>10.1f}{len(compressed) / points:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
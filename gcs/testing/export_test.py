@@ -0,0 +1,111 @@
+import unittest
+import csv
+import io
+import sqlite3
+import database
+import export
+from migrations import migrate
+import fixtures
+from fixtures import ServerTestCase, reset_database_state, START, SECOND_NS
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+
+def batch(count, name="Davis Fire", session="s0"):
+    return fixtures.batch(0, count, name, session, high_temp=lambda i: 300.0 + i)
+
+
+class TestExport(unittest.TestCase):
+
+    def setUp(self):
+        reset_database_state()
+        self.conn = sqlite3.connect(":memory:")
+        migrate(self.conn)
+        database.process_packet_batch(batch(120) + batch(30, "Other Fire", "s1"), self.conn)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def export_csv(self, **filters):
+        chunks = []
+        export.export_wildfires(self.conn, chunks.append, "csv", **filters)
+        return chunks, list(csv.DictReader(io.StringIO(b"".join(chunks).decode("utf-8"))))
+
+    def test_csv_is_written_in_chunks(self):
+        chunks = []
+        cursor = self.conn.execute(*export.build_query())
+        export.write_csv(cursor, chunks.append, chunk_rows=50)
+        self.assertEqual(len(chunks), 3)
+        rows = list(csv.DictReader(io.StringIO(b"".join(chunks).decode("utf-8"))))
+        self.assertEqual(len(rows), 150)
+        self.assertEqual(rows[0]["name"], "Davis Fire")
+
+    def test_filters(self):
+        _, rows = self.export_csv(name="Davis Fire", time_from=START + 10 * SECOND_NS,
+                                  time_to=START + 19 * SECOND_NS)
+        self.assertEqual(len(rows), 10)
+        self.assertEqual({row["name"] for row in rows}, {"Davis Fire"})
+
+        _, rows = self.export_csv(name="Other Fire", flight_id=1)
+        self.assertEqual(len(rows), 30)
+
+        chunks, rows = self.export_csv(name="No Fire")
+        self.assertEqual(rows, [])
+        self.assertTrue(chunks[0].startswith(b"id,"))
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            export.export_wildfires(self.conn, lambda chunk: None, "xlsx")
+
+    @unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+    def test_arrow_and_parquet(self):
+        import pyarrow.ipc
+        import pyarrow.parquet
+
+        chunks = []
+        export.export_wildfires(self.conn, chunks.append, "arrow", name="Davis Fire")
+        table = pyarrow.ipc.open_stream(b"".join(chunks)).read_all()
+        self.assertEqual(table.num_rows, 120)
+        self.assertEqual(table.schema.field("high_temp").type, pyarrow.float64())
+
+        chunks = []
+        export.export_wildfires(self.conn, chunks.append, "parquet")
+        table = pyarrow.parquet.read_table(pyarrow.BufferReader(b"".join(chunks)))
+        self.assertEqual(table.num_rows, 150)
+
+
+class TestDownloadHandler(ServerTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.ingest(batch(12000))
+
+    def test_streams_csv(self):
+        chunks = []
+        response = self.fetch("/download_csv?name=Davis%20Fire", streaming_callback=chunks.append)
+        self.assertEqual(response.code, 200)
+        self.assertIn("text/csv", response.headers["Content-Type"])
+        self.assertGreater(len(chunks), 1)
+        rows = list(csv.DictReader(io.StringIO(b"".join(chunks).decode("utf-8"))))
+        self.assertEqual(len(rows), 12000)
+
+    def test_timeline_range_in_ms(self):
+        start_ms = START // 1_000_000
+        response = self.fetch(f"/download_csv?start={start_ms}&end={start_ms + 4999}")
+        rows = list(csv.DictReader(io.StringIO(response.body.decode("utf-8"))))
+        self.assertEqual(len(rows), 5)
+
+    def test_bad_arguments(self):
+        self.assertEqual(self.fetch("/download_csv?format=xlsx").code, 400)
+        self.assertEqual(self.fetch("/download_csv?flight_id=x").code, 400)
+
+    @unittest.skipIf(pyarrow is not None, "pyarrow is installed")
+    def test_columnar_needs_pyarrow(self):
+        self.assertEqual(self.fetch("/download_csv?format=parquet").code, 501)
+
+
+if __name__ == "__main__":
+    unittest.main()
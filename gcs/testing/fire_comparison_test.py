@@ -0,0 +1,107 @@
+import unittest
+import json
+import sqlite3
+import database
+import db_pool
+import data_version
+from migrations import MIGRATIONS, migrate, _status_deltas
+import fixtures
+from fixtures import ServerTestCase
+
+
+def batch(name, start, count, session="s0"):
+    """A fire that grows and heats up with every packet."""
+    return fixtures.batch(start, count, name, session,
+                          gps_data=lambda i: [39.29 + i * 1e-3, -119.84 + i * 1e-3],
+                          high_temp=lambda i: 300.0 + i)
+
+
+class TestStatusDeltasMigration(unittest.TestCase):
+
+    def test_backfills_previous_snapshot(self):
+        conn = sqlite3.connect(":memory:")
+        migrate(conn)
+        version = next(v for v, _, apply in MIGRATIONS if apply is _status_deltas)
+        conn.executemany(
+            "INSERT INTO wildfire_status (name, size, intensity, time_stamp) VALUES (?, ?, ?, ?)",
+            [("Davis Fire", 1.0, 10.0, 100), ("Davis Fire", 2.0, 20.0, 200),
+             ("Davis Fire", 2.0, 20.0, 200), ("Park Fire", 5.0, 50.0, 150)]
+        )
+        conn.execute("DELETE FROM schema_version WHERE version >= ?", (version,))
+        conn.commit()
+
+        migrate(conn)
+
+        rows = conn.execute(
+            "SELECT name, prev_size, prev_intensity, prev_time_stamp FROM wildfire_status ORDER BY id"
+        ).fetchall()
+        self.assertEqual(rows, [("Davis Fire", None, None, None), ("Davis Fire", 1.0, 10.0, 100),
+                                ("Davis Fire", 1.0, 10.0, 100), ("Park Fire", None, None, None)])
+        conn.close()
+
+
+class TestFireComparison(ServerTestCase):
+
+    def snapshot_count(self):
+        with db_pool.connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM wildfire_status").fetchone()[0]
+
+    def comparison(self, name):
+        response = self.fetch(f"/fire_comparison?name={name.replace(' ', '%20')}")
+        self.assertEqual(response.code, 200)
+        return json.loads(response.body)
+
+    def test_deltas_written_with_snapshots(self):
+        self.ingest(batch("Davis Fire", 0, 20))
+        database.update_fire_status("Davis Fire")
+        self.assertEqual(self.comparison("Davis Fire"), {})
+
+        self.ingest(batch("Davis Fire", 20, 20))
+        database.update_fire_status("Davis Fire")
+        with db_pool.connection() as conn:
+            first, second = conn.execute(
+                "SELECT size, intensity, time_stamp FROM wildfire_status ORDER BY id").fetchall()
+        comparison = self.comparison("Davis Fire")
+        self.assertEqual((comparison["prev_size"], comparison["prev_intensity"], comparison["prev_timestamp"]),
+                         tuple(first))
+        self.assertAlmostEqual(comparison["size_change"], second[0] - first[0])
+
+        # A refresh without newer packets keeps comparing against the first snapshot
+        database.update_fire_status("Davis Fire")
+        self.assertEqual(self.comparison("Davis Fire"), comparison)
+
+    def test_reads_have_no_side_effects(self):
+        self.ingest(batch("Davis Fire", 0, 20))
+        database.update_fire_status("Davis Fire")
+        self.ingest(batch("Davis Fire", 20, 20))
+        with db_pool.connection() as conn:
+            before = data_version.read(conn, data_version.TABLES)[0]
+        count = self.snapshot_count()
+
+        self.comparison("Davis Fire")
+        self.fetch("/fire_comparison")
+        self.assertEqual(self.snapshot_count(), count)
+        with db_pool.connection() as conn:
+            self.assertEqual(data_version.read(conn, data_version.TABLES)[0], before)
+
+        self.assertEqual(self.fetch("/fire_comparison?name=Unknown").code, 404)
+
+    def test_batched_for_all_fires(self):
+        self.ingest(batch("Davis Fire", 0, 20))
+        self.ingest(batch("Park Fire", 0, 20, session="s1"))
+        database.update_fire_status("Davis Fire")
+        database.update_fire_status("Park Fire")
+        self.ingest(batch("Davis Fire", 20, 20))
+        database.update_fire_status("Davis Fire")
+
+        every = json.loads(self.fetch("/fire_comparison").body)
+        self.assertEqual(set(every), {"Davis Fire", "Park Fire"})
+        self.assertEqual(every["Park Fire"], {})
+        self.assertEqual(every["Davis Fire"], self.comparison("Davis Fire"))
+
+        some = json.loads(self.fetch("/fire_comparison?name=Park%20Fire&name=Unknown").body)
+        self.assertEqual(set(some), {"Park Fire"})
+
+
+if __name__ == "__main__":
+    unittest.main()
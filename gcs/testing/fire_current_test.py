@@ -0,0 +1,85 @@
+import unittest
+import json
+import sqlite3
+import database
+import db_pool
+from migrations import MIGRATIONS, migrate, _fire_current
+from fixtures import ServerTestCase, batch
+
+
+def latest_snapshots(conn):
+    """The latest wildfire_status row per fire, computed the old way."""
+    return conn.execute(
+        """
+        SELECT * FROM wildfire_status
+        WHERE id IN (SELECT MAX(id) FROM wildfire_status GROUP BY name)
+        ORDER BY name
+        """
+    ).fetchall()
+
+
+class TestFireCurrentMigration(unittest.TestCase):
+
+    def test_backfills_latest_snapshot_per_fire(self):
+        conn = sqlite3.connect(":memory:")
+        migrate(conn)
+        # Roll back to before fire_current existed, with status history to backfill
+        conn.execute("DROP TABLE fire_current")
+        version = next(v for v, _, apply in MIGRATIONS if apply is _fire_current)
+        conn.execute("DELETE FROM schema_version WHERE version >= ?", (version,))
+        rows = [
+            ("Davis Fire", 1.0, "active", 100),
+            ("Davis Fire", 2.0, "active", 200),
+            ("Davis Fire", 3.0, "archived", 300),
+            ("Park Fire", 4.0, "active", 150),
+        ]
+        conn.executemany(
+            "INSERT INTO wildfire_status (name, size, status, time_stamp) VALUES (?, ?, ?, ?)", rows
+        )
+        conn.commit()
+
+        migrate(conn)
+
+        current = conn.execute("SELECT * FROM fire_current ORDER BY name").fetchall()
+        self.assertEqual(current, latest_snapshots(conn))
+        self.assertEqual([(row[1], row[6]) for row in current],
+                         [("Davis Fire", "archived"), ("Park Fire", "active")])
+        conn.close()
+
+
+class TestFireCurrentEndpoints(ServerTestCase):
+
+    def test_tracks_latest_snapshot(self):
+        self.ingest(batch(0, 20, "Davis Fire"))
+        self.ingest(batch(0, 5, "Park Fire", session="s1"))
+        database.update_fire_status("Davis Fire")
+        database.update_fire_status("Park Fire")
+        self.ingest(batch(20, 20, "Davis Fire"))
+        database.update_fire_status("Davis Fire")
+
+        with db_pool.connection() as conn:
+            current = conn.execute("SELECT * FROM fire_current ORDER BY name").fetchall()
+            self.assertEqual(current, latest_snapshots(conn))
+            self.assertEqual(len(current), 2)
+
+    def test_markers_and_status_served_from_fire_current(self):
+        self.ingest(batch(0, 20, "Davis Fire"))
+        self.ingest(batch(0, 5, "Park Fire", session="s1"))
+        database.update_fire_status("Davis Fire")
+        database.update_fire_status("Park Fire")
+        with db_pool.connection() as conn:
+            conn.execute("UPDATE fire_current SET status = 'archived' WHERE name = 'Park Fire'")
+            conn.commit()
+
+        markers = json.loads(self.fetch("/wildfire_markers").body)
+        self.assertEqual([row["name"] for row in markers], ["Davis Fire"])
+
+        archived = json.loads(self.fetch("/wildfire_markers?filter=archived").body)
+        self.assertEqual([row["name"] for row in archived], ["Park Fire"])
+
+        every = json.loads(self.fetch("/api/fire_status?filter=all").body)
+        self.assertEqual(sorted(row["name"] for row in every), ["Davis Fire", "Park Fire"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import unittest
+import random
+import sqlite3
+from migrations import migrate
+from fire_window import FireWindow, BUCKET_NS, WINDOW_NS
+
+MIN_TEMP = 200
+MINUTE_NS = 60 * 1_000_000_000
+
+
+def insert_rows(conn, name, rows):
+    conn.executemany(
+        """
+        INSERT INTO wildfires (name, latitude, longitude, high_temp, low_temp, alt, flight_id, time_stamp, session_id, pac_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0)
+        """,
+        [(name, *row, name) for row in rows]
+    )
+    conn.commit()
+
+
+def random_rows(start_ts, count, step_ns):
+    rows = []
+    for i in range(count):
+        rows.append((
+            39.29 + random.uniform(-0.01, 0.01),
+            -119.84 + random.uniform(-0.01, 0.01),
+            random.uniform(100, 600),
+            random.uniform(50, 150),
+            random.uniform(300, 450),
+            random.randint(1, 3),
+            start_ts + i * step_ns,
+        ))
+    return rows
+
+
+def brute_force(conn, name):
+    """The original update_fire_status computation: rescan the whole window."""
+    window_end = conn.execute("SELECT MAX(time_stamp) FROM wildfires WHERE name = ?", (name,)).fetchone()[0]
+    rows = conn.execute(
+        """
+        SELECT latitude, longitude, high_temp, low_temp, alt, flight_id, time_stamp
+          FROM wildfires
+         WHERE name = ? AND time_stamp BETWEEN ? AND ? AND high_temp >= ?
+        """,
+        (name, window_end - WINDOW_NS, window_end, MIN_TEMP)
+    ).fetchall()
+    n = len(rows)
+    return {
+        "num_data_points": n,
+        "intensity": sum((r[2] + r[3]) / 2 for r in rows) / n,
+        "alt_avg": sum(r[4] for r in rows) / n,
+        "avg_latitude": sum(r[0] for r in rows) / n,
+        "avg_longitude": sum(r[1] for r in rows) / n,
+        "max_temp": max(r[2] for r in rows),
+        "min_temp": min(r[3] for r in rows),
+        "min_lat": min(r[0] for r in rows),
+        "max_lat": max(r[0] for r in rows),
+        "min_lon": min(r[1] for r in rows),
+        "max_lon": max(r[1] for r in rows),
+        "flights": len({r[5] for r in rows}),
+        "last_flight_id": max(r[5] for r in rows),
+        "first_time_stamp": min(r[6] for r in rows),
+        "time_stamp": max(r[6] for r in rows),
+    }
+
+
+class TestFireWindow(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(7)
+        self.conn = sqlite3.connect(":memory:")
+        migrate(self.conn)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def assertSnapshotEqual(self, actual, expected):
+        self.assertEqual(actual.keys(), expected.keys())
+        for key, value in expected.items():
+            self.assertAlmostEqual(actual[key], value, places=6, msg=key)
+
+    def test_load_matches_full_rescan(self):
+        insert_rows(self.conn, "Davis Fire", random_rows(1_000 * BUCKET_NS, 500, 7 * 1_000_000_000))
+        window = FireWindow("Davis Fire", MIN_TEMP)
+        window.load(self.conn.cursor())
+        self.assertSnapshotEqual(window.snapshot(), brute_force(self.conn, "Davis Fire"))
+
+    def test_catch_up_only_adds_new_rows(self):
+        start = 1_000 * BUCKET_NS
+        insert_rows(self.conn, "Davis Fire", random_rows(start, 200, MINUTE_NS))
+        window = FireWindow("Davis Fire", MIN_TEMP)
+        window.load(self.conn.cursor())
+
+        # Rows for another fire must be skipped, rows for this fire folded in
+        insert_rows(self.conn, "Washoe Fire", random_rows(start, 50, MINUTE_NS))
+        insert_rows(self.conn, "Davis Fire", random_rows(start + 200 * MINUTE_NS, 100, MINUTE_NS))
+        window.catch_up(self.conn.cursor())
+
+        self.assertSnapshotEqual(window.snapshot(), brute_force(self.conn, "Davis Fire"))
+
+    def test_buckets_expire_as_window_slides(self):
+        start = 1_000 * BUCKET_NS
+        # 30 hours of one row per minute, fed incrementally
+        window = FireWindow("Davis Fire", MIN_TEMP)
+        window.load(self.conn.cursor())
+        for hour in range(30):
+            insert_rows(self.conn, "Davis Fire", random_rows(start + hour * 60 * MINUTE_NS, 60, MINUTE_NS))
+            window.catch_up(self.conn.cursor())
+
+        snapshot = window.snapshot()
+        self.assertLessEqual(len(window.buckets), WINDOW_NS // BUCKET_NS + 1)
+        self.assertSnapshotEqual(snapshot, brute_force(self.conn, "Davis Fire"))
+
+    def test_empty_window(self):
+        window = FireWindow("Davis Fire", MIN_TEMP)
+        window.load(self.conn.cursor())
+        self.assertIsNone(window.latest_ts)
+        self.assertIsNone(window.snapshot())
+
+
+if __name__ == "__main__":
+    unittest.main()
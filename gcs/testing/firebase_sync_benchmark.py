@@ -0,0 +1,120 @@
+"""Firebase sync benchmark against the in-process InMemoryRemote: the old
+per-row is_data_in_firebase() check versus the watermark FirebaseSync.
+
+Usage (from gcs/):  python testing/firebase_sync_benchmark.py [--rows N] [--legacy-rows N]
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+GCS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, GCS_DIR)
+
+from migrations import migrate
+from firebase_sync import FirebaseSync, InMemoryRemote, SYNC_COLUMNS
+
+PACKETS_FILE = os.path.join(GCS_DIR, "testing", "washoe_fire_packets.txt")
+
+
+def build_db(path, rows):
+    """A database holding `rows` pending packets replayed from the Washoe data."""
+    with open(PACKETS_FILE, "r") as file:
+        packets = [json.loads(line) for line in file if line.strip()]
+
+    conn = sqlite3.connect(path)
+    migrate(conn)
+    params = []
+    for i in range(rows):
+        packet = packets[i % len(packets)]
+        latitude, longitude = packet.get("gps_data", [0.0, 0.0])
+        params.append((
+            packet["name"], i, latitude, longitude, packet.get("alt"), packet.get("high_temp"),
+            packet.get("low_temp"), packet.get("time_stamp", 0) + i, packet.get("session_id")
+        ))
+    conn.executemany(
+        """
+        INSERT INTO wildfires (name, pac_id, latitude, longitude, alt, high_temp, low_temp, time_stamp, session_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        params
+    )
+    conn.commit()
+    conn.close()
+
+
+def legacy_sync(db_path, remote):
+    """The original sync_to_firebase: download the remote tree once per row."""
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute(f"SELECT {', '.join(SYNC_COLUMNS)} FROM wildfires WHERE sync_status = 'pending'").fetchall()
+    batch_data = {}
+    ids_to_update = []
+    for row in rows:
+        fire_data = dict(zip(SYNC_COLUMNS[1:], row[1:]))
+        existing_data = remote.get("wildfires")
+        found = isinstance(existing_data, dict) and any(
+            isinstance(fire, dict) and fire.get("name") == fire_data["name"]
+            and fire.get("date_received") == fire_data["date_received"]
+            and fire.get("time_received") == fire_data["time_received"]
+            for fire in existing_data.values()
+        )
+        if not found:
+            batch_data[f"wildfires/{row[0]}"] = fire_data
+            ids_to_update.append((row[0],))
+    if batch_data:
+        remote.update(batch_data)
+        conn.executemany("UPDATE wildfires SET sync_status = 'synced' WHERE id = ?", ids_to_update)
+        conn.commit()
+    conn.close()
+    return len(ids_to_update)
+
+
+def seed_remote(remote, rows):
+    """Records already in Firebase, which every legacy existence check downloads."""
+    remote.update({f"wildfires/seed{i}": {"name": "Old Fire", "date_received": "", "time_received": ""}
+                   for i in range(rows)})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50_000, help="pending rows for the watermark sync")
+    parser.add_argument("--legacy-rows", type=int, default=1_000, help="pending rows for the legacy sync")
+    parser.add_argument("--remote-rows", type=int, default=2_000, help="records already in the remote")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        results = []
+
+        path = os.path.join(tmp_dir, "legacy.db")
+        build_db(path, args.legacy_rows)
+        remote = InMemoryRemote()
+        seed_remote(remote, args.remote_rows)
+        start = time.perf_counter()
+        synced = legacy_sync(path, remote)
+        results.append(("legacy per-row check", synced, time.perf_counter() - start, remote.updates))
+
+        path = os.path.join(tmp_dir, "watermark.db")
+        build_db(path, args.rows)
+        remote = InMemoryRemote()
+        seed_remote(remote, args.remote_rows)
+        start = time.perf_counter()
+        synced = FirebaseSync(path, remote=remote, chunk_size=args.chunk_size).sync_once()
+        results.append((f"watermark, chunk {args.chunk_size}", synced, time.perf_counter() - start, remote.updates))
+
+        start = time.perf_counter()
+        synced = FirebaseSync(path, remote=remote, chunk_size=args.chunk_size).sync_once()
+        results.append(("watermark, caught up", synced, time.perf_counter() - start, remote.updates))
+
+    print(f"{'mode':<28}{'rows':>10}{'seconds':>10}{'rows/s':>12}{'updates':>10}")
+    for label, rows, elapsed, updates in results:
+        rate = rows / elapsed if rows else 0
+        print(f"{label:<28}{rows:>10}{elapsed:>10.3f}{rate:>12.0f}{updates:>10}")
+
+
+if __name__ == "__main__":
+    main()
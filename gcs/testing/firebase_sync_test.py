@@ -0,0 +1,143 @@
+import unittest
+import os
+import tempfile
+import sqlite3
+from migrations import migrate, _baseline_tables
+from firebase_sync import FirebaseSync, FirebaseSyncWorker, InMemoryRemote, RealtimeRemote
+
+
+def insert_rows(conn, count, start=0):
+    conn.executemany(
+        """
+        INSERT INTO wildfires (name, pac_id, latitude, longitude, high_temp, time_stamp, session_id)
+        VALUES ('Davis Fire', ?, 39.29, -119.84, 300, ?, 'session')
+        """,
+        [(i, i * 1_000_000_000) for i in range(start, start + count)]
+    )
+    conn.commit()
+
+
+class TestFirebaseSync(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "wildfire_data.db")
+        self.conn = sqlite3.connect(self.db_path)
+        migrate(self.conn)
+        self.remote = InMemoryRemote()
+        self.sync = FirebaseSync(self.db_path, remote=self.remote, chunk_size=100)
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def pending(self):
+        return self.conn.execute("SELECT COUNT(*) FROM wildfires WHERE sync_status = 'pending'").fetchone()[0]
+
+    def test_pushes_new_rows_in_chunks(self):
+        insert_rows(self.conn, 250)
+        self.assertEqual(self.sync.sync_once(), 250)
+
+        self.assertEqual(self.remote.updates, 3)
+        self.assertEqual(len(self.remote.get("wildfires")), 250)
+        self.assertEqual(self.remote.get("wildfires/1")["sync_status"], "synced")
+        self.assertEqual(self.pending(), 0)
+        self.assertEqual(self.sync.watermark(self.conn), 250)
+
+        # Caught up, nothing to push
+        self.assertEqual(self.sync.sync_once(), 0)
+        self.assertEqual(self.remote.updates, 3)
+
+    def test_only_new_rows_are_pushed(self):
+        insert_rows(self.conn, 50)
+        self.sync.sync_once()
+        insert_rows(self.conn, 20, start=50)
+
+        self.assertEqual(self.sync.sync_once(), 20)
+        self.assertEqual(self.remote.nodes_written, 70)
+
+    def test_rows_changed_after_sync_are_pushed_again(self):
+        insert_rows(self.conn, 50)
+        self.sync.sync_once()
+
+        self.conn.execute("UPDATE wildfires SET alt = 400, sync_status = 'pending' WHERE id IN (3, 7)")
+        self.conn.commit()
+
+        self.assertEqual(self.sync.sync_once(), 2)
+        self.assertEqual(self.remote.get("wildfires/7")["alt"], 400)
+        self.assertEqual(self.pending(), 0)
+
+    def test_row_merged_during_the_push_stays_pending(self):
+        insert_rows(self.conn, 10)
+        conn = self.conn
+
+        class MergeDuringPush(InMemoryRemote):
+            def update(self, updates):
+                super().update(updates)
+                # update_mission_data in another process, before the rows are marked
+                conn.execute(
+                    "UPDATE wildfires SET latitude = 39.3, telemetry_ts = 7, sync_status = 'pending' WHERE id = 7"
+                )
+                conn.commit()
+
+        self.sync.remote = MergeDuringPush()
+        self.assertEqual(self.sync.sync_once(max_chunks=1), 10)
+        self.assertEqual(self.pending(), 1)
+
+        self.sync.remote = self.remote
+        self.assertEqual(self.sync.sync_once(), 1)
+        self.assertEqual(self.remote.get("wildfires/7")["latitude"], 39.3)
+        self.assertEqual(self.pending(), 0)
+
+    def test_failed_push_leaves_rows_pending(self):
+        insert_rows(self.conn, 50)
+        self.remote.fail_next = 1
+
+        with self.assertRaises(ConnectionError):
+            self.sync.sync_once()
+        self.assertEqual(self.pending(), 50)
+        self.assertEqual(self.sync.watermark(self.conn), 0)
+
+        self.assertEqual(self.sync.sync_once(), 50)
+        self.assertEqual(self.pending(), 0)
+
+    def test_worker_retries_with_backoff(self):
+        insert_rows(self.conn, 50)
+        self.remote.fail_next = 2
+
+        worker = FirebaseSyncWorker(self.sync, interval=0.01, max_backoff=0.05)
+        worker.start()
+        try:
+            for _ in range(200):
+                if worker.rows_synced == 50:
+                    break
+                worker._stop_event.wait(0.01)
+        finally:
+            worker.stop(timeout=1)
+
+        self.assertEqual(worker.rows_synced, 50)
+        self.assertEqual(self.pending(), 0)
+
+    def test_remote_missing_a_method_fails_at_construction(self):
+        class UpdateOnly(RealtimeRemote):
+            def update(self, updates):
+                pass
+
+        with self.assertRaises(TypeError):
+            UpdateOnly()
+
+    def test_existing_database_starts_at_end_of_table(self):
+        conn = sqlite3.connect(":memory:")
+        _baseline_tables(conn.cursor())
+        conn.executemany(
+            "INSERT INTO wildfires (name, pac_id, sync_status) VALUES ('Davis Fire', ?, 'synced')",
+            [(i,) for i in range(5)]
+        )
+        conn.commit()
+        migrate(conn)
+        self.assertEqual(conn.execute("SELECT value FROM sync_state").fetchone()[0], 5)
+        conn.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+"""Shared set-up for the tests that run against the database and the API.
+
+reset_database_state() clears the module-level caches database.py keeps
+between calls, and ServerTestCase also clears backend_server's, so a new
+cache is added here once instead of to every test's setUp.
+"""
+
+from tornado.testing import AsyncHTTPTestCase
+import database
+import db_pool
+import query_executor
+import backend_server
+
+SECOND_NS = 1_000_000_000
+START = 1_745_174_360 * SECOND_NS
+
+
+def packet(i, session="s0", **fields):
+    """Radio packet dict pac_id i, time stamped i seconds after START."""
+    return {"pac_id": i, "gps_data": [39.29, -119.84], "alt": 400.0, "high_temp": 300.0,
+            "low_temp": 100.0, "session_id": session, "time_stamp": START + i * SECOND_NS, **fields}
+
+
+def batch(start, count, name="Davis Fire", session="s0", **fields):
+    """(packet, name, "active") tuples for pac_ids start .. start + count - 1.
+
+    fields override packet values, a callable one is called with the pac_id.
+    """
+    return [(packet(i, session, **{key: value(i) if callable(value) else value
+                                   for key, value in fields.items()}), name, "active")
+            for i in range(start, start + count)]
+
+
+def reset_database_state():
+    """Forget everything database.py cached for the previous test."""
+    database._geocoder.use_network = False
+    database._packet_counts.clear()
+    database._fire_windows.clear()
+    database._flight_ids.clear()
+    database._flight_end_times.clear()
+    database._last_flight_flush = 0.0
+
+
+def use_database(path=db_pool.MEMORY_PATH):
+    """Fresh state on a migrated database at path (a new in-memory one by default)."""
+    reset_database_state()
+    db_pool.configure(path)
+    database.init_db()
+
+
+def release_database():
+    db_pool.close_thread_connections()
+    db_pool.configure()
+
+
+class ServerTestCase(AsyncHTTPTestCase):
+    """The full app on a fresh in-memory database, with empty response caches."""
+
+    def setUp(self):
+        use_database()
+        query_executor.configure(2, 1)
+        backend_server._response_cache.clear()
+        backend_server._tile_cache.clear()
+        super().setUp()
+
+    def tearDown(self):
+        super().tearDown()
+        query_executor.get_executor().shutdown()
+        release_database()
+
+    def get_app(self):
+        return backend_server.make_app()
+
+    def ingest(self, packets):
+        with db_pool.connection() as conn:
+            return database.process_packet_batch(packets, conn)
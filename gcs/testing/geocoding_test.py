@@ -0,0 +1,95 @@
+import unittest
+import os
+import random
+import tempfile
+import sqlite3
+import threading
+from migrations import migrate
+from geocoding import Gazetteer, ReverseGeocoder, cell_key, haversine_km, UNKNOWN_LOCATION
+
+PLACES = [
+    (39.52963, -119.8138, "Reno"),
+    (39.53491, -119.75269, "Sparks"),
+    (39.16380, -119.76740, "Carson City"),
+    (38.54491, -121.74052, "Davis"),
+    (40.83242, -115.76312, "Elko"),
+]
+
+
+class TestGazetteer(unittest.TestCase):
+
+    def test_nearest_place(self):
+        gazetteer = Gazetteer(PLACES)
+        name, km = gazetteer.nearest(39.292778, -119.845)
+        self.assertEqual(name, "Carson City")
+        self.assertLess(km, 30)
+
+    def test_grid_search_matches_brute_force(self):
+        random.seed(3)
+        gazetteer = Gazetteer.from_csv()
+        places = [p for cell in gazetteer.grid.values() for p in cell]
+        for _ in range(50):
+            latitude, longitude = random.uniform(32, 48), random.uniform(-124, -104)
+            expected = min(places, key=lambda p: haversine_km(latitude, longitude, p[0], p[1]))
+            name, km = gazetteer.nearest(latitude, longitude)
+            self.assertAlmostEqual(km, haversine_km(latitude, longitude, expected[0], expected[1]), places=6)
+
+    def test_nothing_in_range(self):
+        gazetteer = Gazetteer(PLACES)
+        self.assertEqual(gazetteer.nearest(0.0, 0.0), (None, None))
+
+
+class TestReverseGeocoder(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:", check_same_thread=False)
+        migrate(self.conn)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_offline_lookup_is_cached(self):
+        geocoder = ReverseGeocoder(gazetteer=Gazetteer(PLACES), use_network=False)
+        self.assertEqual(geocoder.lookup(39.53, -119.81, self.conn), "Reno")
+        row = self.conn.execute(
+            "SELECT location, source FROM geocode_cache WHERE cell = ?", (cell_key(39.53, -119.81),)
+        ).fetchone()
+        self.assertEqual(row, ("Reno", "offline"))
+
+        # A second geocoder without a gazetteer match still answers from the cache
+        other = ReverseGeocoder(gazetteer=Gazetteer([]), use_network=False)
+        self.assertEqual(other.lookup(39.53, -119.81, self.conn), "Reno")
+        self.assertEqual(other.lookup(0.0, 0.0, self.conn), UNKNOWN_LOCATION)
+
+    def test_network_refinement_is_asynchronous(self):
+        release = threading.Event()
+        calls = []
+
+        def slow_fetch(latitude, longitude):
+            calls.append((latitude, longitude))
+            release.wait(5)
+            return "Reno (nominatim)"
+
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        db_path = os.path.join(tmp_dir.name, "wildfire_data.db")
+        geocoder = ReverseGeocoder(db_path, gazetteer=Gazetteer(PLACES), use_network=True, fetch=slow_fetch)
+        shared = sqlite3.connect(db_path)
+        migrate(shared)
+
+        # Answered offline while the network request is still blocked
+        self.assertEqual(geocoder.lookup(39.53, -119.81, shared), "Reno")
+        self.assertEqual(geocoder.lookup(39.53, -119.81, shared), "Reno")
+        shared.commit()
+
+        release.set()
+        geocoder._queue.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(geocoder.lookup(39.53, -119.81, shared), "Reno (nominatim)")
+        row = shared.execute("SELECT source FROM geocode_cache WHERE cell = ?", (cell_key(39.53, -119.81),)).fetchone()
+        self.assertEqual(row[0], "nominatim")
+        shared.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
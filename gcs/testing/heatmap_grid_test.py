@@ -0,0 +1,102 @@
+import unittest
+import json
+import numpy as np
+import backend_server
+import heatmap_grid
+from fixtures import ServerTestCase, batch
+
+BBOX = "-119.90,39.25,-119.80,39.33"
+
+
+def scattered_batch(start, count):
+    rng = np.random.default_rng(start)
+    lat = 39.29 + rng.normal(0, 0.01, count)
+    lon = -119.85 + rng.normal(0, 0.01, count)
+    temp = rng.uniform(100, 600, count)
+    return batch(start, count,
+                 gps_data=lambda i: [float(lat[i - start]), float(lon[i - start])],
+                 high_temp=lambda i: float(temp[i - start]))
+
+
+class TestBinning(unittest.TestCase):
+
+    def test_matches_per_point_binning(self):
+        rng = np.random.default_rng(1)
+        lat = 39.29 + rng.normal(0, 0.02, 5000)
+        lon = -119.85 + rng.normal(0, 0.02, 5000)
+        temp = rng.uniform(100, 600, 5000)
+        zoom = 13
+        tiles = heatmap_grid.tiles_for_bbox((-120.0, 39.1, -119.7, 39.5), zoom)
+
+        # Reference: project one point at a time and group in a dict
+        expected = {}
+        for la, lo, t in zip(lat, lon, temp):
+            x, y = heatmap_grid._project(np.array([la]), np.array([lo]), zoom)
+            cell = (int(x[0]), int(y[0]))
+            if (cell[0] // heatmap_grid.GRID, cell[1] // heatmap_grid.GRID) in tiles:
+                expected.setdefault(cell, []).append(t)
+
+        binned = heatmap_grid.bin_tiles(lat, lon, temp, zoom, tiles)
+        cells = [cell for tile_cells in binned.values() for cell in tile_cells]
+        self.assertEqual(len(cells), len(expected))
+        self.assertEqual(sum(c[2] for c in cells), sum(len(v) for v in expected.values()))
+        by_max = sorted(c[4] for c in cells)
+        self.assertEqual(by_max, sorted(round(float(max(v)), 2) for v in expected.values()))
+
+    def test_rejects_bad_bbox(self):
+        with self.assertRaises(ValueError):
+            heatmap_grid.parse_bbox("1,2,3")
+        with self.assertRaises(ValueError):
+            heatmap_grid.parse_bbox("10,0,5,1")
+        with self.assertRaises(ValueError):
+            heatmap_grid.tiles_for_bbox(heatmap_grid.parse_bbox("-180,-80,180,80"), 10)
+
+
+class TestHeatmapEndpoint(ServerTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.ingest(scattered_batch(0, 2000))
+
+    def grid(self, bbox=BBOX, zoom=14):
+        response = self.fetch(f"/api/heatmap/Davis%20Fire?bbox={bbox}&zoom={zoom}")
+        self.assertEqual(response.code, 200)
+        return json.loads(response.body)
+
+    def total(self, data):
+        return sum(cell[data["columns"].index("count")] for cell in data["cells"])
+
+    def test_cells_cover_points_in_view(self):
+        data = self.grid(bbox="-120,39,-119.7,39.6", zoom=11)
+        self.assertEqual(self.total(data), 2000)
+        self.assertLess(len(data["cells"]), 2000)
+        for lat, lon, count, mean, high in data["cells"]:
+            self.assertLessEqual(mean, high)
+
+    def test_panning_reuses_tiles_and_writes_invalidate(self):
+        first = self.grid()
+        hits = backend_server._tile_cache.hits
+        self.grid(bbox="-119.89,39.25,-119.79,39.33")   # mostly the same tiles
+        self.assertGreater(backend_server._tile_cache.hits, hits)
+
+        self.ingest(scattered_batch(2000, 500))
+        self.assertGreater(self.total(self.grid()), self.total(first))
+
+    def test_ingest_into_another_fire_keeps_the_tiles(self):
+        first = self.grid()
+        tile_misses = backend_server._tile_cache.misses
+        response_hits = backend_server._response_cache.hits
+
+        self.ingest(batch(0, 500, name="Washoe Fire", session="s1"))
+        self.assertEqual(self.grid(), first)
+        self.assertEqual(backend_server._tile_cache.misses, tile_misses)
+        self.assertGreater(backend_server._response_cache.hits, response_hits)
+
+    def test_bad_arguments(self):
+        self.assertEqual(self.fetch(f"/api/heatmap/Davis%20Fire?bbox={BBOX}").code, 400)
+        self.assertEqual(self.fetch("/api/heatmap/Davis%20Fire?bbox=1,2&zoom=3").code, 400)
+        self.assertEqual(self.fetch(f"/api/heatmap/Davis%20Fire?bbox={BBOX}&zoom=40").code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+"""Ingest throughput benchmark: per-packet process_packet() versus the
+group-commit IngestWriter, replaying davis_fire_packets.jsonl.
+
+Usage (from gcs/):  python testing/ingest_benchmark.py [--per-packet N] [--memory] [--query-stats]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+GCS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, GCS_DIR)
+
+import database
+import db_pool
+from ingest_writer import IngestWriter
+
+PACKETS_FILE = os.path.join(GCS_DIR, "testing", "davis_fire_packets.jsonl")
+
+
+def load_packets(path):
+    with open(path, "r") as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def fresh_db(tmp_dir, label, memory=False):
+    """Point the connection pool at a new, empty database."""
+    if memory:
+        db_pool.configure(db_pool.MEMORY_PATH)
+    else:
+        run_dir = os.path.join(tmp_dir, label)
+        os.makedirs(run_dir)
+        db_pool.configure(os.path.join(run_dir, "wildfire_data.db"))
+    database.init_db()
+    database._packet_counts.clear()
+    database._fire_windows.clear()
+    database._flight_ids.clear()
+    database._flight_end_times.clear()
+
+
+def count_rows():
+    return db_pool.get_connection().execute("SELECT COUNT(*) FROM wildfires").fetchone()[0]
+
+
+def bench_per_packet(packets, tmp_dir, memory):
+    fresh_db(tmp_dir, "per_packet", memory)
+    start = time.perf_counter()
+    for packet in packets:
+        database.process_packet(packet, packet["name"], "active")
+    elapsed = time.perf_counter() - start
+    return elapsed, count_rows()
+
+
+def bench_writer(packets, tmp_dir, batch_size, max_latency, memory):
+    fresh_db(tmp_dir, f"writer_{batch_size}", memory)
+    start = time.perf_counter()
+    with IngestWriter(batch_size=batch_size, max_latency=max_latency) as writer:
+        for packet in packets:
+            writer.submit(packet, packet["name"], "active")
+    elapsed = time.perf_counter() - start
+    return elapsed, count_rows(), writer.batches_written
+
+
+def bench_replay(packets, max_latency):
+    """Replay packets that are already stored; every one should be dropped."""
+    start = time.perf_counter()
+    with IngestWriter(batch_size=500, max_latency=max_latency) as writer:
+        for packet in packets:
+            writer.submit(packet, packet["name"], "active")
+    elapsed = time.perf_counter() - start
+    return elapsed, writer.duplicates_dropped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark packet ingest throughput.")
+    parser.add_argument("--per-packet", type=int, default=500,
+                        help="Number of packets to replay through process_packet() (slow path)")
+    parser.add_argument("--max-latency", type=float, default=0.25)
+    parser.add_argument("--memory", action="store_true", help="Use an in-memory database")
+    parser.add_argument("--query-stats", action="store_true", help="Print the slowest statements")
+    args = parser.parse_args()
+
+    packets = load_packets(PACKETS_FILE)
+
+    # Geocoding is served offline, keep background nominatim requests out of the run
+    database._geocoder.use_network = False
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        subset = packets[:args.per_packet]
+        elapsed, rows = bench_per_packet(subset, tmp_dir, args.memory)
+        print(f"process_packet      : {len(subset):6d} packets  {rows:6d} rows  "
+              f"{elapsed:8.3f}s  {len(subset) / elapsed:10.1f} packets/s")
+
+        for batch_size in (50, 500, 2000):
+            elapsed, rows, batches = bench_writer(packets, tmp_dir, batch_size, args.max_latency, args.memory)
+            print(f"IngestWriter({batch_size:5d}) : {len(packets):6d} packets  {rows:6d} rows  "
+                  f"{elapsed:8.3f}s  {len(packets) / elapsed:10.1f} packets/s  ({batches} batches)")
+
+        elapsed, duplicates = bench_replay(packets, args.max_latency)
+        print(f"Replay (duplicates) : {len(packets):6d} packets  {duplicates:6d} dropped  "
+              f"{elapsed:8.3f}s  {len(packets) / elapsed:10.1f} packets/s")
+
+        db_pool.close_thread_connections()
+        db_pool.configure()
+
+    if args.query_stats:
+        stats = db_pool.stats()
+        print(f"\n{stats['connections']} connections, {stats['connect_seconds'] * 1000:.1f} ms setup")
+        for query in stats["queries"][:10]:
+            print(f"{query['total_seconds']:8.3f}s  {query['count']:7d}x  {query['max_seconds'] * 1000:7.2f} ms max  {query['sql'][:80]}")
+
+
+if __name__ == "__main__":
+    main()
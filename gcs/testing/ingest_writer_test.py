@@ -0,0 +1,45 @@
+import unittest
+import os
+import tempfile
+import time
+import db_pool
+from ingest_writer import IngestWriter
+from fixtures import packet, use_database, release_database
+
+
+class TestIngestWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        use_database(os.path.join(self.dir.name, "ingest.db"))
+
+    def tearDown(self):
+        release_database()
+        self.dir.cleanup()
+
+    def count(self):
+        with db_pool.connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM wildfires").fetchone()[0]
+
+    def test_flush_writes_without_waiting_for_the_latency(self):
+        with IngestWriter(batch_size=500, max_latency=10.0) as writer:
+            for i in range(20):
+                writer.submit(packet(i), "Davis Fire")
+            started = time.monotonic()
+            self.assertTrue(writer.flush(timeout=5))
+            self.assertLess(time.monotonic() - started, 5)
+            self.assertEqual(self.count(), 20)
+        self.assertEqual(writer.stats()["written"], 20)
+
+    def test_bad_packet_drops_only_itself(self):
+        with IngestWriter(batch_size=500, max_latency=0.05) as writer:
+            for i in range(10):
+                writer.submit(packet(i) if i != 3 else {"pac_id": 3, "gps_data": None}, "Davis Fire")
+            writer.submit(packet(5), "Davis Fire")     # duplicate
+        stats = writer.stats()
+        self.assertEqual((stats["written"], stats["duplicates"], stats["failed"]), (9, 1, 1))
+        self.assertEqual(self.count(), 9)
+
+
+if __name__ == "__main__":
+    unittest.main()
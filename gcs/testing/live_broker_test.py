@@ -0,0 +1,148 @@
+import unittest
+import asyncio
+import json
+import queue
+from tornado.testing import AsyncTestCase, gen_test
+from tornado.websocket import websocket_connect
+import database
+import backend_server
+from live_broker import LiveBroker, queue_publisher
+from fixtures import ServerTestCase, batch, START, SECOND_NS
+
+
+def packet(i, name="Davis Fire", flight_id=1):
+    return {"type": "packet", "id": i + 1, "name": name, "flight_id": flight_id,
+            "latitude": 39.29, "longitude": -119.84, "altitude": 400.0,
+            "high_temp": 300.0, "low_temp": 100.0, "time_stamp": START + i * SECOND_NS}
+
+
+def status(size, name="Davis Fire"):
+    return {"type": "status", "name": name, "size": size}
+
+
+class TestLiveBroker(AsyncTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.broker = LiveBroker(max_pending=5)
+        self.broker.attach(self.io_loop)
+        self.sent = []
+        self.unblock = asyncio.Event()
+        self.unblock.set()
+
+    async def send(self, message):
+        self.sent.append(message)
+        await self.unblock.wait()
+
+    async def settle(self):
+        for _ in range(5):
+            await asyncio.sleep(0)
+
+    @gen_test
+    async def test_filters_by_fire_and_flight(self):
+        flight = self.broker.connect(self.send)
+        self.broker.subscribe(flight, "Davis Fire", 2)
+        self.broker.publish([packet(0, flight_id=1), packet(1, flight_id=2),
+                             packet(2, name="Other Fire", flight_id=2), status(1.0)])
+        await self.settle()
+
+        self.assertEqual(len(self.sent), 1)
+        self.assertEqual([p["id"] for p in self.sent[0]["packets"]], [2])
+        self.assertEqual(self.sent[0]["status"], [status(1.0)])
+
+    @gen_test
+    async def test_coalesces_while_client_is_behind(self):
+        client = self.broker.connect(self.send)
+        self.broker.subscribe(client)
+        self.unblock.clear()
+
+        self.broker.publish([packet(0)])
+        await self.settle()
+        for i in range(1, 4):
+            self.broker.publish([packet(i), status(float(i))])
+        await self.settle()
+        self.assertEqual(len(self.sent), 1)
+
+        self.unblock.set()
+        await self.settle()
+        self.assertEqual(len(self.sent), 2)
+        self.assertEqual([p["id"] for p in self.sent[1]["packets"]], [2, 3, 4])
+        # only the latest status of the fire is kept
+        self.assertEqual(self.sent[1]["status"], [status(3.0)])
+
+    @gen_test
+    async def test_slow_client_gets_a_gap(self):
+        client = self.broker.connect(self.send)
+        self.broker.subscribe(client, "Davis Fire")
+        self.unblock.clear()
+
+        self.broker.publish([packet(0)])
+        await self.settle()
+        self.broker.publish([packet(i) for i in range(1, 20)])
+        await self.settle()
+        self.assertEqual(client.packets_dropped, 6)
+        self.unblock.set()
+        await self.settle()
+
+        last = self.sent[-1]
+        self.assertEqual(last["gaps"], [{"name": "Davis Fire", "flight_id": 1, "after": f"{START}:1"}])
+        self.assertNotIn("packets", last)
+        self.assertLessEqual(max(len(m.get("packets", ())) for m in self.sent), 5)
+
+    @gen_test
+    async def test_disconnect_unsubscribes(self):
+        client = self.broker.connect(self.send)
+        self.broker.subscribe(client, "Davis Fire")
+        self.broker.disconnect(client)
+        self.broker.publish([packet(0)])
+        await self.settle()
+        self.assertEqual(self.sent, [])
+        self.assertEqual(self.broker.stats()["clients"], 0)
+
+    def test_queue_publisher_reports_lost_packets(self):
+        live_queue = queue.Queue(maxsize=1)
+        publish = queue_publisher(live_queue)
+        publish([packet(0)])
+        publish([packet(1)])            # queue full, dropped
+        self.assertEqual(publish.dropped, 1)
+
+        live_queue.get()
+        publish([packet(2)])
+        events = live_queue.get()
+        self.assertEqual(events[0], {"type": "gap", "name": "Davis Fire", "flight_id": 1})
+        self.assertEqual(events[1]["id"], 3)
+
+
+class TestLiveWebSocket(ServerTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.broker = LiveBroker()
+        self.broker.attach(self.io_loop)
+        backend_server.live_broker._broker = self.broker
+        database.add_listener(self.broker.publish)
+
+    def tearDown(self):
+        database.remove_listener(self.broker.publish)
+        backend_server.live_broker._broker = None
+        super().tearDown()
+
+    @gen_test
+    async def test_committed_packets_are_pushed(self):
+        ws = await websocket_connect(self.get_url("/ws/live").replace("http", "ws"))
+        ws.write_message(json.dumps({"command": "subscribe", "name": "Davis Fire"}))
+        self.assertEqual(json.loads(await ws.read_message())["type"], "subscribed")
+
+        self.ingest(batch(0, 3))
+
+        received = []
+        while len(received) < 3:
+            message = json.loads(await ws.read_message())
+            received.extend(message.get("packets", ()))
+        self.assertEqual([p["time_stamp"] for p in received], [START + i * SECOND_NS for i in range(3)])
+        self.assertTrue(all(p["flight_id"] == 1 for p in received))
+        ws.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,177 @@
+"""API load benchmark: /wildfire_markers latency on its own and while full-table
+/get_database?table=wildfires requests run against the same server.
+
+Builds a database of --rows packets (replayed from washoe_fire_packets.txt),
+starts the API server on it in a child process and reports p50/p95/p99.
+
+Usage (from gcs/):  python testing/load_benchmark.py [--rows N] [--seconds S] [--heavy-clients N]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+GCS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, GCS_DIR)
+
+PACKETS_FILE = os.path.join(GCS_DIR, "testing", "washoe_fire_packets.txt")
+
+
+def build_db(path, rows):
+    import database
+    import db_pool
+
+    db_pool.configure(path)
+    database._geocoder.use_network = False
+    database.init_db()
+
+    with open(PACKETS_FILE, "r") as file:
+        packets = [json.loads(line) for line in file if line.strip()]
+
+    conn = db_pool.get_connection()
+    batch = []
+    for i in range(rows):
+        packet = dict(packets[i % len(packets)])
+        copy = i // len(packets)
+        packet["session_id"] = f"{packet['session_id']}_{copy}"
+        packet["time_stamp"] += copy * 3_600_000_000_000
+        batch.append((packet, f"{packet['name']} {copy % 20}", "active"))
+        if len(batch) == 5000:
+            database.process_packet_batch(batch, conn)
+            batch = []
+    database.process_packet_batch(batch, conn)
+    database.flush_flights(conn, force=True)
+    conn.commit()
+    db_pool.close_thread_connections()
+
+
+def serve(port, db_path, workers, heavy):
+    import tornado.ioloop
+    from tornado.options import options
+    import backend_server
+
+    options.db_path = db_path
+    options.port = port
+    options.db_workers = workers
+    options.heavy_requests = heavy
+    backend_server.start_app()
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+async def wait_ready(client, base_url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            await client.fetch(f"{base_url}/wildfire_markers", raise_error=False)
+            return
+        except Exception:
+            await asyncio.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+async def measure_markers(client, base_url, seconds, concurrency):
+    latencies = []
+    deadline = time.monotonic() + seconds
+
+    async def loop():
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            response = await client.fetch(f"{base_url}/wildfire_markers", raise_error=False)
+            if response.code == 200:
+                latencies.append(time.perf_counter() - start)
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(*(loop() for _ in range(concurrency)))
+    return latencies
+
+
+def run_heavy(base_url, stop, results):
+    """Full-table client, on its own thread so receiving the large bodies
+    does not stall the event loop timing the markers requests."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        with urllib.request.urlopen(f"{base_url}/get_database?table=wildfires", timeout=600) as response:
+            size = len(response.read())
+            results.append((response.status, time.perf_counter() - start, size))
+
+
+def report(label, latencies):
+    print(f"{label:<34} n={len(latencies):5d}  p50={percentile(latencies, 50) * 1000:8.1f} ms  "
+          f"p95={percentile(latencies, 95) * 1000:8.1f} ms  p99={percentile(latencies, 99) * 1000:8.1f} ms  "
+          f"max={max(latencies) * 1000:8.1f} ms")
+
+
+async def load(base_url, seconds, concurrency, heavy_clients):
+    from tornado.httpclient import AsyncHTTPClient
+
+    client = AsyncHTTPClient(max_clients=concurrency + 4)
+    await wait_ready(client, base_url)
+
+    report("/wildfire_markers alone", await measure_markers(client, base_url, seconds, concurrency))
+
+    stop = threading.Event()
+    heavy = []
+    threads = [threading.Thread(target=run_heavy, args=(base_url, stop, heavy)) for _ in range(heavy_clients)]
+    for thread in threads:
+        thread.start()
+    await asyncio.sleep(0.5)
+    latencies = await measure_markers(client, base_url, seconds, concurrency)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    report(f"/wildfire_markers + {heavy_clients} full dumps", latencies)
+    done = [h for h in heavy if h[0] == 200]
+    if done:
+        print(f"{'/get_database?table=wildfires':<34} n={len(done):5d}  "
+              f"avg={statistics.mean(h[1] for h in done):8.2f} s  size={done[0][2] / 1e6:.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--seconds", type=float, default=10.0, help="duration of each measurement phase")
+    parser.add_argument("--concurrency", type=int, default=4, help="concurrent /wildfire_markers clients")
+    parser.add_argument("--heavy-clients", type=int, default=2, help="concurrent full-table clients")
+    parser.add_argument("--workers", type=int, default=4, help="server --db_workers")
+    parser.add_argument("--heavy", type=int, default=1, help="server --heavy_requests")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--serve", metavar="DB", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port, args.serve, args.workers, args.heavy)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "wildfire_data.db")
+        start = time.perf_counter()
+        build_db(db_path, args.rows)
+        print(f"Built {args.rows} row database in {time.perf_counter() - start:.1f}s")
+
+        server = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--serve", db_path, "--port", str(args.port),
+             "--workers", str(args.workers), "--heavy", str(args.heavy)],
+            cwd=GCS_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            asyncio.run(load(f"http://localhost:{args.port}", args.seconds, args.concurrency, args.heavy_clients))
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+import unittest
+import sqlite3
+from migrations import MIGRATIONS, migrate, current_version
+
+BASE_TABLES = ("wildfires", "wildfire_status", "flights", "rollups")
+
+# Queries issued on the hot path, as written in backend_server.py and
+# database.py. Each must be answered through an index, never a table scan.
+HOT_PATH_QUERIES = {
+    "ThermalDataHandler (name)": (
+        """
+        SELECT id, name, latitude, longitude, alt as altitude, high_temp, low_temp, time_stamp, flight_id
+        FROM wildfires
+        WHERE name = ? AND time_stamp <= ?
+        ORDER BY time_stamp, id
+        """,
+        ("Davis Fire", 0),
+    ),
+    "ThermalDataHandler (name, flight_id)": (
+        """
+        SELECT id, name, latitude, longitude, alt as altitude, high_temp, low_temp, time_stamp, flight_id
+        FROM wildfires
+        WHERE name = ? AND flight_id = ?
+        ORDER BY time_stamp, id
+        """,
+        ("Davis Fire", 1),
+    ),
+    "ThermalDataHandler (name, flight_id) page": (
+        """
+        SELECT id, name, latitude, longitude, alt as altitude, high_temp, low_temp, time_stamp, flight_id
+        FROM wildfires
+        WHERE name = ? AND flight_id = ? AND (time_stamp, id) > (?, ?)
+        ORDER BY time_stamp, id LIMIT ?
+        """,
+        ("Davis Fire", 1, 0, 0, 500),
+    ),
+    "FlightDataHandler flight": (
+        """
+        SELECT flight_id, name, ulog_filename, time_started, time_ended
+        FROM flights
+        WHERE name = ? AND flight_id = ?
+        """,
+        ("Davis Fire", 1),
+    ),
+    "FlightDataHandler flights by fire": (
+        """
+        SELECT flight_id, name, ulog_filename, time_started, time_ended
+        FROM flights
+        WHERE name = ? AND time_started >= ?
+        """,
+        ("Davis Fire", 0.0),
+    ),
+    "FlightDataHandler flights by time": (
+        """
+        SELECT flight_id, name, ulog_filename, time_started, time_ended
+        FROM flights
+        WHERE 1=1 AND time_started >= ? AND time_started <= ?
+        """,
+        (0.0, 1.0),
+    ),
+    "FlightDataHandler path": (
+        """
+        SELECT id, name, latitude, longitude, alt AS altitude, high_temp, low_temp, time_stamp
+        FROM wildfires
+        WHERE name = ? AND flight_id = ?
+        ORDER BY time_stamp
+        """,
+        ("Davis Fire", 1),
+    ),
+    "LiveFlightHandler path page": (
+        """
+        SELECT id, name, latitude, longitude, alt AS altitude, high_temp, low_temp, time_stamp
+        FROM wildfires
+        WHERE name = ? AND flight_id = ? AND (time_stamp, id) > (?, ?)
+        ORDER BY time_stamp, id
+        """,
+        ("Davis Fire", 1, 0, 0),
+    ),
+    "WildfireStatusHandler history": (
+        """
+        SELECT id, time_stamp, size, flights, intensity, max_temp, min_temp, alt_avg,
+               avg_latitude, avg_longitude, num_data_points, first_time_stamp, status, last_flight_id
+        FROM wildfire_status
+        WHERE name = ?
+        ORDER BY time_stamp ASC
+        """,
+        ("Davis Fire",),
+    ),
+    "WildfireStatusHandler / WildfireMarkersHandler current": (
+        """
+        SELECT id, name, location, size, intensity, alt_avg, status, max_temp, min_temp, avg_latitude,
+               avg_longitude, flights, num_data_points, first_time_stamp, time_stamp, last_flight_id
+        FROM fire_current WHERE status = ? ORDER BY time_stamp DESC
+        """,
+        ("active",),
+    ),
+    "DatabaseQueryHandler current fire": (
+        "SELECT * FROM fire_current WHERE name = ?",
+        ("Davis Fire",),
+    ),
+    "heatmap_grid.fetch_points": (
+        """
+        SELECT latitude, longitude, high_temp
+        FROM wildfires
+        WHERE name = ? AND latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ? AND flight_id = ?
+        """,
+        ("Davis Fire", 39.0, 40.0, -120.0, -119.0, 1),
+    ),
+    "firebase sync re-pending rows": (
+        "SELECT * FROM wildfires WHERE sync_status = 'pending' AND id <= ? ORDER BY id LIMIT ?",
+        (1000, 500),
+    ),
+    "firebase sync past watermark": (
+        "SELECT * FROM wildfires WHERE id > ? ORDER BY id LIMIT ?",
+        (1000, 500),
+    ),
+    "update_mission_data unmerged packets": (
+        "SELECT id, name, time_stamp FROM wildfires WHERE telemetry_ts IS NULL AND time_stamp BETWEEN ? AND ? ORDER BY time_stamp",
+        (0, 1),
+    ),
+    "fetch_rollups": (
+        "SELECT * FROM rollups WHERE resolution = ? AND name = ? AND flight_id = ? AND bucket >= ? AND bucket <= ? ORDER BY bucket",
+        (60, "Davis Fire", -2, 0, 1),
+    ),
+    "process_new_flight session lookup": (
+        "SELECT flight_id FROM flights WHERE name = ? AND session_id = ?",
+        ("Davis Fire", "884514209550066"),
+    ),
+    "update_flights": (
+        "UPDATE flights SET time_ended = ? WHERE name = ? AND flight_id = ?",
+        (0, "Davis Fire", 1),
+    ),
+}
+
+
+def table_scans(conn, query, params):
+    """Returns the EXPLAIN QUERY PLAN lines that scan one of the base tables."""
+    plan = conn.execute(f"EXPLAIN QUERY PLAN {query}", params).fetchall()
+    scans = []
+    for row in plan:
+        detail = row[-1]
+        for table in BASE_TABLES:
+            if detail.startswith(f"SCAN {table}") or detail.startswith(f"SCAN TABLE {table}"):
+                scans.append(detail)
+    return scans
+
+
+class TestMigrations(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_migrates_new_database_to_latest(self):
+        version = migrate(self.conn)
+        self.assertEqual(version, MIGRATIONS[-1][0])
+        versions = [row[0] for row in self.conn.execute("SELECT version FROM schema_version ORDER BY version")]
+        self.assertEqual(versions, [m[0] for m in MIGRATIONS])
+
+    def test_migrate_is_idempotent(self):
+        migrate(self.conn)
+        migrate(self.conn)
+        count = self.conn.execute("SELECT COUNT(*) FROM schema_version").fetchone()[0]
+        self.assertEqual(count, len(MIGRATIONS))
+        self.assertEqual(current_version(self.conn), MIGRATIONS[-1][0])
+
+    def test_upgrades_unversioned_database_with_duplicates(self):
+        # Database created by the pre-migration init_db, holding a duplicate packet
+        self.conn.execute(
+            """
+            CREATE TABLE wildfires (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL,
+                pac_id INTEGER NOT NULL DEFAULT -1, latitude REAL, longitude REAL, alt REAL,
+                high_temp REAL, low_temp REAL, date_received STRING, time_received STRING,
+                status TEXT DEFAULT 'active', sync_status TEXT DEFAULT 'pending', time_stamp REAL,
+                heading REAL, speed REAL, flight_id INTEGER NOT NULL DEFAULT -1, session_id STRING
+            )
+            """
+        )
+        for session_id in ("s1", "s1", None, None):
+            self.conn.execute(
+                "INSERT INTO wildfires (name, pac_id, time_stamp, session_id) VALUES (?, ?, ?, ?)",
+                ("Davis Fire", 7, 100, session_id)
+            )
+        self.conn.commit()
+
+        migrate(self.conn)
+
+        # The unique index treats NULL session ids as distinct, so those rows are kept
+        rows = self.conn.execute("SELECT session_id FROM wildfires ORDER BY id").fetchall()
+        self.assertEqual(rows, [("s1",), (None,), (None,)])
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.conn.execute(
+                "INSERT INTO wildfires (name, pac_id, time_stamp, session_id) VALUES (?, ?, ?, ?)",
+                ("Davis Fire", 7, 100, "s1")
+            )
+
+    def test_hot_path_queries_use_indexes(self):
+        migrate(self.conn)
+        for label, (query, params) in HOT_PATH_QUERIES.items():
+            with self.subTest(query=label):
+                self.assertEqual(table_scans(self.conn, query, params), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
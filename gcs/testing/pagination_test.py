@@ -0,0 +1,61 @@
+import unittest
+import json
+from fixtures import ServerTestCase, batch, START, SECOND_NS
+
+
+def packets(count, start=0):
+    # pairs of packets share a time stamp, so the id breaks the tie
+    return batch(start, count, session="session0", time_stamp=lambda i: START + (i // 2) * SECOND_NS)
+
+
+class TestThermalPagination(ServerTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.ingest(packets(25))
+
+    def get_json(self, url):
+        response = self.fetch(url)
+        self.assertEqual(response.code, 200)
+        return json.loads(response.body)
+
+    def test_pages_cover_every_row_once(self):
+        flight_id = self.get_json("/api/thermal/Davis%20Fire")[0]["flight_id"]
+        base = f"/api/thermal/Davis%20Fire?flight_id={flight_id}&limit=10"
+
+        seen = []
+        cursor = None
+        while True:
+            page = self.get_json(base + (f"&after={cursor}" if cursor else ""))
+            seen.extend(row["id"] for row in page["wildfire_data"])
+            cursor = page["next_cursor"]
+            if not page["has_more"]:
+                break
+        self.assertEqual(len(seen), 25)
+        self.assertEqual(len(set(seen)), 25)
+
+        # Polling from the last cursor only returns rows added since
+        self.assertEqual(self.get_json(f"{base}&after={cursor}")["wildfire_data"], [])
+        self.ingest(packets(3, start=25))
+        page = self.get_json(f"{base}&after={cursor}")
+        self.assertEqual(len(page["wildfire_data"]), 3)
+        self.assertFalse(page["has_more"])
+
+    def test_unpaginated_response_is_unchanged(self):
+        rows = self.get_json("/api/thermal/Davis%20Fire")
+        self.assertIsInstance(rows, list)
+        self.assertEqual(len(rows), 25)
+
+    def test_bare_time_stamp_cursor(self):
+        after = START + 9 * SECOND_NS
+        page = self.get_json(f"/api/thermal/Davis%20Fire?after={after}")
+        self.assertTrue(all(row["time_stamp"] > after for row in page["wildfire_data"]))
+        self.assertEqual(len(page["wildfire_data"]), 5)
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.fetch("/api/thermal/Davis%20Fire?after=abc").code, 400)
+        self.assertEqual(self.fetch("/api/thermal/Davis%20Fire?limit=0").code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+import gzip
+import json
+import point_encoding
+from point_encoding import Points
+from fixtures import ServerTestCase, batch, START, SECOND_NS
+
+
+class TestEncodings(unittest.TestCase):
+
+    def setUp(self):
+        self.points = Points(
+            ("id", "name", "latitude", "high_temp", "time_stamp"),
+            [(1, "Davis Fire", 39.29, 300.25, float(START)),
+             (2, "Park Fire", None, 310.5, float(START + SECOND_NS)),
+             (3, "Davis Fire", 39.3, None, float(START + 2 * SECOND_NS))]
+        )
+
+    def test_negotiation(self):
+        self.assertEqual(point_encoding.negotiate(None), point_encoding.JSON)
+        self.assertEqual(point_encoding.negotiate("application/json, */*"), point_encoding.JSON)
+        self.assertEqual(point_encoding.negotiate(point_encoding.BINARY_TYPE), point_encoding.BINARY)
+        self.assertEqual(point_encoding.negotiate(point_encoding.BINARY_TYPE, "columnar"), point_encoding.COLUMNAR)
+        with self.assertRaises(ValueError):
+            point_encoding.negotiate(None, "xml")
+
+        self.assertEqual(point_encoding.accepted_encoding("deflate, gzip;q=0.5"), "gzip")
+        self.assertEqual(point_encoding.accepted_encoding("gzip;q=0, deflate"), "deflate")
+        self.assertIsNone(point_encoding.accepted_encoding("br"))
+
+    def test_formats_carry_the_same_rows(self):
+        rows = json.loads(point_encoding.encode(self.points, point_encoding.JSON))
+        self.assertEqual(rows, self.points.records())
+
+        columnar = json.loads(point_encoding.encode(self.points, point_encoding.COLUMNAR))
+        self.assertEqual(columnar["count"], 3)
+        self.assertEqual(columnar["columns"]["name"], ["Davis Fire", "Park Fire", "Davis Fire"])
+
+        columns, meta = point_encoding.decode_binary(
+            point_encoding.encode(self.points, point_encoding.BINARY, {"has_more": False}))
+        self.assertEqual(meta, {"has_more": False})
+        self.assertEqual(columns["id"], [1, 2, 3])
+        self.assertEqual(columns["name"], ["Davis Fire", "Park Fire", "Davis Fire"])
+        self.assertEqual(columns["time_stamp"], [row[4] for row in self.points.rows])
+        self.assertEqual(columns["high_temp"][:2], [300.25, 310.5])
+        self.assertNotEqual(columns["high_temp"][2], columns["high_temp"][2])   # null -> NaN
+
+    def test_nested_under_meta(self):
+        body = json.loads(point_encoding.encode(self.points, point_encoding.JSON, {"flight_id": 1}))
+        self.assertEqual(body["flight_id"], 1)
+        self.assertEqual(body["wildfire_data"], self.points.records())
+        self.assertEqual(json.loads(point_encoding.encode(Points(("id",), []), point_encoding.JSON, {})),
+                         {"wildfire_data": []})
+
+
+class TestPointEndpoints(ServerTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.ingest(batch(0, 300, gps_data=lambda i: [39.29 + i * 1e-4, -119.84], alt=400.5, high_temp=300.25))
+
+    def test_thermal_formats_agree(self):
+        rows = json.loads(self.fetch("/api/thermal/Davis%20Fire").body)
+        self.assertEqual(len(rows), 300)
+
+        columnar = json.loads(self.fetch("/api/thermal/Davis%20Fire?format=columnar").body)
+        self.assertEqual(columnar["columns"]["id"], [row["id"] for row in rows])
+
+        response = self.fetch("/api/thermal/Davis%20Fire",
+                              headers={"Accept": point_encoding.BINARY_TYPE})
+        self.assertEqual(response.headers["Content-Type"], point_encoding.BINARY_TYPE)
+        columns, _ = point_encoding.decode_binary(response.body)
+        self.assertEqual(columns["latitude"], [row["latitude"] for row in rows])
+        self.assertEqual(columns["time_stamp"], [row["time_stamp"] for row in rows])
+
+        self.assertEqual(self.fetch("/api/thermal/Davis%20Fire?format=xml").code, 400)
+
+    def test_paged_binary_carries_cursor(self):
+        response = self.fetch("/api/thermal/Davis%20Fire?limit=100&format=binary")
+        columns, meta = point_encoding.decode_binary(response.body)
+        self.assertEqual(len(columns["id"]), 100)
+        self.assertTrue(meta["has_more"])
+        self.assertEqual(meta["next_cursor"], response.headers["X-Next-Cursor"])
+
+    def test_flight_path_with_flight_fields(self):
+        flight = json.loads(self.fetch("/api/flights/Davis%20Fire?flight_id=1&format=columnar").body)
+        self.assertEqual(flight["flight_id"], 1)
+        self.assertEqual(flight["wildfire_data"]["count"], 300)
+
+    def test_heatmap_data_for_all_fires(self):
+        rows = json.loads(self.fetch("/heatmap_data").body)
+        self.assertEqual(len(rows), 300)
+        self.assertIn("time_stamp", rows[0])
+
+    def test_large_responses_are_compressed(self):
+        response = self.fetch("/api/thermal/Davis%20Fire", decompress_response=False,
+                              headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertEqual(len(json.loads(gzip.decompress(response.body))), 300)
+
+        plain = self.fetch("/api/thermal/Davis%20Fire", decompress_response=False,
+                           headers={"Accept-Encoding": "identity"})
+        self.assertNotIn("Content-Encoding", plain.headers)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+import asyncio
+import threading
+import db_pool
+import query_executor
+
+
+class TestQueryExecutor(unittest.TestCase):
+
+    def setUp(self):
+        db_pool.configure(db_pool.MEMORY_PATH)
+        with db_pool.connection() as conn:
+            conn.execute("CREATE TABLE t (x)")
+        self.executor = query_executor.QueryExecutor(max_workers=2, heavy_limit=1)
+
+    def tearDown(self):
+        self.executor.shutdown()
+        db_pool.close_thread_connections()
+        db_pool.configure()
+
+    def test_runs_on_worker_and_commits(self):
+        def insert(conn, value):
+            conn.execute("INSERT INTO t VALUES (?)", (value,))
+            return threading.current_thread().name
+
+        name = asyncio.run(self.executor.run(insert, 7))
+        self.assertTrue(name.startswith("db"))
+        rows = db_pool.get_connection().execute("SELECT x FROM t").fetchall()
+        self.assertEqual(rows, [(7,)])
+
+    def test_error_rolls_back(self):
+        def fail(conn):
+            conn.execute("INSERT INTO t VALUES (1)")
+            raise ValueError()
+
+        with self.assertRaises(ValueError):
+            asyncio.run(self.executor.run(fail))
+        self.assertEqual(db_pool.get_connection().execute("SELECT COUNT(*) FROM t").fetchone()[0], 0)
+
+    def test_heavy_requests_are_limited(self):
+        running = []
+        peak = []
+
+        def heavy(conn):
+            running.append(1)
+            peak.append(len(running))
+            threading.Event().wait(0.05)
+            running.pop()
+
+        async def main():
+            await asyncio.gather(*(self.executor.run_heavy(heavy) for _ in range(3)))
+
+        asyncio.run(main())
+        self.assertEqual(max(peak), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,223 @@
+import unittest
+import multiprocessing as mp
+import os
+import queue
+import sqlite3
+import tempfile
+import threading
+import time
+import database
+import db_pool
+import radio
+from ingest_writer import drain, write_batch, BatchStats
+from packet_class._v4.packet import Packet
+from fixtures import use_database, release_database, START, SECOND_NS
+
+
+def packet(i, session="s0"):
+    return Packet("KK72PA", session, i, [39.29, -119.84], 400, 300, 100, START + i * SECOND_NS)
+
+
+class TestDrain(unittest.TestCase):
+
+    def test_takes_what_is_queued_up_to_the_cap(self):
+        q = queue.Queue()
+        for i in range(12):
+            q.put(i)
+        self.assertEqual(drain(q, 5, 0.01), ([0, 1, 2, 3, 4], False))
+        self.assertEqual(drain(q, 50, 0.01), (list(range(5, 12)), False))
+        self.assertEqual(drain(q, 5, 0.01, idle_timeout=0.01), ([], False))
+
+    def test_waits_for_latency_then_stops(self):
+        q = queue.Queue()
+
+        def produce():
+            for i in range(3):
+                q.put(i)
+                time.sleep(0.02)
+            q.put(None)
+
+        threading.Thread(target=produce).start()
+        items, stop = drain(q, 100, 1.0)
+        self.assertEqual((items, stop), ([0, 1, 2], True))
+
+    def test_batch_size_histogram(self):
+        stats = BatchStats()
+        for size, depth in ((1, 0), (3, 7), (4, 2), (500, None)):
+            stats.record(size, depth)
+        self.assertEqual(stats.stats()["batch_sizes"], {1: 1, 4: 2, 512: 1})
+        self.assertEqual(stats.max_queue_depth, 7)
+        self.assertIsNone(stats.queue_depth)
+
+
+class TestSendPacketToServer(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        use_database(os.path.join(self.dir.name, "radio.db"))
+
+    def tearDown(self):
+        release_database()
+        self.dir.cleanup()
+
+    def test_batches_packets_and_blocks_when_idle(self):
+        q = queue.Queue()
+        result = {}
+        consumer = threading.Thread(
+            target=lambda: result.update(stats=radio.send_packet_to_server("Davis Fire", q, stats_interval=3600))
+        )
+        consumer.start()
+
+        # Idle: blocked on the queue rather than spinning
+        cpu = time.thread_time()
+        started = time.process_time()
+        time.sleep(0.3)
+        self.assertLess(time.process_time() - started - (time.thread_time() - cpu), 0.1)
+
+        for i in range(1200):
+            q.put(packet(i))
+        q.put(packet(5))          # duplicate
+        q.put(None)
+        consumer.join(10)
+        self.assertFalse(consumer.is_alive())
+
+        stats = result["stats"]
+        self.assertEqual(stats.packets, 1201)
+        self.assertLessEqual(stats.batches, 5)
+        with db_pool.connection() as conn:
+            count = conn.execute("SELECT COUNT(*) FROM wildfires").fetchone()[0]
+        self.assertEqual(count, 1200)
+
+    def test_writes_to_the_given_db_path(self):
+        path = os.path.join(self.dir.name, "server.db")
+        db_pool.configure(path)
+        database.init_db()
+        db_pool.configure(os.path.join(self.dir.name, "radio.db"))
+
+        q = queue.Queue()
+        for i in range(10):
+            q.put(packet(i))
+        q.put(None)
+        radio.send_packet_to_server("Davis Fire", q, stats_interval=3600, db_path=path)
+        with sqlite3.connect(path) as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM wildfires").fetchone()[0], 10)
+
+    def test_sigterm_flushes_flight_end_times(self):
+        path = os.path.join(self.dir.name, "radio.db")
+        ctx = mp.get_context("fork")
+        q = ctx.Queue()
+        consumer = ctx.Process(target=radio.send_packet_to_server, args=("Davis Fire", q),
+                               kwargs={"stats_interval": 3600, "db_path": path})
+        consumer.start()
+
+        def wait_for(count):
+            for _ in range(500):
+                with sqlite3.connect(path) as conn:
+                    if conn.execute("SELECT COUNT(*) FROM wildfires").fetchone()[0] == count:
+                        return conn.execute("SELECT time_ended FROM flights").fetchone()[0]
+                time.sleep(0.01)
+            self.fail(f"{count} packets not written")
+
+        for i in range(5):
+            q.put(packet(i))
+        first_end = wait_for(5)
+        # Within FLIGHT_FLUSH_INTERVAL: the new end time stays in the process
+        for i in range(5, 10):
+            q.put(packet(i))
+        self.assertEqual(wait_for(10), first_end)
+
+        consumer.terminate()   # start_radio's cleanup
+        consumer.join(10)
+        self.assertEqual(consumer.exitcode, 0)
+        with sqlite3.connect(path) as conn:
+            self.assertGreater(conn.execute("SELECT time_ended FROM flights").fetchone()[0], first_end)
+
+
+class TestWriteBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "radio.db")
+        use_database(self.path)
+
+    def tearDown(self):
+        release_database()
+        self.dir.cleanup()
+
+    def count(self):
+        with db_pool.connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM wildfires").fetchone()[0]
+
+    def test_bad_packet_drops_only_itself(self):
+        batch = [(radio.packet_data(packet(i)), "Davis Fire", "active") for i in range(10)]
+        batch[4] = ({"pac_id": 4, "gps_data": None}, "Davis Fire", "active")
+        with db_pool.connection() as conn:
+            self.assertEqual(write_batch(batch, conn), (9, 0, 1))
+        self.assertEqual(self.count(), 9)
+
+    def test_failed_status_refresh_keeps_the_committed_batch(self):
+        # The flight exists already: a new one refreshes the status inside the batch
+        with db_pool.connection() as conn:
+            write_batch([(radio.packet_data(packet(0)), "Davis Fire", "active")], conn)
+        events = []
+        database.add_listener(events.extend)
+        refresh = database.update_fire_status
+
+        def locked(*args):
+            raise sqlite3.OperationalError("database is locked")
+
+        database.update_fire_status = locked
+        try:
+            batch = [(radio.packet_data(packet(i)), "Davis Fire", "active") for i in range(1, 101)]
+            with db_pool.connection() as conn:
+                self.assertEqual(write_batch(batch, conn, backoff=0), (100, 0, 0))
+                self.assertFalse(conn.in_transaction)
+        finally:
+            database.update_fire_status = refresh
+            database.remove_listener(events.extend)
+        self.assertEqual(self.count(), 101)
+        self.assertEqual(sum(event["type"] == "packet" for event in events), 100)
+        # Left due for the next batch
+        self.assertEqual(database._packet_counts["Davis Fire"], 101)
+
+    def test_rolled_back_flight_end_times_are_requeued(self):
+        class FailingCommit(sqlite3.Connection):
+            fail = True
+
+            def commit(self):
+                if FailingCommit.fail:
+                    FailingCommit.fail = False
+                    raise sqlite3.OperationalError("disk I/O error")
+                super().commit()
+
+        conn = sqlite3.connect(self.path, factory=FailingCommit)
+        batch = [(radio.packet_data(packet(i)), "Davis Fire", "active") for i in range(10)]
+        with self.assertRaises(sqlite3.OperationalError):
+            database.process_packet_batch(batch, conn)
+        self.assertIn(("Davis Fire", 1), database._flight_end_times)
+
+        self.assertEqual(database.process_packet_batch(batch, conn), (10, 0))
+        database.flush_flights(conn, force=True)
+        conn.commit()
+        conn.close()
+        with db_pool.connection() as conn:
+            self.assertIsNotNone(conn.execute("SELECT time_ended FROM flights").fetchone()[0])
+
+    def test_locked_database_is_retried(self):
+        # The other process holds the write lock for a moment
+        other = sqlite3.connect(self.path, check_same_thread=False)
+        other.execute("BEGIN IMMEDIATE")
+        timer = threading.Timer(0.2, other.commit)
+        timer.start()
+
+        conn = sqlite3.connect(self.path, timeout=0)
+        batch = [(radio.packet_data(packet(i)), "Davis Fire", "active") for i in range(10)]
+        self.assertEqual(write_batch(batch, conn, backoff=0.05), (10, 0, 0))
+        timer.join()
+        conn.close()
+        other.close()
+        self.assertEqual(self.count(), 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
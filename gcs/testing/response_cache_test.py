@@ -0,0 +1,84 @@
+import unittest
+import json
+import database
+import db_pool
+import data_version
+import backend_server
+from response_cache import ResponseCache
+from fixtures import ServerTestCase, batch
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def test_versions_and_eviction(self):
+        cache = ResponseCache(max_entries=2)
+        cache.put("a", (1,), b"a1")
+        self.assertEqual(cache.get("a", (1,)), b"a1")
+        self.assertIsNone(cache.get("a", (2,)))
+
+        cache.put("b", (1,), b"b1")
+        cache.get("a", (1,))
+        cache.put("c", (1,), b"c1")      # evicts b, the least recently used
+        self.assertIsNone(cache.get("b", (1,)))
+        self.assertEqual(cache.get("a", (1,)), b"a1")
+        self.assertEqual(cache.stats()["entries"], 2)
+
+
+class TestCachedEndpoints(ServerTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.ingest(batch(0, 150))
+
+    def versions(self):
+        with db_pool.connection() as conn:
+            return data_version.read(conn, data_version.TABLES)[0]
+
+    def test_revalidation_returns_304(self):
+        first = self.fetch("/wildfire_markers")
+        self.assertEqual(first.code, 200)
+        etag = first.headers["ETag"]
+        self.assertIn("Last-Modified", first.headers)
+
+        hits = backend_server._response_cache.hits
+        self.assertEqual(self.fetch("/wildfire_markers").body, first.body)
+        self.assertEqual(backend_server._response_cache.hits, hits + 1)
+
+        cached = self.fetch("/wildfire_markers", headers={"If-None-Match": etag})
+        self.assertEqual(cached.code, 304)
+        self.assertEqual(cached.body, b"")
+
+        since = self.fetch("/wildfire_markers", headers={"If-Modified-Since": first.headers["Last-Modified"]})
+        self.assertEqual(since.code, 304)
+
+    def test_writes_bump_the_version(self):
+        before = self.versions()
+        self.ingest(batch(0, 10))          # duplicates only, nothing changes
+        self.assertEqual(self.versions(), before)
+
+        self.ingest(batch(150, 10))
+        packets_only = self.versions()
+        self.assertEqual(packets_only[0], before[0] + 1)
+        self.assertEqual(packets_only[1], before[1])
+
+        database.update_fire_status("Davis Fire")
+        self.assertEqual(self.versions()[1], before[1] + 1)
+
+    def test_status_update_invalidates(self):
+        first = self.fetch("/api/fire_status?name=Davis%20Fire")
+        etag = first.headers["ETag"]
+
+        # New packets alone leave the status responses valid
+        self.ingest(batch(150, 10))
+        self.assertEqual(self.fetch("/api/fire_status?name=Davis%20Fire",
+                                    headers={"If-None-Match": etag}).code, 304)
+
+        database.update_fire_status("Davis Fire")
+        second = self.fetch("/api/fire_status?name=Davis%20Fire", headers={"If-None-Match": etag})
+        self.assertEqual(second.code, 200)
+        self.assertNotEqual(second.headers["ETag"], etag)
+        self.assertEqual(len(json.loads(second.body)), len(json.loads(first.body)) + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
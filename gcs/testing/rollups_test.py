@@ -0,0 +1,102 @@
+import unittest
+import random
+import sqlite3
+import database
+from migrations import MIGRATIONS, migrate, _rollups
+from rollups import RESOLUTIONS, FIRE_ROLLUP, rebuild, fetch_rollups
+from fixtures import packet, reset_database_state, START, SECOND_NS
+
+
+def random_packets(count, start_ts=START):
+    return [packet(i, f"session{i // 400}",
+                   gps_data=[39.29 + random.uniform(-0.01, 0.01), -119.84 + random.uniform(-0.01, 0.01)],
+                   alt=random.uniform(300, 450),
+                   high_temp=random.uniform(100, 600),
+                   low_temp=random.uniform(50, 150),
+                   time_stamp=start_ts + i * 7 * SECOND_NS)
+            for i in range(count)]
+
+
+def all_rollups(conn):
+    return conn.execute("SELECT * FROM rollups ORDER BY resolution, name, flight_id, bucket").fetchall()
+
+
+class TestRollups(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(5)
+        reset_database_state()
+        self.conn = sqlite3.connect(":memory:")
+        migrate(self.conn)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def assertRollupsEqual(self, actual, expected):
+        self.assertEqual(len(actual), len(expected))
+        for a, e in zip(actual, expected):
+            self.assertEqual(a[:5], e[:5])
+            for x, y in zip(a[5:], e[5:]):
+                self.assertAlmostEqual(x, y, places=4)
+
+    def test_migration_backfill_matches_rebuild(self):
+        database.process_packet_batch([(p, "Davis Fire", "active") for p in random_packets(1000)], self.conn)
+        expected = all_rollups(self.conn)
+        # Back to before the rollups table existed, with packets to backfill
+        self.conn.execute("DROP TABLE rollups")
+        version = next(v for v, _, apply in MIGRATIONS if apply is _rollups)
+        self.conn.execute("DELETE FROM schema_version WHERE version >= ?", (version,))
+        self.conn.commit()
+
+        migrate(self.conn)
+        self.assertRollupsEqual(all_rollups(self.conn), expected)
+        rebuild(self.conn.cursor())
+        self.assertRollupsEqual(all_rollups(self.conn), expected)
+
+    def test_ingest_matches_rebuild(self):
+        packets = random_packets(1000)
+        for start in range(0, len(packets), 128):
+            database.process_packet_batch([(p, "Davis Fire", "active") for p in packets[start:start + 128]], self.conn)
+        # Replayed packets are duplicates and must not be counted again
+        database.process_packet_batch([(p, "Davis Fire", "active") for p in packets[:50]], self.conn)
+
+        incremental = all_rollups(self.conn)
+        rebuild(self.conn.cursor())
+        self.assertRollupsEqual(incremental, all_rollups(self.conn))
+
+        fire_total = sum(row["count"] for row in fetch_rollups(self.conn.cursor(), "Davis Fire", RESOLUTIONS[0]))
+        self.assertEqual(fire_total, 1000)
+
+    def test_fetch_by_flight_and_range(self):
+        start = START
+        database.process_packet_batch([(p, "Davis Fire", "active") for p in random_packets(1000, start)], self.conn)
+
+        flights = self.conn.execute(
+            "SELECT DISTINCT flight_id FROM rollups WHERE flight_id != ?", (FIRE_ROLLUP,)
+        ).fetchall()
+        self.assertEqual(len(flights), 3)
+
+        rows = fetch_rollups(self.conn.cursor(), "Davis Fire", 900, flight_id=flights[0][0])
+        self.assertEqual(sum(row["count"] for row in rows), 400)
+        self.assertTrue(all(row["max_temp"] >= row["high_temp"] >= row["low_temp"] >= row["min_temp"] for row in rows))
+
+        window = fetch_rollups(self.conn.cursor(), "Davis Fire", 60,
+                               time_from=start + 600 * SECOND_NS, time_to=start + 1200 * SECOND_NS)
+        self.assertEqual(len(window), 11)
+
+    def test_mission_data_keeps_rollups_consistent(self):
+        start = START
+        database.process_packet_batch([(p, "Davis Fire", "active") for p in random_packets(100, start)], self.conn)
+        database.update_mission_data(
+            {"time_stamp": start + 300 * SECOND_NS, "latitude": 39.5e6, "longitude": -119.5e6,
+             "altitude": 500.0, "heading": 90.0, "speed": 10.0},
+            self.conn
+        )
+
+        incremental = all_rollups(self.conn)
+        rebuild(self.conn.cursor())
+        self.assertRollupsEqual(incremental, all_rollups(self.conn))
+
+
+if __name__ == "__main__":
+    unittest.main()
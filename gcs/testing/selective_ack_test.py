@@ -0,0 +1,144 @@
+import unittest
+import random
+import struct
+import zlib
+from dedup_window import SessionDedup
+from selective_ack import SelectiveAcks, SAK_DUE, ACK_ALONE
+from packet_class._v4.packet import Packet, deserialize_pac
+from packet_class._v5.packet import (Packet_Info, Packet_Info_Dict, MAX_PAC_ID, ACK_PACKET_SIZE,
+                                     SAK_PACKET_SIZE, CAP_PACKET_SIZE, serialize_ack,
+                                     serialize_sak, serialize_cap, deserialize_cap, split_uplink,
+                                     sak_covers)
+
+CALL_SIGN = "KK72PA"
+SESSION = "2025-04-20 12:00:00"
+
+
+def dat(pac_id):
+    return Packet(CALL_SIGN, SESSION, pac_id, [39.29, -119.84], 400, 300, 100, pac_id).serialize()
+
+
+class TestV5Packets(unittest.TestCase):
+
+    def test_cap_fails_the_v4_checksum(self):
+        cap = serialize_cap(CALL_SIGN, SESSION, 42)
+        self.assertEqual(len(cap), CAP_PACKET_SIZE)
+        self.assertEqual(len(cap), len(dat(1)))
+        self.assertNotEqual(zlib.crc32(cap[:-4]), struct.unpack('<I', cap[-4:])[0])
+        self.assertEqual(deserialize_cap(cap), (SESSION, 5, 42))
+        self.assertIsNone(deserialize_cap(dat(1)))
+
+    def test_split_uplink_skips_noise_and_keeps_partial_packets(self):
+        sak = serialize_sak(CALL_SIGN, 10, 0b11)
+        corrupted = bytearray(serialize_ack(CALL_SIGN, 3))
+        corrupted[10] ^= 0xFF
+        stream = b"\x00ACKnoise" + serialize_ack(CALL_SIGN, 1) + bytes(corrupted) + sak + sak[:5]
+        packets, rest = split_uplink(stream)
+        self.assertEqual(packets, [("ACK", 1), ("SAK", 10, 0b11)])
+        self.assertEqual(rest, sak[:5])
+        packets, rest = split_uplink(rest + sak[5:])
+        self.assertEqual((packets, rest), ([("SAK", 10, 0b11)], b""))
+        self.assertEqual((ACK_PACKET_SIZE, SAK_PACKET_SIZE), (17, 25))
+
+    def test_pop_acked_across_wraparound(self):
+        unacked = Packet_Info_Dict()
+        for pac_id in [MAX_PAC_ID - 2, MAX_PAC_ID - 1, MAX_PAC_ID, 1, 2, 3, 5, 70]:
+            unacked.add(Packet_Info(b"", pac_id))
+        self.assertEqual(unacked.oldest_pac_id(71), MAX_PAC_ID - 2)
+        # Cumulative MAX_PAC_ID, then 1 is bit 0 and 3 is bit 2
+        acked = unacked.pop_acked(MAX_PAC_ID, 0b101)
+        self.assertEqual(acked, [MAX_PAC_ID - 2, MAX_PAC_ID - 1, MAX_PAC_ID, 1, 3])
+        self.assertEqual(sorted(unacked.master_dictionary), [2, 5, 70])
+        self.assertFalse(sak_covers(70, 2, (1 << 64) - 1))   # beyond the bitmap
+        self.assertTrue(sak_covers(66, 2, 1 << 63))
+
+
+class TestSelectiveAcks(unittest.TestCase):
+
+    def setUp(self):
+        self.dedup = SessionDedup(size=256)
+        self.acks = SelectiveAcks(self.dedup, CALL_SIGN, every=4, interval=1.0)
+
+    def test_only_v5_sessions_negotiate(self):
+        self.assertFalse(self.acks.negotiate(SESSION, 4, 1))
+        self.assertFalse(self.acks.is_selective(SESSION))
+        self.assertTrue(self.acks.negotiate(SESSION, 5, 1))
+        self.assertTrue(self.acks.is_selective(SESSION))
+
+    def test_cumulative_and_bitmap(self):
+        self.acks.negotiate(SESSION, 5, 1)
+        for pac_id in [1, 2, 3, 5, 6, 9]:
+            self.dedup.receive(SESSION, pac_id)
+        self.assertEqual(self.acks.received(SESSION, 67), None)
+        self.assertEqual(self.acks.received(SESSION, 68), ACK_ALONE)    # past the bitmap of 3
+        cumulative, bitmap, sak = self.acks.sak(SESSION)
+        self.assertEqual(cumulative, 3)
+        self.assertEqual(bitmap, 0b100110)     # 5, 6 and 9
+        self.assertEqual(split_uplink(sak)[0], [("SAK", 3, 0b100110)])
+
+        # The drone gave up waiting on 4 (or it was acked some other way)
+        self.acks.negotiate(SESSION, 5, 7)
+        self.assertEqual(self.acks.sak(SESSION)[0], 6)
+
+    def test_sent_every_k_packets_or_on_the_timer(self):
+        self.acks.negotiate(SESSION, 5, 1)
+        self.assertEqual([self.acks.received(SESSION, pac_id, now=0.0) for pac_id in range(1, 5)],
+                         [None, None, None, SAK_DUE])
+        self.acks.sak(SESSION)
+        self.acks.received(SESSION, 5, now=10.0)
+        self.assertEqual(self.acks.due(now=10.5), [])
+        self.assertEqual(self.acks.due(now=11.0), [SESSION])
+        self.acks.sak(SESSION)
+        self.assertEqual(self.acks.due(now=20.0), [])
+
+    def test_lossy_link_is_fully_acknowledged_with_less_uplink(self):
+        """Drone and GCS over a link that loses 10% of packets each way, the
+        drone resending a packet 40 packets (10 s at 4 Hz) after it was sent."""
+        rng = random.Random(3)
+        unacked, sent_at = Packet_Info_Dict(), {}
+        uplink_bytes = received_dats = 0
+        to_send = list(range(1, 1001))
+        self.acks.negotiate(SESSION, 5, 1)
+        for tick in range(10_000):
+            if unacked.size() and tick - sent_at[unacked.peek_top_pac_id()] >= 40:
+                pac_id = unacked.peek_top_pac_id()       # timed out, resend
+                info = unacked.access(pac_id)
+                unacked.pop(pac_id)
+                unacked.add(info)
+            elif to_send:
+                pac_id = to_send.pop(0)
+                unacked.add(Packet_Info(dat(pac_id), pac_id))
+            elif unacked.size():
+                continue
+            else:
+                break
+            sent_at[pac_id] = tick
+            now = tick * 0.25
+
+            uplink = b""
+            if rng.random() >= 0.1:                        # DAT not lost
+                received = deserialize_pac(unacked.access(pac_id).serialized_packet)[0]
+                self.dedup.receive(received.session_id, received.pac_id)
+                received_dats += 1
+                state = self.acks.received(SESSION, received.pac_id, now=now)
+                if state == ACK_ALONE:
+                    uplink += serialize_ack(CALL_SIGN, received.pac_id)
+                if state == SAK_DUE:
+                    uplink += self.acks.sak(SESSION)[2]
+            for _ in self.acks.due(now=now):
+                uplink += self.acks.sak(SESSION)[2]
+            uplink_bytes += len(uplink)
+            if rng.random() < 0.1:
+                continue                                   # ACK/SAK lost
+            for packet in split_uplink(uplink)[0]:
+                if packet[0] == "ACK":
+                    unacked.pop(packet[1])
+                else:
+                    unacked.pop_acked(packet[1], packet[2])
+
+        self.assertEqual(unacked.size(), 0)
+        self.assertLess(uplink_bytes, received_dats * ACK_PACKET_SIZE / 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
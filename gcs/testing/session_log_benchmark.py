@@ -0,0 +1,72 @@
+"""Transmission log benchmark: the original open/append/flush/close per
+record against the buffered SessionLogWriter, in CSV and binary.
+
+Writes --records receive records spread over --sessions session files in a
+temporary directory and reports the cost per record and the bytes written.
+
+Usage (from gcs/):  python testing/session_log_benchmark.py [--records N] [--sessions S]
+"""
+
+import argparse
+import csv
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+GCS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, GCS_DIR)
+
+import session_log
+
+
+def make_records(count, sessions):
+    start = time.time()
+    return [(start + i * 0.01, f"s{i % sessions}", i, "DAT", "r", "RF", 1, False) for i in range(count)]
+
+
+def per_record(directory, records):
+    """The original radio_log_listener loop."""
+    for record in records:
+        csv_file = session_log.session_filename(directory, record[1])
+        if not os.path.exists(csv_file):
+            with open(csv_file, mode="w", newline="") as file:
+                csv.writer(file).writerow(session_log.LOG_FIELDS)
+        with open(csv_file, mode="a", newline="") as file:
+            csv.writer(file).writerow([time.strftime(session_log.TIMESTAMP_FORMAT), *record[1:]])
+            file.flush()
+
+
+def buffered(fmt):
+    def run(directory, records):
+        with session_log.SessionLogWriter(directory, fmt) as writer:
+            for record in records:
+                writer.write(*record)
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=50_000)
+    parser.add_argument("--sessions", type=int, default=2)
+    args = parser.parse_args()
+
+    records = make_records(args.records, args.sessions)
+    print(f"{args.records} records over {args.sessions} sessions")
+    for label, run in (("per-record csv", per_record), ("buffered csv", buffered(session_log.CSV)),
+                       ("buffered binary", buffered(session_log.BINARY))):
+        directory = tempfile.mkdtemp()
+        try:
+            started = time.perf_counter()
+            run(directory, records)
+            elapsed = time.perf_counter() - started
+            size = sum(os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory))
+        finally:
+            shutil.rmtree(directory)
+        print(f"  {label:16s} {elapsed * 1e6 / len(records):8.2f} us/record  "
+              f"{size / len(records):6.1f} B/record")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import unittest
+import csv
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+import radio
+import session_log
+from session_log import SessionLogWriter
+
+STAMP = 1_745_174_360.0
+
+
+def records(session, count, start=0):
+    return [(STAMP + i, session, i, "DAT", "r", "RF", 1, False) for i in range(start, start + count)]
+
+
+def old_rows(recs):
+    """Rows as the per-record CSV logger wrote them."""
+    return [[session_log.format_timestamp(r[0]), *r[1:]] for r in recs]
+
+
+def read_csv(path):
+    with open(path, newline="") as file:
+        return list(csv.reader(file))
+
+
+def as_text(rows):
+    return [[str(value) for value in row] for row in rows]
+
+
+class TestSessionLogWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def path(self, session, fmt=session_log.CSV):
+        return session_log.session_filename(self.dir, session, fmt)
+
+    def test_csv_matches_old_format(self):
+        recs = records("s0", 5) + [(STAMP, "s0", "", "", "r", "RF", "", True)]
+        with SessionLogWriter(self.dir) as writer:
+            for record in recs:
+                writer.write(*record)
+        self.assertEqual(read_csv(self.path("s0")), [session_log.LOG_FIELDS] + as_text(old_rows(recs)))
+
+    def test_buffers_until_size_or_interval(self):
+        writer = SessionLogWriter(self.dir, flush_rows=10, flush_interval=60)
+        for record in records("s0", 9):
+            writer.write(*record)
+        self.assertEqual(len(read_csv(self.path("s0"))), 1)   # header only
+        writer.write(*records("s0", 1, start=9)[0])
+        self.assertEqual(len(read_csv(self.path("s0"))), 11)
+
+        writer.flush_interval = 0.01
+        writer.write(*records("s0", 1, start=10)[0])
+        time.sleep(0.02)
+        writer.flush_if_due()
+        self.assertEqual(len(read_csv(self.path("s0"))), 12)
+        writer.close()
+
+    def test_lru_evicts_and_reopens_without_losing_rows(self):
+        expected = {"a": [], "b": [], "c": []}
+        with SessionLogWriter(self.dir, max_open=2) as writer:
+            for round_ in range(3):
+                for session in expected:
+                    recs = records(session, 4, start=round_ * 4)
+                    expected[session] += recs
+                    for record in recs:
+                        writer.write(*record)
+                    self.assertLessEqual(len(writer._files), 2)
+            self.assertGreater(writer.opens, 3)
+        for session, recs in expected.items():
+            self.assertEqual(read_csv(self.path(session))[1:], as_text(old_rows(recs)))
+
+    def test_binary_converts_to_the_same_csv(self):
+        recs = records("s0", 50) + [(STAMP, "s0", "", "", "r", "UDP", "", True),
+                                    (STAMP, "s0", 7, "ACK", "s", "RF", 1, False)]
+        with SessionLogWriter(self.dir) as writer:
+            for record in recs:
+                writer.write(*record)
+        with SessionLogWriter(self.dir, session_log.BINARY, max_open=1) as writer:
+            for record in recs[:20]:
+                writer.write(*record)
+            writer.write(*records("other", 1)[0])     # evicts s0, which is then reopened
+            for record in recs[20:]:
+                writer.write(*record)
+
+        self.assertEqual(os.path.getsize(self.path("s0", session_log.BINARY)),
+                         session_log._HEADER.size + 2 + len(recs) * session_log.RECORD.size)
+        converted = session_log.convert_to_csv(self.path("s0", session_log.BINARY),
+                                               os.path.join(self.dir, "converted.csv"))
+        self.assertEqual(read_csv(converted), read_csv(self.path("s0")))
+
+
+class TestRadioLogListener(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.log_dir = radio.LOG_DIR
+        radio.LOG_DIR = self.dir
+
+    def tearDown(self):
+        radio.LOG_DIR = self.log_dir
+        shutil.rmtree(self.dir)
+
+    def test_listener_flushes_on_stop(self):
+        q_log = queue.Queue()
+        listener = threading.Thread(target=radio.radio_log_listener, args=(q_log,))
+        # signal handlers can only be installed from the main thread
+        original = radio.signal.signal
+        radio.signal.signal = lambda *args: None
+        try:
+            listener.start()
+            for i in range(3):
+                radio.log_trans_gcs("s0", i, "DAT", "r", 1, False, q_log)
+            radio.log_trans_gcs("", "", "", "r", "", True, q_log)
+            q_log.put(None)
+            listener.join(5)
+        finally:
+            radio.signal.signal = original
+
+        rows = read_csv(radio.get_session_filename("s0"))
+        self.assertEqual([row[2] for row in rows[1:]], ["0", "1", "2"])
+        self.assertEqual(read_csv(radio.get_session_filename(""))[1][1:], ["", "", "", "r", "UDP", "", "True"])
+        self.assertEqual(len(radio.aggregate_logs(["s0", ""])), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
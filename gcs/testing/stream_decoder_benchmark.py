@@ -0,0 +1,102 @@
+"""Downlink framing benchmark: the original fixed DAT_PACKET_SIZE reads
+against the scanning DownlinkDecoder, on a corrupted byte stream.
+
+Builds --packets DAT packets and corrupts --rate of them with a dropped,
+inserted or flipped byte, or a burst of line noise before them. Reports the
+share of intact packets each reader recovers and the decode throughput, and
+the decoder's throughput on the clean stream. The decoder is fed in random
+chunks of 1-128 bytes, like serial reads of whatever has arrived.
+
+Usage (from gcs/):  python testing/stream_decoder_benchmark.py [--packets N] [--rate R] [--seed S]
+"""
+
+import argparse
+import os
+import random
+import struct
+import sys
+import time
+import zlib
+
+GCS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, GCS_DIR)
+
+from packet_class._v4.packet import Packet
+from stream_decoder import DownlinkDecoder, DAT_PACKET_SIZE
+
+
+def corrupted_stream(count, rate, rng):
+    """(stream bytes, number of packets left intact)."""
+    parts, intact = [], 0
+    for i in range(1, count + 1):
+        data = bytearray(Packet("KK72PA", "2025-04-20 12:00:00", i, [39.29, -119.84],
+                                400, rng.randint(0, 500), 100, i).serialize())
+        if rng.random() < rate:
+            kind = rng.choice(("drop", "insert", "flip", "noise"))
+            at = rng.randrange(1, len(data))
+            if kind == "drop":
+                del data[at]
+            elif kind == "insert":
+                data.insert(at, rng.randrange(256))
+            elif kind == "flip":
+                data[at] ^= 1 << rng.randrange(8)
+            else:
+                parts.append(bytes(rng.randrange(256) for _ in range(rng.randint(1, 200))))
+                intact += 1
+        else:
+            intact += 1
+        parts.append(bytes(data))
+    return b"".join(parts), intact
+
+
+def fixed_size_reads(stream):
+    """The original loop: one DAT_PACKET_SIZE read, one checksum."""
+    found = 0
+    for start in range(0, len(stream) - DAT_PACKET_SIZE + 1, DAT_PACKET_SIZE):
+        chunk = stream[start:start + DAT_PACKET_SIZE]
+        if zlib.crc32(chunk[:-4]) == struct.unpack('<I', chunk[-4:])[0]:
+            found += 1
+    return found
+
+
+def decoder_reads(stream, rng):
+    decoder = DownlinkDecoder()
+    found, start = 0, 0
+    while start < len(stream):
+        size = rng.randint(1, 128)
+        found += len(decoder.feed(stream[start:start + size]))
+        start += size
+    return found
+
+
+def timed(run):
+    started = time.perf_counter()
+    result = run()
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--packets", type=int, default=20_000)
+    parser.add_argument("--rate", type=float, default=0.02)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    stream, intact = corrupted_stream(args.packets, args.rate, rng)
+    clean, _ = corrupted_stream(args.packets, 0.0, rng)
+    print(f"{args.packets} packets, {args.rate:.1%} corrupted, {intact} intact, {len(stream)} bytes")
+
+    for label, run, data in (
+        ("fixed-size reads", lambda: fixed_size_reads(stream), stream),
+        ("decoder", lambda: decoder_reads(stream, random.Random(args.seed)), stream),
+        ("decoder (clean)", lambda: decoder_reads(clean, random.Random(args.seed)), clean),
+    ):
+        found, seconds = timed(run)
+        total = intact if data is stream else args.packets
+        print(f"  {label:17s} {found:6d} packets  {found / total:7.2%} recovered  "
+              f"{len(data) / seconds / 1e6:6.2f} MB/s  ({len(data) * 10 / 57600 / seconds:,.0f}x a 57600 baud link)")
+
+
+if __name__ == "__main__":
+    main()
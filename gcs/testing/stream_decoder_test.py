@@ -0,0 +1,72 @@
+import unittest
+import random
+import struct
+import zlib
+from packet_class._v4.packet import Packet, deserialize_pac
+from packet_class._v5.packet import serialize_cap
+from stream_decoder import DownlinkDecoder, DAT, CAP
+
+SESSION = "2025-04-20 12:00:00"
+
+
+def packets(count):
+    return [Packet("KK72PA", SESSION, i, [39.29, -119.84], 400, 300, 100, i).serialize()
+            for i in range(1, count + 1)]
+
+
+def pac_ids(found):
+    return [deserialize_pac(data)[0].pac_id for kind, data in found if kind == DAT]
+
+
+def fixed_size_reads(stream):
+    """pac_ids the old rf_serial.read(DAT_PACKET_SIZE) loop got out of stream."""
+    found = []
+    for start in range(0, len(stream) - 56, 57):
+        chunk = stream[start:start + 57]
+        if zlib.crc32(chunk[:-4]) == struct.unpack('<I', chunk[-4:])[0]:
+            found.append(deserialize_pac(chunk)[0].pac_id)
+    return found
+
+
+def feed_in_chunks(decoder, stream, rng):
+    found, start = [], 0
+    while start < len(stream):
+        size = rng.randint(1, 80)
+        found += decoder.feed(stream[start:start + size])
+        start += size
+    return found
+
+
+class TestDownlinkDecoder(unittest.TestCase):
+
+    def test_clean_stream_in_any_chunk_size(self):
+        stream = b"".join(packets(50))
+        decoder = DownlinkDecoder()
+        self.assertEqual(pac_ids(feed_in_chunks(decoder, stream, random.Random(1))), list(range(1, 51)))
+        self.assertEqual((decoder.skipped_bytes, decoder.resyncs, decoder.pending()), (0, 0, 0))
+
+    def test_recovers_within_one_packet(self):
+        data = packets(10)
+        dropped = data[2][:20] + data[2][21:]            # byte lost
+        inserted = data[5][:30] + b"\x7f" + data[5][30:]  # byte inserted
+        garbled = bytearray(data[7])
+        garbled[40] ^= 0x10                               # byte corrupted
+        stream = b"".join(data[:2] + [dropped] + data[3:5] + [inserted, data[6], bytes(garbled)] + data[8:])
+
+        decoder = DownlinkDecoder()
+        found = decoder.feed(b"\x00\xff" + stream)        # with leading line noise
+        self.assertEqual(pac_ids(found), [1, 2, 4, 5, 7, 9, 10])
+        self.assertEqual(decoder.resyncs, 4)
+
+        # The old fixed-size reads lose the intact 4 and 5 after the dropped
+        # byte, until the inserted one happens to line the stream up again
+        self.assertEqual(fixed_size_reads(stream), [1, 2, 7, 9, 10])
+
+    def test_cap_packets_are_framed_too(self):
+        stream = packets(1)[0] + serialize_cap("KK72PA", SESSION, 2) + packets(2)[1]
+        found = DownlinkDecoder().feed(stream[1:] + stream)
+        self.assertEqual([kind for kind, _ in found], [CAP, DAT, DAT, CAP, DAT])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import unittest
+import random
+import sqlite3
+from migrations import migrate
+from telemetry_merge import align, MAX_GAP_NS
+from database import update_mission_data, update_fire_status
+from fixtures import reset_database_state, START, SECOND_NS
+
+
+def brute_force(sample_ts, samples, t, max_gap_ns=MAX_GAP_NS):
+    """Reference as-of lookup for one packet time (heading excluded)."""
+    before = [i for i, ts in enumerate(sample_ts) if ts <= t]
+    after = [i for i, ts in enumerate(sample_ts) if ts >= t]
+    if before and after:
+        i, j = before[-1], after[0]
+        if sample_ts[i] == t:
+            return samples[i]
+        if sample_ts[j] - sample_ts[i] <= max_gap_ns:
+            w = (t - sample_ts[i]) / (sample_ts[j] - sample_ts[i])
+            return [a + w * (b - a) for a, b in zip(samples[i], samples[j])]
+    nearest = min(range(len(sample_ts)), key=lambda i: (abs(sample_ts[i] - t), sample_ts[i] > t))
+    if abs(sample_ts[nearest] - t) <= max_gap_ns:
+        return samples[nearest]
+    return None
+
+
+def mission_sample(ts, latitude, longitude, heading=90.0):
+    return {"time_stamp": ts, "latitude": latitude * 1e6, "longitude": longitude * 1e6,
+            "altitude": 400.0, "heading": heading, "speed": 12.0}
+
+
+class TestAlign(unittest.TestCase):
+
+    def test_matches_brute_force(self):
+        random.seed(11)
+        sample_ts = sorted(random.sample(range(0, 600 * SECOND_NS, SECOND_NS // 4), 300))
+        # Leave a telemetry outage longer than MAX_GAP_NS in the middle
+        sample_ts = [ts for ts in sample_ts if not 200 * SECOND_NS < ts < 260 * SECOND_NS]
+        samples = [[random.uniform(39, 40), random.uniform(-120, -119), random.uniform(300, 500), 0.0, random.uniform(0, 20)]
+                   for _ in sample_ts]
+        packet_ts = [random.uniform(-10, 610) * SECOND_NS for _ in range(500)] + sample_ts[:5]
+
+        matched, values, _ = align(sample_ts, samples, packet_ts)
+        for i, t in enumerate(packet_ts):
+            expected = brute_force(sample_ts, samples, t)
+            self.assertEqual(bool(matched[i]), expected is not None, msg=t)
+            if expected is not None:
+                for actual, want in zip(values[i], expected):
+                    self.assertAlmostEqual(actual, want, places=6)
+
+    def test_heading_interpolates_across_north(self):
+        matched, values, _ = align([0, 2 * SECOND_NS], [[0, 0, 0, 350.0, 0], [0, 0, 0, 10.0, 0]], [SECOND_NS])
+        self.assertTrue(matched[0])
+        self.assertAlmostEqual(values[0][3] % 360.0, 0.0, places=6)
+
+    def test_no_samples(self):
+        matched, _, _ = align([], [], [SECOND_NS])
+        self.assertFalse(matched.any())
+
+
+class TestUpdateMissionData(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        migrate(self.conn)
+        self.base = START
+        self.conn.executemany(
+            "INSERT INTO wildfires (name, pac_id, time_stamp, session_id, heading) VALUES ('Washoe Fire', ?, ?, 'session', 0)",
+            [(i, self.base + i * SECOND_NS) for i in range(10)]
+        )
+        self.conn.commit()
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_only_new_packets_are_merged(self):
+        # Packets 0..4 lie up to the first sample's time, 5..9 are newer
+        self.assertEqual(update_mission_data(mission_sample(self.base + 4 * SECOND_NS, 39.3, -116.8), self.conn), 5)
+        # The next sample interpolates 5..9 and leaves 0..4 alone
+        self.assertEqual(update_mission_data(mission_sample(self.base + 9 * SECOND_NS, 39.4, -116.9), self.conn), 5)
+        self.assertEqual(update_mission_data(mission_sample(self.base + 10 * SECOND_NS, 39.5, -117.0), self.conn), 0)
+
+        rows = self.conn.execute("SELECT pac_id, latitude, heading FROM wildfires ORDER BY pac_id").fetchall()
+        self.assertAlmostEqual(rows[0][1], 39.3)
+        self.assertAlmostEqual(rows[7][1], 39.3 + (7 - 4) / 5 * 0.1)
+        self.assertEqual({row[2] for row in rows}, {90.0})
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM telemetry").fetchone()[0], 3)
+
+    def test_fire_status_window_is_rebuilt_after_the_merge(self):
+        reset_database_state()
+        self.conn.execute("UPDATE wildfires SET latitude = 0, longitude = 0, high_temp = 300, low_temp = 100")
+        self.conn.commit()
+        update_fire_status("Washoe Fire", self.conn)
+        self.conn.commit()
+
+        # The window of the ingest process is left in place, as it is when
+        # the avionics process runs the merge
+        update_mission_data(mission_sample(self.base + 9 * SECOND_NS, 39.3, -116.8), self.conn)
+        update_fire_status("Washoe Fire", self.conn)
+        self.conn.commit()
+        snapshot = self.conn.execute(
+            "SELECT avg_latitude, avg_longitude FROM fire_current WHERE name = 'Washoe Fire'"
+        ).fetchone()
+        expected = self.conn.execute("SELECT AVG(latitude), AVG(longitude) FROM wildfires").fetchone()
+        self.assertGreater(expected[0], 0)
+        for actual, want in zip(snapshot, expected):
+            self.assertAlmostEqual(actual, want)
+        reset_database_state()
+
+
+if __name__ == "__main__":
+    unittest.main()